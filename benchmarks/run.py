@@ -0,0 +1,372 @@
+"""Benchmarks for pypresence's hot paths.
+
+Run from the repository root::
+
+    python benchmarks/run.py                  # everything
+    python benchmarks/run.py -k update -n 5000
+    python benchmarks/run.py --json after.json --compare before.json
+
+Each benchmark reports operations per second, the median and 99th
+percentile latency of a single operation, and the bytes allocated per
+operation (the growth of Python's traced memory during one call, measured
+in a separate pass with tracemalloc so it does not skew the timings).
+Round trips run against ``pypresence.testing.FakeDiscord`` over a real
+UNIX socket, so they need Linux or macOS.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import fnmatch
+import gc
+import inspect
+import json
+import os
+import socket
+import sys
+import time
+import tracemalloc
+from typing import NamedTuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pypresence.client import AioClient, Client  # noqa: E402
+from pypresence.codec import get_codec  # noqa: E402
+from pypresence.encoder import FrameCache, encode_activity  # noqa: E402
+from pypresence.payloads import Payload  # noqa: E402
+from pypresence.presence import AioPresence, Presence  # noqa: E402
+from pypresence.protocol import OP_FRAME, IPCConnection, encode_frame  # noqa: E402
+from pypresence.testing import FakeDiscord  # noqa: E402
+from pypresence.transport import SocketTransport  # noqa: E402
+from pypresence.utils import remove_none  # noqa: E402
+from pypresence.validation import validate_activity  # noqa: E402
+
+CLIENT_ID = "123456789012345678"
+
+ACTIVITY = dict(
+    state="In a match",
+    details="Ranked - Map 3 of 5",
+    start=1700000000,
+    large_image="map_dust",
+    large_text="Dust",
+    small_image="rank_gold",
+    small_text="Gold III",
+    party_id="party-1",
+    party_size=[2, 5],
+    buttons=[{"label": "Watch", "url": "https://example.com/watch"}],
+)
+
+EVENT = {
+    "cmd": "DISPATCH",
+    "evt": "SPEAKING_START",
+    "data": {"channel_id": "199737254929760256", "user_id": "53908232506183680"},
+}
+
+CASES = {}
+
+
+def case(name):
+    """Register a generator that sets up, yields the operation, then cleans up."""
+
+    def register(func):
+        CASES[name] = func
+        return func
+
+    return register
+
+
+class Result(NamedTuple):
+    name: str
+    ops: float
+    p50: float  # microseconds
+    p99: float  # microseconds
+    alloc: float  # bytes per operation
+
+
+class _NullWriter:
+    def write(self, data):
+        pass
+
+
+@case("payload.set_activity")
+def _set_activity():
+    yield lambda: Payload.set_activity(**ACTIVITY)
+
+
+@case("encoder.encode_activity")
+def _encode_activity():
+    codec = get_codec()
+    yield lambda: encode_activity(**ACTIVITY, codec=codec)
+
+
+@case("encoder.encode_activity[cached]")
+def _encode_activity_cached():
+    codec = get_codec()
+    cache = FrameCache()
+    yield lambda: encode_activity(**ACTIVITY, codec=codec, cache=cache)
+
+
+@case("validation.validate_activity")
+def _validate_activity():
+    yield lambda: validate_activity(ACTIVITY)
+
+
+@case("utils.remove_none")
+def _remove_none():
+    def op():
+        return remove_none(
+            {
+                "pid": 1,
+                "activity": {
+                    "state": "In a match",
+                    "details": None,
+                    "timestamps": {"start": 1700000000, "end": None},
+                    "assets": {"large_image": None, "small_image": None},
+                    "party": {"id": None, "size": None},
+                },
+            }
+        )
+
+    yield op
+
+
+@case("baseclient.send_data")
+def _send_data():
+    presence = Presence(CLIENT_ID, transport="socket")
+    presence.sock_writer = _NullWriter()
+    payload = Payload.set_activity(**ACTIVITY)
+    yield lambda: presence.send_data(1, payload)
+
+
+@case("baseclient.send_data[encoded]")
+def _send_data_encoded():
+    presence = Presence(CLIENT_ID, transport="socket")
+    presence.sock_writer = _NullWriter()
+    payload = encode_activity(**ACTIVITY, codec=presence.codec)
+    yield lambda: presence.send_data(1, payload)
+
+
+@case("baseclient.read_output")
+def _read_output():
+    server, sock = socket.socketpair()
+    client = Client(CLIENT_ID, transport="socket")
+    transport = SocketTransport(client._connection)
+    transport._sock = sock
+    client.sock_writer = client.sock_protocol = transport
+    frame = encode_frame(
+        OP_FRAME,
+        {
+            "cmd": "GET_CHANNELS",
+            "evt": None,
+            "nonce": "1",
+            "data": {"channels": [{"id": str(n), "name": "general"} for n in range(8)]},
+        },
+    )
+
+    def op():
+        server.sendall(frame)
+        return client._run(client.read_output("1"))
+
+    yield op
+    transport.close()
+    server.close()
+
+
+@case("client.on_event")
+def _client_on_event():
+    client = Client(CLIENT_ID, transport="socket")
+    client._events["speaking_start"] = lambda data: None
+    connection = IPCConnection(CLIENT_ID)
+    frame = encode_frame(OP_FRAME, EVENT)
+
+    def op():
+        for message in connection.receive(frame):
+            client.on_event(message.payload)
+
+    yield op
+
+
+@case("aioclient.on_event")
+async def _aioclient_on_event():
+    client = AioClient(CLIENT_ID)
+
+    async def handler(data):
+        pass
+
+    client._events["speaking_start"] = handler
+    connection = IPCConnection(CLIENT_ID)
+    frame = encode_frame(OP_FRAME, EVENT)
+
+    async def op():
+        for message in connection.receive(frame):
+            await client.on_event(message.payload)
+
+    yield op
+
+
+@case("presence.update")
+def _presence_update():
+    with FakeDiscord() as server:
+        presence = Presence(CLIENT_ID, ipc_path=server.path)
+        presence.connect()
+        yield lambda: presence.update(**ACTIVITY, force=True)
+        presence.close()
+
+
+@case("presence.update[socket]")
+def _presence_update_socket():
+    with FakeDiscord() as server:
+        presence = Presence(CLIENT_ID, ipc_path=server.path, transport="socket")
+        presence.connect()
+        yield lambda: presence.update(**ACTIVITY, force=True)
+        presence.close()
+
+
+@case("aiopresence.update")
+async def _aiopresence_update():
+    with FakeDiscord() as server:
+        presence = AioPresence(CLIENT_ID, ipc_path=server.path)
+        await presence.connect()
+        yield lambda: presence.update(**ACTIVITY, force=True)
+        presence.close()
+
+
+@case("aioclient.get_channels")
+async def _aioclient_get_channels():
+    with FakeDiscord() as server:
+        server.respond(
+            "GET_CHANNELS",
+            {"channels": [{"id": str(n), "name": "general"} for n in range(8)]},
+        )
+        client = AioClient(CLIENT_ID, ipc_path=server.path)
+        await client.start()
+        yield lambda: client.get_channels("1")
+        client.close()
+
+
+def _summarise(name, timings, elapsed, alloc) -> Result:
+    timings.sort()
+    return Result(
+        name,
+        ops=len(timings) / elapsed,
+        p50=timings[len(timings) // 2] / 1000,
+        p99=timings[min(len(timings) - 1, int(len(timings) * 0.99))] / 1000,
+        alloc=alloc,
+    )
+
+
+def _measure(name, op, number) -> Result:
+    clock = time.perf_counter_ns
+    for _ in range(min(number, 100)):
+        op()
+
+    timings = []
+    start = clock()
+    for _ in range(number):
+        before = clock()
+        op()
+        timings.append(clock() - before)
+    elapsed = (clock() - start) / 1e9
+
+    samples = min(number, 1000)
+    allocated = 0
+    tracemalloc.start()
+    try:
+        for _ in range(samples):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            op()
+            allocated += tracemalloc.get_traced_memory()[1] - current
+    finally:
+        tracemalloc.stop()
+    return _summarise(name, timings, elapsed, allocated / samples)
+
+
+async def _measure_async(name, op, number) -> Result:
+    clock = time.perf_counter_ns
+    for _ in range(min(number, 100)):
+        await op()
+
+    timings = []
+    start = clock()
+    for _ in range(number):
+        before = clock()
+        await op()
+        timings.append(clock() - before)
+    elapsed = (clock() - start) / 1e9
+
+    samples = min(number, 1000)
+    allocated = 0
+    tracemalloc.start()
+    try:
+        for _ in range(samples):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            await op()
+            allocated += tracemalloc.get_traced_memory()[1] - current
+    finally:
+        tracemalloc.stop()
+    return _summarise(name, timings, elapsed, allocated / samples)
+
+
+def run(name, number) -> Result:
+    gc.collect()
+    func = CASES[name]
+    if inspect.isasyncgenfunction(func):
+
+        async def main():
+            cases = func()
+            op = await cases.__anext__()
+            try:
+                return await _measure_async(name, op, number)
+            finally:
+                await cases.aclose()
+
+        return asyncio.run(main())
+
+    cases = func()
+    op = next(cases)
+    try:
+        return _measure(name, op, number)
+    finally:
+        cases.close()
+
+
+def _print(results, baseline):
+    header = f"{'benchmark':<32}{'ops/s':>12}{'p50 us':>10}{'p99 us':>10}{'B/op':>10}"
+    if baseline:
+        header += f"{'vs base':>10}"
+    print(header)
+    for r in results:
+        line = (
+            f"{r.name:<32}{r.ops:>12,.0f}{r.p50:>10.1f}{r.p99:>10.1f}{r.alloc:>10.0f}"
+        )
+        if r.name in baseline:
+            line += f"{r.ops / baseline[r.name]['ops'] - 1:>+10.1%}"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-k", default="*", help="glob selecting benchmarks to run")
+    parser.add_argument("-n", type=int, default=2000, help="operations per benchmark")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="show ops/s relative to an earlier --json")
+    args = parser.parse_args(argv)
+
+    names = [name for name in CASES if fnmatch.fnmatch(name, f"*{args.k}*")]
+    results = [run(name, args.n) for name in names]
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    _print(results, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({r.name: r._asdict() for r in results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,19 @@ Python RPC Client for Discord
 By: qwertyquerty and LewdNeko
 """
 
+from .activity import Activity
 from .baseclient import BaseClient
+from .broadcast import AioBroadcastPresence, BroadcastPresence
 from .client import AioClient, Client
 from .exceptions import *
+from .manager import PresenceManager
 from .presence import AioPresence, Presence
+from .reconnect import Backoff
+from .scheduler import ActivityScheduler
 from .types import ActivityType, StatusDisplayType
+from .utils import IPCCandidate, discover_ipc_paths
+from .validation import validate_activity
+from .watcher import IPCWatcher
 
 __title__ = "pypresence"
 __author__ = "qwertyquerty"
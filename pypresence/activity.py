@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from .exceptions import InvalidArgument
+from .types import ActivityType, StatusDisplayType
+from .validation import LENIENT, validate_activity
+
+FIELDS = (
+    "activity_type",
+    "status_display_type",
+    "state",
+    "state_url",
+    "details",
+    "details_url",
+    "name",
+    "start",
+    "end",
+    "large_image",
+    "large_text",
+    "large_url",
+    "small_image",
+    "small_text",
+    "small_url",
+    "party_id",
+    "party_size",
+    "join",
+    "spectate",
+    "match",
+    "buttons",
+    "instance",
+)
+FIELD_SET = frozenset(FIELDS)
+_ENUMS = {"activity_type": ActivityType, "status_display_type": StatusDisplayType}
+
+
+def _check(name: str, value):
+    if value is None:
+        return None
+    enum = _ENUMS.get(name)
+    if enum is not None:
+        try:
+            return enum(value)
+        except ValueError:
+            raise InvalidArgument(
+                f"one of {[member.value for member in enum]}", repr(value)
+            ) from None
+    # Text that is too long and extra buttons are only an error for a
+    # strict client, which checks again when the activity is sent
+    validate_activity({name: value}, LENIENT)
+    if name in ("start", "end"):
+        return int(value)
+    return value
+
+
+class Activity:
+    """An activity that can be changed a field at a time and sent again.
+
+    Every ``Presence.update`` and ``set_activity`` option is an attribute.
+    Values are checked against Discord's limits and converted when they are
+    set; only text that is too long and extra buttons are left for the
+    client's ``validation`` mode to reject or trim. ``dirty`` names the
+    fields changed since Discord last accepted the activity. Changing a list
+    in place, like ``buttons``, is not noticed; assign a new one instead.
+    """
+
+    __slots__ = FIELDS + ("_dirty",)
+
+    def __init__(self, **fields):
+        object.__setattr__(self, "_dirty", set())
+        for name in FIELDS:
+            object.__setattr__(self, name, None)
+        object.__setattr__(self, "instance", True)
+        self.update(**fields)
+
+    def __setattr__(self, name: str, value):
+        if name not in FIELD_SET:
+            raise AttributeError(f"Activity has no field {name!r}")
+        value = _check(name, value)
+        if value != getattr(self, name):
+            object.__setattr__(self, name, value)
+            self._dirty.add(name)
+
+    def __eq__(self, other):
+        if not isinstance(other, Activity):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ", ".join(
+            f"{name}={getattr(self, name)!r}"
+            for name in FIELDS
+            if getattr(self, name) is not None
+        )
+        return f"Activity({fields})"
+
+    @property
+    def dirty(self) -> frozenset[str]:
+        return frozenset(self._dirty)
+
+    def update(self, **fields) -> Activity:
+        """Set several fields at once."""
+        for name, value in fields.items():
+            setattr(self, name, value)
+        return self
+
+    def mark_clean(self, sent: dict | None = None):
+        """Forget which fields changed, as sending the activity does.
+
+        With ``sent``, the ``to_dict()`` of what was sent, fields changed
+        again since then stay dirty.
+        """
+        if sent is None:
+            self._dirty.clear()
+            return
+        self._dirty.difference_update(
+            [name for name in self._dirty if getattr(self, name) == sent[name]]
+        )
+
+    def copy(self) -> Activity:
+        return Activity(**self.to_dict())
+
+    def to_dict(self) -> dict:
+        """Every field, as keyword arguments for ``update``."""
+        return {name: getattr(self, name) for name in FIELDS}
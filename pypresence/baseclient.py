@@ -2,161 +2,716 @@ from __future__ import annotations
 
 import asyncio
 import inspect
+import itertools
 import json
-import struct
 import sys
+import time
+
+from .activity import Activity
+from .channel import EventChannel
+from .codec import get_codec, is_builtin
+from .encoder import EncodedPayload, FrameCache, encode_activity
 
 # TODO: Get rid of this import * lol
 from .exceptions import (
     ConnectionTimeout,
-    DiscordError,
     DiscordNotFound,
     InvalidArgument,
-    InvalidID,
     InvalidPipe,
     PipeClosed,
     PyPresenceException,
     ResponseTimeout,
-    ServerError,
 )
+from .inflight import InFlight
+from .loopthread import LoopThread
 from .payloads import Payload
-from .utils import get_event_loop, get_ipc_path
+from .protocol import CLOSED, EVENT, HANDSHAKE, RESPONSE, IPCConnection, Message
+from .reconnect import Backoff
+from .transport import IPCProtocol, SocketTransport
+from .utils import (
+    PROBE_TIMEOUT,
+    clear_ipc_cache,
+    discover_ipc_paths,
+    get_event_loop,
+    get_ipc_path,
+)
+from .validation import MODES, STRICT
+from .watcher import APPEARED, IPCWatcher
 
 
 class BaseClient:
 
     def __init__(self, client_id: str, **kwargs):
-        loop = kwargs.get("loop", None)
-        handler = kwargs.get("handler", None)
         self.pipe = kwargs.get("pipe", None)
+        self.ipc_path = kwargs.get("ipc_path", None)
         self.isasync = kwargs.get("isasync", False)
         self.connection_timeout = kwargs.get("connection_timeout", 30)
         self.response_timeout = kwargs.get("response_timeout", 10)
+        self.event_high_water = kwargs.get("event_high_water", 1024)
+        self.event_low_water = kwargs.get("event_low_water", None)
+        self.event_overflow = kwargs.get("event_overflow", "drop_oldest")
+        # A running LoopThread shared with other clients, see PresenceManager
+        shared_thread: LoopThread | None = kwargs.get("loop_thread", None)
+        self.threaded = kwargs.get("threaded", False) or shared_thread is not None
+        self.blocking = kwargs.get("blocking", True)
+        self.transport = kwargs.get("transport", "asyncio")
+        self._init_codec(kwargs)
+        reconnect = kwargs.get("reconnect", False)
+        if reconnect is True:
+            reconnect = Backoff()
+        self.reconnect: Backoff | None = reconnect or None
 
         client_id = str(client_id)
 
-        if loop is not None:
-            self.update_event_loop(loop)
-        else:
-            self.update_event_loop(get_event_loop())
+        self._init_loop(kwargs.get("loop", None), shared_thread)
 
-        self.sock_reader: asyncio.StreamReader | None = None
-        self.sock_writer: asyncio.StreamWriter | None = None
+        self.sock_protocol: IPCProtocol | SocketTransport | None = None
+        self.sock_writer: asyncio.Transport | SocketTransport | None = None
 
-        self.client_id = client_id
+        self._connection = IPCConnection(client_id, codec=self.codec)
+        # Nonces keep counting across reconnects, so a late reply from an
+        # old connection can never be taken for the answer to a new request
+        self._nonces = itertools.count(1)
+        self.in_flight = InFlight()
+        self._responses: asyncio.Queue | None = None
+        self._handshake_waiter: asyncio.Future | None = None
+        self._reader_error: PyPresenceException | None = None
+        self._event_channel: EventChannel | None = None
+        self._dispatch_task: asyncio.Task | None = None
+        self._reconnect_task: asyncio.Task | None = None
 
-        if handler is not None:
-            if not inspect.isfunction(handler):
-                raise PyPresenceException("Error handler must be a function.")
-            args = inspect.getfullargspec(handler).args
-            if args[0] == "self":
-                args = args[1:]
-            if len(args) != 2:
-                raise PyPresenceException(
-                    "Error handler should only accept two arguments."
-                )
+        # Replayed after reconnecting: the last SET_ACTIVITY and every active
+        # SUBSCRIBE, keyed by event and arguments
+        self._last_activity: Payload | None = None
+        self._subscriptions: dict[tuple[str, str], dict] = {}
 
-            if self.isasync:
-                if not inspect.iscoroutinefunction(handler):
-                    raise InvalidArgument(
-                        "Coroutine",
-                        "Subroutine",
-                        "You are running async mode - "
-                        "your error handler should be awaitable.",
-                    )
-                err_handler = self._async_err_handle
-            else:
-                err_handler = self._err_handle
+        self.client_id = client_id
 
-            self.loop.set_exception_handler(err_handler)
-            self.handler = handler
+        handler = kwargs.get("handler", None)
+        if handler is not None:
+            self._init_handler(handler)
 
         if getattr(self, "on_event", None):  # Tasty bad code ;^)
             self._events_on = True
         else:
             self._events_on = False
 
+        if self._loop_thread is not None and self._owns_loop_thread:
+            self._loop_thread.start()
+
+    def _init_codec(self, kwargs: dict):
+        self.codec = get_codec(kwargs.get("codec", "auto"))
+        # A codec passed in by the user gets to see every frame
+        self._encode_activity = is_builtin(self.codec)
+        self.validation = kwargs.get("validation", STRICT)
+        if self.validation not in MODES:
+            raise InvalidArgument("'strict', 'lenient' or None", repr(self.validation))
+        frame_cache = kwargs.get("frame_cache", 32)
+        self.frame_cache: FrameCache | None = None
+        if self._encode_activity and frame_cache:
+            self.frame_cache = FrameCache(frame_cache)
+
+    def _init_loop(self, loop, shared_thread: LoopThread | None):
+        if self.transport not in ("asyncio", "socket"):
+            raise InvalidArgument("'asyncio' or 'socket'", repr(self.transport))
+        if self.transport == "socket" and (
+            self.isasync or self.threaded or sys.platform == "win32"
+        ):
+            raise InvalidArgument(
+                "transport='asyncio'",
+                "transport='socket'",
+                "The socket transport is only available to synchronous, "
+                "non-threaded clients on Linux and macOS.",
+            )
+
+        self._loop_thread: LoopThread | None = None
+        self._owns_loop_thread = shared_thread is None
+        if self.transport == "socket":
+            # Everything happens in blocking calls, no event loop is needed
+            self.loop = None
+        elif self.threaded:
+            if self.isasync:
+                raise InvalidArgument(
+                    "threaded=False",
+                    "threaded=True",
+                    "Async clients run on your own event loop.",
+                )
+            self._loop_thread = shared_thread or LoopThread(loop)
+            self.loop = self._loop_thread.loop
+        elif loop is not None:
+            self.update_event_loop(loop)
+        else:
+            self.update_event_loop(get_event_loop())
+
+    def _init_handler(self, handler):
+        if not inspect.isfunction(handler):
+            raise PyPresenceException("Error handler must be a function.")
+        args = inspect.getfullargspec(handler).args
+        if args[0] == "self":
+            args = args[1:]
+        if len(args) != 2:
+            raise PyPresenceException("Error handler should only accept two arguments.")
+
+        if self.isasync:
+            if not inspect.iscoroutinefunction(handler):
+                raise InvalidArgument(
+                    "Coroutine",
+                    "Subroutine",
+                    "You are running async mode - "
+                    "your error handler should be awaitable.",
+                )
+            err_handler = self._async_err_handle
+        else:
+            err_handler = self._err_handle
+
+        # A loop shared with other clients keeps its own handler, and
+        # _report_exception hands this client's errors to this handler
+        if self.loop is not None and self._owns_loop_thread:
+            self.loop.set_exception_handler(err_handler)
+        self.handler = handler
+
     def update_event_loop(self, loop):
         # noinspection PyAttributeOutsideInit
         self.loop = loop
         asyncio.set_event_loop(self.loop)
 
+    def _run(self, coro):
+        """Run a command coroutine for the synchronous clients.
+
+        With ``threaded=True`` it runs on the background loop, and a
+        ``concurrent.futures.Future`` is returned instead of the result when
+        the client was created with ``blocking=False``.
+        """
+        if self.loop is None:
+            # The socket transport never suspends: the coroutine runs to
+            # completion on its first step
+            try:
+                coro.send(None)
+            except StopIteration as e:
+                return e.value
+            coro.close()
+            raise PyPresenceException("Command awaited without an event loop")
+        if self._loop_thread is None:
+            return self.loop.run_until_complete(coro)
+        if not self.blocking:
+            return self._loop_thread.submit(coro)
+        return self._loop_thread.run(coro)
+
+    def _call(self, func, *args):
+        if self._loop_thread is None:
+            return func(*args)
+        return self._loop_thread.call(func, *args)
+
+    def _close_loop(self):
+        """Close the loop, unless other clients share it or it is running."""
+        if self._loop_thread is not None:
+            if self._owns_loop_thread:
+                self._loop_thread.stop()
+        elif self.loop is not None and not self.loop.is_running():
+            self.loop.close()
+
+    async def _sleep(self, delay: float):
+        if self.loop is None:
+            time.sleep(delay)
+        else:
+            await asyncio.sleep(delay)
+
+    def _report_exception(self, context: dict):
+        if self._owns_loop_thread or getattr(self, "handler", None) is None:
+            self.loop.call_exception_handler(context)
+            return
+        try:
+            self._err_handle(self.loop, context)
+        except Exception as e:
+            self.loop.call_exception_handler(
+                {"message": "Exception in error handler", "exception": e}
+            )
+
     def _err_handle(self, loop, context: dict):
-        result = self.handler(context["exception"], context["future"])
+        result = self.handler(context["exception"], context.get("future"))
         if inspect.iscoroutinefunction(self.handler):
             loop.run_until_complete(result)
 
     # noinspection PyUnusedLocal
     async def _async_err_handle(self, loop, context: dict):
-        await self.handler(context["exception"], context["future"])
+        await self.handler(context["exception"], context.get("future"))
 
-    async def read_output(self):
-        try:
-            preamble = await asyncio.wait_for(
-                self.sock_reader.read(8), self.response_timeout
+    def _create_protocol(self) -> IPCProtocol:
+        self._responses = asyncio.Queue()
+        self._reader_error = None
+        if self._events_on:
+            self._stop_dispatcher()
+            self._event_channel = EventChannel(
+                self.event_high_water,
+                self.event_low_water,
+                self.event_overflow,
+                on_pause=self._pause_reading,
+                on_resume=self._resume_reading,
+            )
+            self._dispatch_task = self.loop.create_task(
+                self._dispatch_events(self._event_channel)
+            )
+        connection = self._connection = IPCConnection(self.client_id, codec=self.codec)
+
+        def on_close(exc):
+            # A connection replaced by a reconnect may only report its loss late
+            if connection is self._connection:
+                self._on_close(exc)
+
+        return IPCProtocol(connection, self._on_message, on_close)
+
+    def _pause_reading(self):
+        if self.sock_writer is not None and not self.sock_writer.is_closing():
+            self.sock_writer.pause_reading()
+
+    def _resume_reading(self):
+        if self.sock_writer is not None and not self.sock_writer.is_closing():
+            self.sock_writer.resume_reading()
+
+    async def _dispatch_events(self, channel: EventChannel):
+        while True:
+            payload = await channel.get()
+            if payload is None:
+                return
+            try:
+                result = self.on_event(payload)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                self._report_exception(
+                    {
+                        "message": "Exception in event handler",
+                        "exception": e,
+                        "future": self._dispatch_task,
+                    }
+                )
+
+    def _stop_dispatcher(self):
+        task, self._dispatch_task = self._dispatch_task, None
+        if task is None or task.done():
+            return
+        task.cancel()
+        if not self.loop.is_running() and not self.loop.is_closed():
+            self.loop.run_until_complete(asyncio.gather(task, return_exceptions=True))
+
+    def _on_message(self, message: Message):
+        if message.kind == HANDSHAKE:
+            waiter = self._handshake_waiter
+            if waiter is not None and not waiter.done():
+                waiter.set_result(message)
+        elif message.kind == EVENT:
+            if self._event_channel is not None:
+                self._event_channel.put(message.payload)
+            elif message.error is not None:
+                self._report_error_event(message.error)
+        elif message.kind == RESPONSE:
+            self._on_response(message)
+        # CLOSED is followed by the socket closing, which fails whoever waits
+
+    def _on_response(self, message: Message):
+        # A response only ever reaches the request that carries its nonce
+        nonce = message.nonce
+        if nonce is None:
+            self._responses.put_nowait(message)
+            return
+        request = self.in_flight.answered(nonce)
+        if request is not None and request.future is not None:
+            # read_output() removes the entry once the caller has the result
+            future = request.future
+            if future.done():
+                return
+            if message.error is not None:
+                future.set_exception(message.error)
+            else:
+                future.set_result(message.payload)
+        # Otherwise it answers a request that already timed out: drop it
+
+    def _report_error_event(self, error: Exception):
+        self._report_exception(
+            {"message": "Discord reported an error", "exception": error}
+        )
+
+    def _on_close(self, exc: Exception | None):
+        self._reader_error = PipeClosed()
+        if self._handshake_waiter is not None and not self._handshake_waiter.done():
+            self._handshake_waiter.set_exception(InvalidPipe())
+        self.in_flight.fail(PipeClosed)
+        self._responses.put_nowait(None)
+        if self._event_channel is not None:
+            self._event_channel.close()
+
+        # Async and threaded clients keep their loop running, so they can
+        # reconnect right away instead of waiting for the next command
+        if (
+            self.reconnect is not None
+            and self._connection.state != IPCConnection.CLOSING
+            and (self.isasync or self._loop_thread is not None)
+        ):
+            self._start_reconnect().add_done_callback(self._reconnect_done)
+
+    def _start_reconnect(self) -> asyncio.Task:
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = self.loop.create_task(self._reconnect())
+        return self._reconnect_task
+
+    def _reconnect_done(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            self._report_exception(
+                {
+                    "message": "Could not reconnect to Discord",
+                    "exception": task.exception(),
+                    "future": task,
+                }
             )
-            status_code, length = struct.unpack("<II", preamble[:8])
-            data = await asyncio.wait_for(
-                self.sock_reader.read(length), self.response_timeout
+
+    def _stop_reconnect(self):
+        task, self._reconnect_task = self._reconnect_task, None
+        if task is not None and not task.done():
+            task.cancel()
+
+    async def _reconnect(self):
+        error = None
+        # Watch from the start so a socket created during an attempt is seen
+        with IPCWatcher(self.pipe) as watcher:
+            for delay in self.reconnect.delays():
+                if isinstance(error, DiscordNotFound):
+                    # Nothing to connect to: sleep until Discord creates a socket
+                    await self._wait_for_socket(watcher, self.reconnect.maximum)
+                else:
+                    await self._sleep(delay)
+                try:
+                    await self.handshake()
+                    for data in self._replay_payloads():
+                        nonce = self.send_data(1, data)
+                        await self.read_output(nonce)
+                    return
+                except (
+                    DiscordNotFound,
+                    InvalidPipe,
+                    PipeClosed,
+                    ConnectionTimeout,
+                    ResponseTimeout,
+                ) as e:
+                    error = e
+        raise error
+
+    async def _wait_for_socket(self, watcher: IPCWatcher, timeout: float):
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if self.loop is None:
+                events = watcher.wait(remaining)
+            else:
+                events = await watcher.wait_async(remaining)
+            if any(event.kind == APPEARED for event in events):
+                return
+
+    def _activity(self, activity: Activity | None = None, **fields) -> Payload:
+        """A SET_ACTIVITY payload, encoded directly unless a custom codec is set.
+
+        An ``activity`` replaces every field but ``pid``, so no other field
+        may be given with it.
+        """
+        if activity is not None:
+            given = [
+                name
+                for name, value in fields.items()
+                if value is not None
+                and name != "pid"
+                and not (name == "instance" and value is True)
+            ]
+            if given:
+                raise InvalidArgument(
+                    "either an activity or its fields",
+                    f"both (activity and {', '.join(given)})",
+                )
+            fields = dict(activity.to_dict(), pid=fields["pid"])
+        if self._encode_activity:
+            return encode_activity(
+                **fields,
+                codec=self.codec,
+                cache=self.frame_cache,
+                validation=self.validation,
             )
-        except (BrokenPipeError, struct.error):
+        return Payload.set_activity(**fields, activity=True, validation=self.validation)
+
+    def _clean_after(self, activity: Activity | None, coro):
+        """``coro``, then forget the changes to ``activity`` if Discord applied them.
+
+        What is sent is recorded now, so changes made while the update is
+        on its way stay dirty.
+        """
+        if activity is None:
+            return coro
+        return self._mark_clean(coro, activity, activity.to_dict())
+
+    async def _mark_clean(self, coro, activity: Activity, sent: dict):
+        response = await coro
+        # None means the update was held back for later, not applied
+        if response is not None:
+            activity.mark_clean(sent)
+        return response
+
+    def _replay_payloads(self) -> list[dict]:
+        payloads = list(self._subscriptions.values())
+        if self._last_activity is not None:
+            payloads.append(self._last_activity.data)
+        # Without their old nonces, send_data numbers them afresh
+        return [
+            {key: value for key, value in data.items() if key != "nonce"}
+            for data in payloads
+        ]
+
+    def _remember(self, payload: Payload | dict):
+        if isinstance(payload, EncodedPayload):
+            # Only decoded if it ever has to be replayed
+            self._last_activity = payload
+            return
+        data = payload.data if isinstance(payload, Payload) else payload
+        cmd = data.get("cmd")
+        if cmd == "SET_ACTIVITY":
+            self._last_activity = Payload(data, clear_none=False)
+        elif cmd in ("SUBSCRIBE", "UNSUBSCRIBE"):
+            key = (data.get("evt"), json.dumps(data.get("args"), sort_keys=True))
+            if cmd == "SUBSCRIBE":
+                self._subscriptions[key] = data
+            else:
+                self._subscriptions.pop(key, None)
+
+    async def _read_message(self, timeout: float | None = None) -> Message:
+        try:
+            message = await asyncio.wait_for(self._responses.get(), timeout)
+        except asyncio.TimeoutError:
+            raise ResponseTimeout
+        if message is None:
+            # Leave the marker in place so every other reader sees it too
+            self._responses.put_nowait(None)
             raise PipeClosed
+        return message
+
+    def _handle_exception(self, e: Exception):
+        # Errors raised while the socket transport dispatches events inline
+        if getattr(self, "handler", None) is None:
+            raise e
+        self.handler(e, None)
+
+    def _dispatch_inline(self, message: Message):
+        # Events that arrive before the response are dispatched inline
+        try:
+            if self._events_on:
+                self.on_event(message.payload)
+            elif message.error is not None:
+                raise message.error
+        except Exception as e:
+            self._handle_exception(e)
+
+    def _read_socket(self, nonce: str | None = None) -> dict:
+        deadline = time.monotonic() + self.response_timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise ResponseTimeout
+            message = self.sock_protocol.read_message(remaining)
+            if message.kind == EVENT:
+                self._dispatch_inline(message)
+                continue
+            if message.kind == CLOSED:
+                self.sock_protocol.close()
+                raise PipeClosed
+            if nonce is not None and message.nonce not in (None, nonce):
+                continue  # answers a request that already timed out
+            self.in_flight.answered(message.nonce)
+            if message.error is not None:
+                raise message.error
+            return message.payload
+
+    def _read_socket_output(self, nonce: str | None) -> dict:
+        try:
+            return self._read_socket(nonce)
+        except ResponseTimeout:
+            self.in_flight.timed_out(nonce)
+            raise
+        finally:
+            self.in_flight.pop(nonce)
+
+    async def _read_unmatched(self) -> dict:
+        # A response without a nonce, when nothing is waiting for one
+        message = await self._read_message(self.response_timeout)
+        if message.error is not None:
+            raise message.error
+        return message.payload
+
+    async def read_output(self, nonce: str | None = None):
+        if self._reader_error is not None or self.sock_protocol is None:
+            self.in_flight.pop(nonce)
+            raise self._reader_error or PipeClosed()
+        if self.transport == "socket":
+            return self._read_socket_output(nonce)
+
+        if nonce is None:
+            oldest = self.in_flight.oldest()
+            if oldest is None:
+                return await self._read_unmatched()
+            # Without a nonce, read the reply to the oldest outstanding request
+            nonce = oldest.nonce
+
+        request = self.in_flight.get(nonce)
+        if request is None:
+            request = self.in_flight.add(nonce, future=self.loop.create_future())
+        elif request.future is None:
+            request.future = self.loop.create_future()
+        try:
+            return await asyncio.wait_for(request.future, self.response_timeout)
         except asyncio.TimeoutError:
+            self.in_flight.timed_out(nonce)
             raise ResponseTimeout
-        payload = json.loads(data.decode("utf-8"))
-        if payload["evt"] == "ERROR":
-            raise ServerError(payload["data"]["message"])
-        return payload
+        finally:
+            self.in_flight.pop(nonce)
+
+    async def _request(self, payload: Payload | dict) -> dict:
+        try:
+            nonce = self.send_data(1, payload)
+            response = await self.read_output(nonce)
+        except (PipeClosed, InvalidPipe):
+            if self.reconnect is None:
+                raise
+            # Reconnect, then retry the command once on the new connection
+            if self.loop is None:
+                await self._reconnect()
+            else:
+                await asyncio.shield(self._start_reconnect())
+            nonce = self.send_data(1, payload)
+            response = await self.read_output(nonce)
+        self._remember(payload)
+        return response
 
-    def send_data(self, op: int, payload: dict | Payload):
-        if isinstance(payload, Payload):
-            payload = payload.data
-        payload_string = json.dumps(payload)
+    def _next_nonce(self) -> str:
+        # Skip nonces a caller picked for a request that is still waiting
+        while True:
+            nonce = str(next(self._nonces))
+            if nonce not in self.in_flight:
+                return nonce
 
+    def send_data(self, op: int, payload: dict | Payload) -> str | None:
         assert (
             self.sock_writer is not None
         ), "You must connect your client before sending events!"
 
-        self.sock_writer.write(
-            struct.pack("<II", op, len(payload_string)) + payload_string.encode("utf-8")
-        )
+        if isinstance(payload, EncodedPayload):
+            if op == 1:
+                payload.nonce = self._next_nonce()
+            nonce, cmd = payload.nonce, payload.cmd
+            frame = self._connection.send_encoded(op, payload.body)
+        else:
+            if isinstance(payload, Payload):
+                # Payloads we built are numbered here; a dict keeps its own
+                # nonce unless it is missing or already waiting for a reply
+                data = payload.data
+                if op == 1:
+                    data = dict(data, nonce=self._next_nonce())
+            else:
+                data = payload
+                if op == 1 and (
+                    data.get("nonce") is None or data["nonce"] in self.in_flight
+                ):
+                    data = dict(data, nonce=self._next_nonce())
+            nonce, cmd = data.get("nonce"), data.get("cmd")
+            frame = self._connection.send(op, data)
+        if op == 1 and nonce is not None:
+            # Register before writing so the response can never arrive unclaimed
+            future = None if self.loop is None else self.loop.create_future()
+            self.in_flight.add(nonce, cmd, future)
+
+        self.sock_writer.write(frame)
+        return nonce
 
     async def create_reader_writer(self, ipc_path):
+        if self.transport == "socket":
+            self._connection = IPCConnection(self.client_id, codec=self.codec)
+            transport = SocketTransport(self._connection)
+            transport.connect(ipc_path, self.connection_timeout)
+            self.sock_writer = self.sock_protocol = transport
+            self._reader_error = None
+            return
         try:
             if sys.platform == "linux" or sys.platform == "darwin":
-                self.sock_reader, self.sock_writer = await asyncio.wait_for(
-                    asyncio.open_unix_connection(ipc_path), self.connection_timeout
+                self.sock_writer, self.sock_protocol = await asyncio.wait_for(
+                    self.loop.create_unix_connection(self._create_protocol, ipc_path),
+                    self.connection_timeout,
                 )
             elif sys.platform == "win32":
-                self.sock_reader = asyncio.StreamReader(loop=self.loop)
-                reader_protocol = asyncio.StreamReaderProtocol(
-                    self.sock_reader, loop=self.loop
-                )
-                self.sock_writer, _ = await asyncio.wait_for(
-                    self.loop.create_pipe_connection(lambda: reader_protocol, ipc_path),
+                self.sock_writer, self.sock_protocol = await asyncio.wait_for(
+                    self.loop.create_pipe_connection(self._create_protocol, ipc_path),
                     self.connection_timeout,
                 )
-        except FileNotFoundError:
+        except (FileNotFoundError, ConnectionRefusedError):
             raise InvalidPipe
         except asyncio.TimeoutError:
             raise ConnectionTimeout
 
-    async def handshake(self):
-        ipc_path = get_ipc_path(self.pipe)
+    async def _find_live_ipc_path(self):
+        if self.loop is None:
+            return get_ipc_path(self.pipe)
+        ranked = await discover_ipc_paths(self.pipe)
+        if ranked and ranked[0].alive:
+            return ranked[0].path
+
+    async def _send_handshake(self, timeout: float) -> Message:
+        """Send the handshake and return Discord's answer to it."""
+        if self.transport == "socket":
+            self.sock_writer.write(self._connection.handshake())
+            return self.sock_protocol.read_message(timeout)
+
+        self._handshake_waiter = self.loop.create_future()
+        try:
+            self.sock_writer.write(self._connection.handshake())
+            # A connection dropped before READY raises InvalidPipe; this sometimes happens for some reason, perhaps discord cannot always accept all the connections?
+            return await asyncio.wait_for(self._handshake_waiter, timeout)
+        except asyncio.TimeoutError:
+            raise ResponseTimeout
+        finally:
+            self._handshake_waiter = None
+
+    def _abandon_connection(self):
+        # Once it is not the client's own connection, losing it goes unreported
+        self._connection = IPCConnection(self.client_id, codec=self.codec)
+        if self.sock_writer is not None:
+            self.sock_writer.close()
+
+    async def _open_discovered(self) -> Message:
+        # Connecting is the real test, so only check for a socket here
+        ipc_path = get_ipc_path(self.pipe, probe="stat")
         if not ipc_path:
             raise DiscordNotFound
 
-        await self.create_reader_writer(ipc_path)
-
-        self.send_data(0, {"v": 1, "client_id": self.client_id})
-        preamble = await self.sock_reader.read(8)
-        if len(preamble) < 8:
-            raise InvalidPipe  # this sometimes happens for some reason, perhaps discord cannot always accept all the connections?
-        code, length = struct.unpack("<ii", preamble)
-        data = json.loads(await self.sock_reader.read(length))
-        if "code" in data:
-            if data["message"] == "Invalid Client ID":
-                raise InvalidID
-            raise DiscordError(data["code"], data["message"])
-        if self._events_on:
-            self.sock_reader.feed_data = self.on_event
+        connected = False
+        try:
+            await self.create_reader_writer(ipc_path)
+            connected = True
+            # A hung Discord's socket may take the connection and never
+            # answer, so the first guess gets no longer than a discovery probe
+            return await self._send_handshake(PROBE_TIMEOUT)
+        except (InvalidPipe, PipeClosed, ConnectionTimeout, ResponseTimeout):
+            # Left behind by a Discord that exited or hung; look for one that
+            # answers
+            self._abandon_connection()
+            clear_ipc_cache()
+            live_path = await self._find_live_ipc_path()
+            if live_path is None:
+                if not connected:
+                    raise DiscordNotFound
+                # Nothing else answers, so give it the full time after all
+                live_path = ipc_path
+            await self.create_reader_writer(live_path)
+            return await self._send_handshake(self.response_timeout)
+
+    async def handshake(self):
+        if self.ipc_path is not None:
+            await self.create_reader_writer(self.ipc_path)
+            message = await self._send_handshake(self.response_timeout)
+        else:
+            message = await self._open_discovered()
+        if message.error is not None:
+            raise message.error
@@ -0,0 +1,113 @@
+"""Shows one presence on every Discord running on this machine."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+
+from .exceptions import DiscordNotFound, InvalidPipe, PipeClosed
+from .presence import AioPresence
+from .utils import discover_ipc_paths, get_event_loop
+
+
+class AioBroadcastPresence:
+    """Fans presence updates out to every live ``discord-ipc-*`` pipe.
+
+    Stable, PTB and Canary each listen on their own pipe; ``connect`` finds
+    all of them that answer and opens an ``AioPresence`` to each with the
+    keyword arguments given here. ``update`` and ``clear`` then run on every
+    connection at once and return a dict mapping each pipe's path to its
+    response, or to the exception it raised. Connections whose pipe has
+    closed are dropped unless they were created with ``reconnect``.
+    """
+
+    def __init__(self, client_id: str, **kwargs):
+        self.client_id = str(client_id)
+        self.presences: dict[str, AioPresence] = {}
+        self._kwargs = kwargs
+
+    async def connect(self) -> dict:
+        """Connect to every live pipe not connected yet.
+
+        Can be called again later to pick up instances started since.
+        Raises ``DiscordNotFound`` when there is nothing to connect to.
+        """
+        paths = [
+            candidate.path
+            for candidate in await discover_ipc_paths()
+            if candidate.alive and candidate.path not in self.presences
+        ]
+        presences = {
+            path: AioPresence(self.client_id, ipc_path=path, **self._kwargs)
+            for path in paths
+        }
+        results = await self._gather(
+            {path: presence.connect() for path, presence in presences.items()}
+        )
+        for path, result in results.items():
+            presence = presences[path]
+            if not isinstance(result, Exception):
+                self.presences[path] = presence
+            elif presence.sock_writer is not None:
+                # The pipe opened but the handshake failed
+                presence.sock_writer.close()
+        if not self.presences:
+            raise DiscordNotFound
+        return results
+
+    async def update(self, **kwargs) -> dict:
+        """Takes the same arguments as ``AioPresence.update``."""
+        return await self._broadcast(
+            {path: p.update(**kwargs) for path, p in self.presences.items()}
+        )
+
+    async def clear(self, pid: int = os.getpid()) -> dict:
+        return await self._broadcast(
+            {path: p.clear(pid) for path, p in self.presences.items()}
+        )
+
+    async def _gather(self, coros: dict) -> dict:
+        results = await asyncio.gather(*coros.values(), return_exceptions=True)
+        return dict(zip(coros, results))
+
+    async def _broadcast(self, coros: dict) -> dict:
+        results = await self._gather(coros)
+        for path, result in results.items():
+            presence = self.presences[path]
+            if isinstance(result, (PipeClosed, InvalidPipe)) and not presence.reconnect:
+                del self.presences[path]
+        return results
+
+    def close(self):
+        """Close every connection, leaving the event loop running."""
+        for presence in self.presences.values():
+            presence.disconnect()
+        self.presences.clear()
+
+
+class BroadcastPresence:
+    """The synchronous ``AioBroadcastPresence``, on a single event loop."""
+
+    def __init__(self, client_id: str, **kwargs):
+        self.loop = get_event_loop(force_fresh=True)
+        self._broadcast = AioBroadcastPresence(client_id, loop=self.loop, **kwargs)
+
+    @property
+    def presences(self) -> dict[str, AioPresence]:
+        return self._broadcast.presences
+
+    def connect(self) -> dict:
+        return self.loop.run_until_complete(self._broadcast.connect())
+
+    def update(self, **kwargs) -> dict:
+        """Takes the same arguments as ``AioPresence.update``."""
+        return self.loop.run_until_complete(self._broadcast.update(**kwargs))
+
+    def clear(self, pid: int = os.getpid()) -> dict:
+        return self.loop.run_until_complete(self._broadcast.clear(pid))
+
+    def close(self):
+        self._broadcast.close()
+        # Let the transports finish closing before the loop goes away
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.loop.close()
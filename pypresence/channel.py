@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from typing import Callable
+
+from .exceptions import InvalidArgument
+
+
+class EventChannel:
+    """Bounded FIFO of event payloads waiting to be dispatched.
+
+    Once ``high_water`` events are queued, ``overflow`` decides what happens
+    to the next one: ``"drop_oldest"`` discards the oldest queued event,
+    ``"drop_newest"`` discards the incoming event, and ``"pause"`` calls
+    ``on_pause`` so the producer stops reading until the backlog has drained
+    to ``low_water``, at which point ``on_resume`` is called.
+    """
+
+    OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "pause")
+
+    def __init__(
+        self,
+        high_water: int = 1024,
+        low_water: int | None = None,
+        overflow: str = "drop_oldest",
+        on_pause: Callable[[], None] | None = None,
+        on_resume: Callable[[], None] | None = None,
+    ):
+        if low_water is None:
+            low_water = high_water // 4
+        if high_water < 1 or not 0 <= low_water <= high_water:
+            raise InvalidArgument(
+                "0 <= low_water <= high_water and high_water >= 1",
+                "low_water={0}, high_water={1}".format(low_water, high_water),
+            )
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise InvalidArgument(" or ".join(self.OVERFLOW_POLICIES), repr(overflow))
+
+        self.high_water = high_water
+        self.low_water = low_water
+        self.overflow = overflow
+        self._on_pause = on_pause
+        self._on_resume = on_resume
+
+        self._items: deque = deque()
+        self._getter: asyncio.Future | None = None
+        self._closed = False
+        self.paused = False
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, item):
+        if self._closed:
+            return
+        if len(self._items) >= self.high_water:
+            if self.overflow == "drop_newest":
+                self.dropped += 1
+                return
+            if self.overflow == "drop_oldest":
+                self._items.popleft()
+                self.dropped += 1
+
+        self._items.append(item)
+        if (
+            self.overflow == "pause"
+            and not self.paused
+            and len(self._items) >= self.high_water
+        ):
+            self.paused = True
+            if self._on_pause is not None:
+                self._on_pause()
+        self._wakeup()
+
+    def close(self):
+        """Stop accepting events; ``get`` returns None once the backlog is empty."""
+        self._closed = True
+        self._wakeup()
+
+    async def get(self):
+        while not self._items:
+            if self._closed:
+                return None
+            self._getter = asyncio.get_running_loop().create_future()
+            try:
+                await self._getter
+            finally:
+                self._getter = None
+
+        item = self._items.popleft()
+        if self.paused and len(self._items) <= self.low_water:
+            self.paused = False
+            if self._on_resume is not None:
+                self._on_resume()
+        return item
+
+    def _wakeup(self):
+        if self._getter is not None and not self._getter.done():
+            self._getter.set_result(None)
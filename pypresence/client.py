@@ -1,21 +1,18 @@
 from __future__ import annotations
 
-import asyncio
 import inspect
-import json
 import os
-import struct
 from typing import Callable, List
 
+from .activity import Activity
 from .baseclient import BaseClient
 from .exceptions import (
     ArgumentError,
-    DiscordError,
     EventNotFound,
     InvalidArgument,
-    PyPresenceException,
 )
 from .payloads import Payload
+from .protocol import event_error
 from .types import ActivityType, StatusDisplayType
 
 
@@ -44,72 +41,36 @@ class Client(BaseClient):
         self.unsubscribe(event, args)
         del self._events[event]
 
-    # noinspection PyProtectedMember
-    def on_event(self, data):
-        if self.sock_reader._eof:
-            raise PyPresenceException("feed_data after feed_eof")
-        if not data:
-            return
-        self.sock_reader._buffer.extend(data)
-        self.sock_reader._wakeup_waiter()
-        if (
-            self.sock_reader._transport is not None
-            and not self.sock_reader._paused
-            and len(self.sock_reader._buffer) > 2 * self.sock_reader._limit
-        ):
-            try:
-                self.sock_reader._transport.pause_reading()
-            except NotImplementedError:
-                self.sock_reader._transport = None
-            else:
-                self.sock_reader._paused = True
-
-        end = 0
-        while end < len(data):
-            # While chunks are available in data
-            start = end + 8
-            status_code, length = struct.unpack("<II", data[end:start])
-            end = length + start
-            payload = json.loads(data[start:end].decode("utf-8"))
-
-            if payload["evt"] is not None:
-                evt = payload["evt"].lower()
-                if evt in self._events:
-                    self._events[evt](payload["data"])
-                elif evt == "error":
-                    raise DiscordError(
-                        payload["data"]["code"], payload["data"]["message"]
-                    )
+    def on_event(self, payload: dict):
+        evt = payload["evt"].lower()
+        if evt in self._events:
+            self._events[evt](payload["data"])
+        elif evt == "error":
+            raise event_error(payload)
 
     def authorize(self, client_id: str, scopes: List[str]):
         payload = Payload.authorize(client_id, scopes)
-        self.send_data(1, payload)
-        return self.loop.run_until_complete(self.read_output())
+        return self._run(self._request(payload))
 
     def authenticate(self, token: str):
         payload = Payload.authenticate(token)
-        self.send_data(1, payload)
-        return self.loop.run_until_complete(self.read_output())
+        return self._run(self._request(payload))
 
     def get_guilds(self):
         payload = Payload.get_guilds()
-        self.send_data(1, payload)
-        return self.loop.run_until_complete(self.read_output())
+        return self._run(self._request(payload))
 
     def get_guild(self, guild_id: str):
         payload = Payload.get_guild(guild_id)
-        self.send_data(1, payload)
-        return self.loop.run_until_complete(self.read_output())
+        return self._run(self._request(payload))
 
     def get_channel(self, channel_id: str):
         payload = Payload.get_channel(channel_id)
-        self.send_data(1, payload)
-        return self.loop.run_until_complete(self.read_output())
+        return self._run(self._request(payload))
 
     def get_channels(self, guild_id: str):
         payload = Payload.get_channels(guild_id)
-        self.send_data(1, payload)
-        return self.loop.run_until_complete(self.read_output())
+        return self._run(self._request(payload))
 
     def set_user_voice_settings(
         self,
@@ -122,23 +83,19 @@ class Client(BaseClient):
         payload = Payload.set_user_voice_settings(
             user_id, pan_left, pan_right, volume, mute
         )
-        self.send_data(1, payload)
-        return self.loop.run_until_complete(self.read_output())
+        return self._run(self._request(payload))
 
     def select_voice_channel(self, channel_id: str):
         payload = Payload.select_voice_channel(channel_id)
-        self.send_data(1, payload)
-        return self.loop.run_until_complete(self.read_output())
+        return self._run(self._request(payload))
 
     def get_selected_voice_channel(self):
         payload = Payload.get_selected_voice_channel()
-        self.send_data(1, payload)
-        return self.loop.run_until_complete(self.read_output())
+        return self._run(self._request(payload))
 
     def select_text_channel(self, channel_id: str):
         payload = Payload.select_text_channel(channel_id)
-        self.send_data(1, payload)
-        return self.loop.run_until_complete(self.read_output())
+        return self._run(self._request(payload))
 
     def set_activity(
         self,
@@ -165,19 +122,20 @@ class Client(BaseClient):
         match: str | None = None,
         buttons: list | None = None,
         instance: bool = True,
+        activity: Activity | None = None,
         payload_override: dict | None = None,
     ):
         if payload_override is None:
-            payload = Payload.set_activity(
+            payload = self._activity(
+                activity,
                 pid=pid,
-                activity_type=activity_type.value if activity_type else None,
-                status_display_type=(
-                    status_display_type.value if status_display_type else None
-                ),
+                activity_type=activity_type,
+                status_display_type=status_display_type,
                 state=state,
                 state_url=state_url,
                 details=details,
                 details_url=details_url,
+                name=name,
                 start=start,
                 end=end,
                 large_image=large_image,
@@ -193,37 +151,32 @@ class Client(BaseClient):
                 match=match,
                 buttons=buttons,
                 instance=instance,
-                activity=True,
             )
         else:
             payload = payload_override
+            activity = None
 
-        self.send_data(1, payload)
-        return self.loop.run_until_complete(self.read_output())
+        return self._run(self._clean_after(activity, self._request(payload)))
 
     def clear_activity(self, pid: int = os.getpid()):
         payload = Payload.set_activity(pid, activity=None)
-        self.send_data(1, payload)
-        return self.loop.run_until_complete(self.read_output())
+        return self._run(self._request(payload))
 
     def subscribe(self, event: str, args=None):
         if args is None:
             args = {}
         payload = Payload.subscribe(event, args)
-        self.send_data(1, payload)
-        return self.loop.run_until_complete(self.read_output())
+        return self._run(self._request(payload))
 
     def unsubscribe(self, event: str, args=None):
         if args is None:
             args = {}
         payload = Payload.unsubscribe(event, args)
-        self.send_data(1, payload)
-        return self.loop.run_until_complete(self.read_output())
+        return self._run(self._request(payload))
 
     def get_voice_settings(self):
         payload = Payload.get_voice_settings()
-        self.send_data(1, payload)
-        return self.loop.run_until_complete(self.read_output())
+        return self._run(self._request(payload))
 
     def set_voice_settings(
         self,
@@ -250,35 +203,33 @@ class Client(BaseClient):
             deaf,
             mute,
         )
-        self.send_data(1, payload)
-        return self.loop.run_until_complete(self.read_output())
+        return self._run(self._request(payload))
 
     def capture_shortcut(self, action: str):
         payload = Payload.capture_shortcut(action)
-        self.send_data(1, payload)
-        return self.loop.run_until_complete(self.read_output())
+        return self._run(self._request(payload))
 
     def send_activity_join_invite(self, user_id: str):
         payload = Payload.send_activity_join_invite(user_id)
-        self.send_data(1, payload)
-        return self.loop.run_until_complete(self.read_output())
+        return self._run(self._request(payload))
 
     def close_activity_request(self, user_id: str):
         payload = Payload.close_activity_request(user_id)
-        self.send_data(1, payload)
-        return self.loop.run_until_complete(self.read_output())
+        return self._run(self._request(payload))
 
     def close(self):
-        self.send_data(2, {"v": 1, "client_id": self.client_id})
-        self.sock_writer.close()
+        self._call(self._stop_reconnect)
+        self._call(self._stop_dispatcher)
+        self._call(self.send_data, 2, {"v": 1, "client_id": self.client_id})
+        self._call(self.sock_writer.close)
         self._closed = True
-        self.loop.close()
+        self._close_loop()
 
     def start(self):
-        self.loop.run_until_complete(self.handshake())
+        return self._run(self.handshake())
 
     def read(self):
-        return self.loop.run_until_complete(self.read_output())
+        return self._run(self.read_output())
 
 
 class AioClient(BaseClient):
@@ -308,64 +259,36 @@ class AioClient(BaseClient):
         await self.unsubscribe(event, args)
         del self._events[event]
 
-    # noinspection PyProtectedMember
-    def on_event(self, data):
-        if self.sock_reader._eof:
-            raise PyPresenceException("feed_data after feed_eof")
-        if not data:
-            return
-        self.sock_reader._buffer.extend(data)
-        self.sock_reader._wakeup_waiter()
-        if (
-            self.sock_reader._transport is not None
-            and not self.sock_reader._paused
-            and len(self.sock_reader._buffer) > 2 * self.sock_reader._limit
-        ):
-            try:
-                self.sock_reader._transport.pause_reading()
-            except NotImplementedError:
-                self.sock_reader._transport = None
-            else:
-                self.sock_reader._paused = True
-
-        payload = json.loads(data[8:].decode("utf-8"))
-
-        if payload["evt"] is not None:
-            evt = payload["evt"].lower()
-            if evt in self._events:
-                asyncio.create_task(self._events[evt](payload["data"]))
-            elif evt == "error":
-                raise DiscordError(payload["data"]["code"], payload["data"]["message"])
+    async def on_event(self, payload: dict):
+        evt = payload["evt"].lower()
+        if evt in self._events:
+            await self._events[evt](payload["data"])
+        elif evt == "error":
+            raise event_error(payload)
 
     async def authorize(self, client_id: str, scopes: List[str]):
         payload = Payload.authorize(client_id, scopes)
-        self.send_data(1, payload)
-        return await self.read_output()
+        return await self._request(payload)
 
     async def authenticate(self, token: str):
         payload = Payload.authenticate(token)
-        self.send_data(1, payload)
-        return await self.read_output()
+        return await self._request(payload)
 
     async def get_guilds(self):
         payload = Payload.get_guilds()
-        self.send_data(1, payload)
-        return await self.read_output()
+        return await self._request(payload)
 
     async def get_guild(self, guild_id: str):
         payload = Payload.get_guild(guild_id)
-        self.send_data(1, payload)
-        return await self.read_output()
+        return await self._request(payload)
 
     async def get_channel(self, channel_id: str):
         payload = Payload.get_channel(channel_id)
-        self.send_data(1, payload)
-        return await self.read_output()
+        return await self._request(payload)
 
     async def get_channels(self, guild_id: str):
         payload = Payload.get_channels(guild_id)
-        self.send_data(1, payload)
-        return await self.read_output()
+        return await self._request(payload)
 
     async def set_user_voice_settings(
         self,
@@ -378,23 +301,19 @@ class AioClient(BaseClient):
         payload = Payload.set_user_voice_settings(
             user_id, pan_left, pan_right, volume, mute
         )
-        self.send_data(1, payload)
-        return await self.read_output()
+        return await self._request(payload)
 
     async def select_voice_channel(self, channel_id: str):
         payload = Payload.select_voice_channel(channel_id)
-        self.send_data(1, payload)
-        return await self.read_output()
+        return await self._request(payload)
 
     async def get_selected_voice_channel(self):
         payload = Payload.get_selected_voice_channel()
-        self.send_data(1, payload)
-        return await self.read_output()
+        return await self._request(payload)
 
     async def select_text_channel(self, channel_id: str):
         payload = Payload.select_text_channel(channel_id)
-        self.send_data(1, payload)
-        return await self.read_output()
+        return await self._request(payload)
 
     async def set_activity(
         self,
@@ -402,14 +321,18 @@ class AioClient(BaseClient):
         activity_type: ActivityType | None = None,
         status_display_type: StatusDisplayType | None = None,
         state: str | None = None,
+        state_url: str | None = None,
         details: str | None = None,
+        details_url: str | None = None,
         name: str | None = None,
         start: int | None = None,
         end: int | None = None,
         large_image: str | None = None,
         large_text: str | None = None,
+        large_url: str | None = None,
         small_image: str | None = None,
         small_text: str | None = None,
+        small_url: str | None = None,
         party_id: str | None = None,
         party_size: list | None = None,
         join: str | None = None,
@@ -417,57 +340,61 @@ class AioClient(BaseClient):
         match: str | None = None,
         buttons: list | None = None,
         instance: bool = True,
+        activity: Activity | None = None,
+        payload_override: dict | None = None,
     ):
-        payload = Payload.set_activity(
-            pid=pid,
-            activity_type=activity_type.value if activity_type else None,
-            status_display_type=(
-                status_display_type.value if status_display_type else None
-            ),
-            state=state,
-            details=details,
-            name=name,
-            start=start,
-            end=end,
-            large_image=large_image,
-            large_text=large_text,
-            small_image=small_image,
-            small_text=small_text,
-            party_id=party_id,
-            party_size=party_size,
-            join=join,
-            spectate=spectate,
-            match=match,
-            buttons=buttons,
-            instance=instance,
-            activity=True,
-        )
-        self.send_data(1, payload)
-        return await self.read_output()
+        if payload_override is None:
+            payload = self._activity(
+                activity,
+                pid=pid,
+                activity_type=activity_type,
+                status_display_type=status_display_type,
+                state=state,
+                state_url=state_url,
+                details=details,
+                details_url=details_url,
+                name=name,
+                start=start,
+                end=end,
+                large_image=large_image,
+                large_text=large_text,
+                large_url=large_url,
+                small_image=small_image,
+                small_text=small_text,
+                small_url=small_url,
+                party_id=party_id,
+                party_size=party_size,
+                join=join,
+                spectate=spectate,
+                match=match,
+                buttons=buttons,
+                instance=instance,
+            )
+        else:
+            payload = payload_override
+            activity = None
+
+        return await self._clean_after(activity, self._request(payload))
 
     async def clear_activity(self, pid: int = os.getpid()):
         payload = Payload.set_activity(pid, activity=None)
-        self.send_data(1, payload)
-        return await self.read_output()
+        return await self._request(payload)
 
     async def subscribe(self, event: str, args=None):
         if args is None:
             args = {}
         payload = Payload.subscribe(event, args)
-        self.send_data(1, payload)
-        return await self.read_output()
+        return await self._request(payload)
 
     async def unsubscribe(self, event: str, args=None):
         if args is None:
             args = {}
         payload = Payload.unsubscribe(event, args)
-        self.send_data(1, payload)
-        return await self.read_output()
+        return await self._request(payload)
 
     async def get_voice_settings(self):
         payload = Payload.get_voice_settings()
-        self.send_data(1, payload)
-        return await self.read_output()
+        return await self._request(payload)
 
     async def set_voice_settings(
         self,
@@ -494,29 +421,27 @@ class AioClient(BaseClient):
             deaf,
             mute,
         )
-        self.send_data(1, payload)
-        return await self.read_output()
+        return await self._request(payload)
 
     async def capture_shortcut(self, action: str):
         payload = Payload.capture_shortcut(action)
-        self.send_data(1, payload)
-        return await self.read_output()
+        return await self._request(payload)
 
     async def send_activity_join_invite(self, user_id: str):
         payload = Payload.send_activity_join_invite(user_id)
-        self.send_data(1, payload)
-        return await self.read_output()
+        return await self._request(payload)
 
     async def close_activity_request(self, user_id: str):
         payload = Payload.close_activity_request(user_id)
-        self.send_data(1, payload)
-        return await self.read_output()
+        return await self._request(payload)
 
     def close(self):
+        self._stop_reconnect()
+        self._stop_dispatcher()
         self.send_data(2, {"v": 1, "client_id": self.client_id})
         self.sock_writer.close()
         self._closed = True
-        self.loop.close()
+        self._close_loop()
 
     async def start(self):
         await self.handshake()
@@ -0,0 +1,94 @@
+"""JSON encoding and decoding for IPC frames, with optional fast backends."""
+
+from __future__ import annotations
+
+import json
+
+from .exceptions import InvalidArgument
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+class Codec:
+    """Turns payloads into JSON bytes and back.
+
+    ``loads`` is given a ``memoryview`` of the receive buffer, so backends
+    that accept one decode without copying the frame first. Any object with
+    the same two methods can be passed as a client's ``codec``.
+    """
+
+    name = "json"
+
+    def dumps(self, obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+    def loads(self, data: bytes | memoryview):
+        return json.loads(bytes(data))
+
+
+class OrjsonCodec(Codec):
+    name = "orjson"
+
+    def dumps(self, obj) -> bytes:
+        return orjson.dumps(obj)
+
+    def loads(self, data: bytes | memoryview):
+        return orjson.loads(data)
+
+
+class MsgspecCodec(Codec):
+    name = "msgspec"
+
+    def __init__(self):
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj) -> bytes:
+        return self._encoder.encode(obj)
+
+    def loads(self, data: bytes | memoryview):
+        return self._decoder.decode(data)
+
+
+_CODECS = {"orjson": OrjsonCodec, "msgspec": MsgspecCodec, "json": Codec}
+_MODULES = {"orjson": orjson, "msgspec": msgspec, "json": json}
+_instances: dict[str, Codec] = {}
+
+
+def is_builtin(codec: Codec) -> bool:
+    """Whether ``codec`` is one of ours rather than one passed in by the user."""
+    return type(codec) in _CODECS.values()
+
+
+def available_codecs() -> list[str]:
+    """Names of the codecs that can be used here, fastest first."""
+    return [name for name in _CODECS if _MODULES[name] is not None]
+
+
+def get_codec(codec: str | Codec = "auto") -> Codec:
+    """Resolve a codec name, or ``"auto"`` for the fastest one installed."""
+    if not isinstance(codec, str):
+        return codec
+    if codec == "auto":
+        codec = available_codecs()[0]
+    if codec not in _CODECS:
+        raise InvalidArgument(
+            "'auto', 'orjson', 'msgspec', 'json' or a Codec", repr(codec)
+        )
+    if _MODULES[codec] is None:
+        raise InvalidArgument(
+            f"one of {available_codecs()}",
+            repr(codec),
+            f"{codec} is not installed.",
+        )
+    if codec not in _instances:
+        _instances[codec] = _CODECS[codec]()
+    return _instances[codec]
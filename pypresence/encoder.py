@@ -0,0 +1,299 @@
+"""Encodes SET_ACTIVITY payloads straight to JSON bytes.
+
+``Payload.set_activity`` builds a nested dict with every field, prunes the
+``None`` values with ``remove_none`` and leaves the codec to serialize the
+rest. ``encode_activity`` produces the same JSON by writing only the fields
+that are present next to key fragments prepared once at import.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from collections import OrderedDict
+from json.encoder import encode_basestring_ascii
+
+from .activity import FIELDS
+from .codec import Codec
+from .payloads import Payload
+from .types import ActivityType, StatusDisplayType
+from .validation import STRICT, validate_activity
+
+
+def _field(group: str | None, name: str, key: str | None = None):
+    key = key or name
+    if group is None:
+        return None, f',"{key}":', f',"{key}":'
+    # The first field present in a group also opens it
+    return group, f',"{group}":{{"{key}":', f',"{key}":'
+
+
+# Every field after "type" and "status_display_type", in the order
+# Payload.set_activity writes them
+_FIELDS = (
+    _field(None, "state"),
+    _field(None, "state_url"),
+    _field(None, "details"),
+    _field(None, "details_url"),
+    _field(None, "name"),
+    _field("timestamps", "start"),
+    _field("timestamps", "end"),
+    _field("assets", "large_image"),
+    _field("assets", "large_text"),
+    _field("assets", "large_url"),
+    _field("assets", "small_image"),
+    _field("assets", "small_text"),
+    _field("assets", "small_url"),
+    _field("party", "party_id", "id"),
+    _field("party", "party_size", "size"),
+    _field("secrets", "join"),
+    _field("secrets", "spectate"),
+    _field("secrets", "match"),
+    _field(None, "buttons"),
+    _field(None, "instance"),
+)
+_TOP, _TIMESTAMPS, _REST = _FIELDS[:5], _FIELDS[5:7], _FIELDS[7:]
+# The fields above, by their update() names, without the timestamps
+_VALIDATED = FIELDS[2:7] + FIELDS[9:]
+_HEAD = '{"cmd":"SET_ACTIVITY","args":{'
+_DEFAULT_TYPE = str(ActivityType.PLAYING.value)
+_DEFAULT_DISPLAY = str(StatusDisplayType.NAME.value)
+_STDLIB = Codec()
+
+
+class EncodedPayload(Payload):
+    """A payload encoded ahead of time, with the nonce added when sent.
+
+    ``head`` is the JSON of everything but the nonce, which doubles as the
+    fingerprint; ``data`` is only decoded if something asks for it.
+    """
+
+    cmd = "SET_ACTIVITY"
+
+    def __init__(self, head: bytes, nonce: str):
+        self.head = head
+        self.nonce = nonce
+        self._data = None
+
+    @property
+    def body(self) -> bytes:
+        return b'%s,"nonce":"%s"}' % (self.head, self.nonce.encode("ascii"))
+
+    @property
+    def data(self) -> dict:
+        # The nonce changes when a client numbers the payload for sending
+        if self._data is None or self._data["nonce"] != self.nonce:
+            self._data = json.loads(self.body)
+        return self._data
+
+    @property
+    def fingerprint(self) -> str:
+        return self.head.decode("utf-8")
+
+
+class FrameCache:
+    """An LRU cache of encoded activities, keyed by everything but timestamps.
+
+    Apps tend to cycle through a handful of activities; a hit skips
+    encoding entirely, leaving only the timestamps and the nonce to be
+    spliced in. ``hits`` and ``misses`` count lookups.
+    """
+
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, tuple[bytes, bytes]] = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key: tuple) -> tuple[bytes, bytes] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: tuple, entry: tuple[bytes, bytes]):
+        self._entries[key] = entry
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+
+def _write(parts: list, fields: tuple, values: tuple, codec: Codec):
+    append = parts.append
+    group = None
+    for (field_group, opening, key), value in zip(fields, values):
+        if value is None:
+            continue
+        if field_group is group:
+            append(key)
+        else:
+            if group is not None:
+                append("}")
+            append(opening)
+            group = field_group
+        kind = value.__class__
+        if kind is str:
+            append(encode_basestring_ascii(value))
+        elif kind is int:
+            append(str(value))
+        elif value is True:
+            append("true")
+        elif value is False:
+            append("false")
+        else:
+            append(codec.dumps(value).decode("utf-8"))
+    if group is not None:
+        append("}")
+
+
+def _enum_value(value, enum, default: str) -> str:
+    if value is None:
+        return default
+    if isinstance(value, int):
+        value = enum(value)
+    return str(value.value) if isinstance(value, enum) else default
+
+
+def _cache_key(pid, activity_type, status_display_type, top: tuple, rest: tuple):
+    # Lists can't be hashed; their repr tells apart what would encode
+    # differently, like True from 1
+    party_size, buttons = rest[7], rest[11]
+    return (
+        pid,
+        activity_type,
+        status_display_type,
+        *top,
+        *rest[:7],
+        repr(party_size),
+        *rest[8:11],
+        repr(buttons),
+        rest[12],
+    )
+
+
+def _encode_entry(
+    pid,
+    activity_type,
+    status_display_type,
+    top: tuple,
+    rest: tuple,
+    codec: Codec,
+    validation: str | None,
+) -> tuple[bytes, bytes]:
+    """The JSON before and after the timestamps."""
+    if validation is not None:
+        fields = validate_activity(dict(zip(_VALIDATED, top + rest)), validation)
+        values = tuple(fields.values())
+        top, rest = values[: len(top)], values[len(top) :]
+    parts = [_HEAD]
+    append = parts.append
+    if pid is not None:
+        append('"pid":')
+        append(str(pid) if pid.__class__ is int else codec.dumps(pid).decode())
+        append(",")
+    append('"activity":{"type":')
+    append(_enum_value(activity_type, ActivityType, _DEFAULT_TYPE))
+    append(',"status_display_type":')
+    append(_enum_value(status_display_type, StatusDisplayType, _DEFAULT_DISPLAY))
+    _write(parts, _TOP, top, codec)
+    before = "".join(parts).encode("utf-8")
+    parts = []
+    _write(parts, _REST, rest, codec)
+    parts.append("}}")
+    return before, "".join(parts).encode("utf-8")
+
+
+def encode_activity(
+    pid: int = os.getpid(),
+    activity_type: ActivityType | int | None = None,
+    status_display_type: StatusDisplayType | int | None = None,
+    state: str | None = None,
+    state_url: str | None = None,
+    details: str | None = None,
+    details_url: str | None = None,
+    name: str | None = None,
+    start: int | float | None = None,
+    end: int | float | None = None,
+    large_image: str | None = None,
+    large_text: str | None = None,
+    large_url: str | None = None,
+    small_image: str | None = None,
+    small_text: str | None = None,
+    small_url: str | None = None,
+    party_id: str | None = None,
+    party_size: list | None = None,
+    join: str | None = None,
+    spectate: str | None = None,
+    match: str | None = None,
+    buttons: list | None = None,
+    instance: bool = True,
+    codec: Codec = _STDLIB,
+    cache: FrameCache | None = None,
+    validation: str | None = STRICT,
+) -> EncodedPayload:
+    """``Payload.set_activity`` with an activity, encoded directly.
+
+    Strings and integers are written here; anything else, like the
+    ``buttons`` list, is left to ``codec``. With a ``cache``, the JSON on
+    either side of the timestamps is reused for an activity seen before,
+    and only the timestamps are validated again.
+    """
+    if validation is not None and (start is not None or end is not None):
+        validate_activity({"start": start, "end": end}, validation)
+    if start:
+        start = int(start)
+    if end:
+        end = int(end)
+    timestamps = b""
+    if start is not None or end is not None:
+        parts = []
+        _write(parts, _TIMESTAMPS, (start, end), codec)
+        timestamps = "".join(parts).encode("utf-8")
+
+    top = (state, state_url, details, details_url, name)
+    rest = (
+        large_image,
+        large_text,
+        large_url,
+        small_image,
+        small_text,
+        small_url,
+        party_id,
+        party_size,
+        join,
+        spectate,
+        match,
+        buttons,
+        instance,
+    )
+    entry = key = None
+    if cache is not None:
+        key = _cache_key(pid, activity_type, status_display_type, top, rest)
+        try:
+            entry = cache.get(key)
+        except TypeError:
+            # Something unhashable where a string was expected
+            cache = None
+
+    if entry is None:
+        entry = _encode_entry(
+            pid, activity_type, status_display_type, top, rest, codec, validation
+        )
+        if cache is not None:
+            cache.put(key, entry)
+
+    return EncodedPayload(b"".join((entry[0], timestamps, entry[1])), Payload.nonce())
@@ -0,0 +1,106 @@
+"""Requests sent to Discord that are still waiting for their response."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Callable, Iterator
+
+
+class Request:
+    """One command on the wire, keyed by its nonce."""
+
+    __slots__ = ("nonce", "cmd", "sent_at", "future", "latency", "_clock")
+
+    def __init__(
+        self,
+        nonce: str,
+        cmd: str | None,
+        future: asyncio.Future | None,
+        clock: Callable[[], float],
+    ):
+        self.nonce = nonce
+        self.cmd = cmd
+        self.future = future
+        self.sent_at = clock()
+        # Seconds between sending and the response, once it arrived
+        self.latency: float | None = None
+        self._clock = clock
+
+    @property
+    def age(self) -> float:
+        return self._clock() - self.sent_at
+
+    def __repr__(self):
+        return f"Request(nonce={self.nonce!r}, cmd={self.cmd!r}, age={self.age:.3f})"
+
+
+class InFlight:
+    """Index of the requests a client has sent and not yet read the reply to.
+
+    Requests are kept in the order they were sent. ``timeouts`` counts the
+    requests given up on, ``completed`` those answered, and
+    ``last_latency`` is the round trip of the most recent answer.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._requests: dict[str, Request] = {}
+        self.completed = 0
+        self.timeouts = 0
+        self.last_latency: float | None = None
+
+    def __len__(self):
+        return len(self._requests)
+
+    def __contains__(self, nonce):
+        return nonce in self._requests
+
+    def __iter__(self) -> Iterator[Request]:
+        return iter(list(self._requests.values()))
+
+    @property
+    def outstanding(self) -> int:
+        return len(self._requests)
+
+    def add(
+        self, nonce: str, cmd: str | None = None, future: asyncio.Future | None = None
+    ) -> Request:
+        request = self._requests[nonce] = Request(nonce, cmd, future, self._clock)
+        return request
+
+    def get(self, nonce) -> Request | None:
+        return self._requests.get(nonce)
+
+    def oldest(self) -> Request | None:
+        return next(iter(self._requests.values()), None)
+
+    def answered(self, nonce) -> Request | None:
+        """Record that the response to ``nonce`` arrived."""
+        request = self._requests.get(nonce)
+        if request is not None and request.latency is None:
+            request.latency = self.last_latency = request.age
+            self.completed += 1
+        return request
+
+    def pop(self, nonce) -> Request | None:
+        return self._requests.pop(nonce, None)
+
+    def timed_out(self, nonce) -> Request | None:
+        """Give up on ``nonce``; a late reply to it will be dropped."""
+        request = self._requests.pop(nonce, None)
+        if request is not None:
+            self.timeouts += 1
+        return request
+
+    def expired(self, timeout: float) -> list[Request]:
+        """Requests that have waited longer than ``timeout`` seconds."""
+        now = self._clock()
+        return [r for r in self._requests.values() if now - r.sent_at > timeout]
+
+    def fail(self, error: Callable[[], BaseException]):
+        """Fail every waiting request with a fresh ``error()``."""
+        for request in self._requests.values():
+            if request.future is not None and not request.future.done():
+                request.future.set_exception(error())
+        self._requests.clear()
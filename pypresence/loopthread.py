@@ -0,0 +1,84 @@
+"""A long-lived asyncio event loop running in a background thread."""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Callable
+
+from .exceptions import PyPresenceException
+
+
+class LoopThread:
+    """Runs an event loop forever in a daemon thread.
+
+    The synchronous clients submit their coroutines here instead of starting
+    and stopping a loop for every command, which also makes them safe to call
+    from several threads at once: all socket and protocol state is only ever
+    touched from the loop's own thread.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop | None = None,
+        name: str = "pypresence-loop",
+    ):
+        self.loop = loop if loop is not None else asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._main, name=name, daemon=True)
+        self._started = threading.Event()
+
+    def _main(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._started.set)
+        try:
+            self.loop.run_forever()
+        finally:
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+
+    def start(self):
+        if not self._thread.is_alive():
+            self._thread.start()
+            self._started.wait()
+
+    def is_current(self) -> bool:
+        """Whether the caller is running on the loop's thread."""
+        return threading.current_thread() is self._thread
+
+    def submit(self, coro) -> concurrent.futures.Future:
+        """Schedule ``coro`` on the loop and return a future for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro):
+        """Run ``coro`` on the loop and wait for its result."""
+        if self.is_current():
+            coro.close()
+            raise PyPresenceException(
+                "Blocking calls cannot be made from the client's own event loop "
+                "thread, use blocking=False instead"
+            )
+        return self.submit(coro).result()
+
+    def call(self, func: Callable, *args):
+        """Call ``func`` on the loop's thread and wait for its result."""
+        if self.is_current():
+            return func(*args)
+
+        async def _call():
+            return func(*args)
+
+        return self.submit(_call()).result()
+
+    def stop(self):
+        """Stop the loop, cancel whatever is still running on it and close it."""
+        if self._thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            if not self.is_current():
+                self._thread.join()
+        elif not self.loop.is_closed():
+            self.loop.close()
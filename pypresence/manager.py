@@ -0,0 +1,66 @@
+"""Presences for many application IDs sharing one event loop."""
+
+from __future__ import annotations
+
+import threading
+
+from .loopthread import LoopThread
+from .presence import Presence
+
+
+class PresenceManager:
+    """Hands out one connected ``Presence`` per client ID, all on one loop.
+
+    Every presence runs on the manager's background loop thread, so
+    switching between applications opens and closes IPC connections but
+    never event loops. Keyword arguments given here are the defaults for
+    each presence; those given to ``get`` override them.
+    """
+
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+        self._loop_thread = LoopThread(name="pypresence-manager")
+        self._loop_thread.start()
+        self._presences: dict[str, Presence] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        return self._loop_thread.loop
+
+    @property
+    def client_ids(self) -> list[str]:
+        return list(self._presences)
+
+    def get(self, client_id: str, **kwargs) -> Presence:
+        """The presence for ``client_id``, connecting it the first time."""
+        client_id = str(client_id)
+        with self._lock:
+            presence = self._presences.get(client_id)
+            if presence is None:
+                presence = Presence(
+                    client_id,
+                    **{**self._kwargs, **kwargs},
+                    loop_thread=self._loop_thread,
+                )
+                presence.connect()
+                self._presences[client_id] = presence
+        return presence
+
+    def release(self, client_id: str):
+        """Close the connection for ``client_id``; the loop keeps running."""
+        with self._lock:
+            presence = self._presences.pop(str(client_id), None)
+        if presence is not None:
+            presence.close()
+
+    def close(self):
+        for client_id in self.client_ids:
+            self.release(client_id)
+        self._loop_thread.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
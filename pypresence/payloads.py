@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+import itertools
 import json
 import os
 import time
 
+from .activity import FIELD_SET
 from .types import ActivityType, StatusDisplayType
 from .utils import remove_none
+from .validation import STRICT, validate_activity
+
+_nonces = itertools.count(1)
 
 
 class Payload:
@@ -14,14 +19,32 @@ class Payload:
         if clear_none:
             data = remove_none(data)
         self.data = data
+        self._fingerprint = None
 
     def __str__(self):
         return json.dumps(self.data, indent=2)
 
+    @property
+    def fingerprint(self) -> str:
+        """Canonical JSON of everything but the nonce, for spotting repeats."""
+        if self._fingerprint is None:
+            data = {key: value for key, value in self.data.items() if key != "nonce"}
+            self._fingerprint = json.dumps(data, sort_keys=True, separators=(",", ":"))
+        return self._fingerprint
+
     @staticmethod
     def time():
         return time.time()
 
+    @staticmethod
+    def nonce() -> str:
+        """A nonce unique within this process.
+
+        Clients number requests again from their own counter as they send
+        them; this only keeps payloads built on their own well-formed.
+        """
+        return str(next(_nonces))
+
     @classmethod
     def set_activity(
         cls,
@@ -50,7 +73,18 @@ class Payload:
         instance: bool = True,
         activity: bool | None = True,
         _rn: bool = True,
+        validation: str | None = STRICT,
     ):
+        if activity is not None and validation is not None:
+            # Every parameter but pid is an activity field
+            fields = {
+                name: value for name, value in locals().items() if name in FIELD_SET
+            }
+            checked = validate_activity(fields, validation)
+            if checked is not fields:
+                return cls.set_activity(
+                    pid, activity=activity, _rn=_rn, validation=None, **checked
+                )
 
         # They should already be an int because we give typehints, but some people are fucking stupid and use
         # IDLE or some other stupid shit.
@@ -103,7 +137,7 @@ class Payload:
         payload = {
             "cmd": "SET_ACTIVITY",
             "args": {"pid": pid, "activity": act_details},
-            "nonce": "{:.20f}".format(cls.time()),
+            "nonce": cls.nonce(),
         }
         if _rn:
             clear = _rn
@@ -114,7 +148,7 @@ class Payload:
         payload = {
             "cmd": "AUTHORIZE",
             "args": {"client_id": str(client_id), "scopes": scopes},
-            "nonce": "{:.20f}".format(cls.time()),
+            "nonce": cls.nonce(),
         }
         return cls(payload)
 
@@ -123,7 +157,7 @@ class Payload:
         payload = {
             "cmd": "AUTHENTICATE",
             "args": {"access_token": token},
-            "nonce": "{:.20f}".format(cls.time()),
+            "nonce": cls.nonce(),
         }
 
         return cls(payload)
@@ -133,7 +167,7 @@ class Payload:
         payload = {
             "cmd": "GET_GUILDS",
             "args": {},
-            "nonce": "{:.20f}".format(cls.time()),
+            "nonce": cls.nonce(),
         }
 
         return cls(payload)
@@ -145,7 +179,7 @@ class Payload:
             "args": {
                 "guild_id": str(guild_id),
             },
-            "nonce": "{:.20f}".format(cls.time()),
+            "nonce": cls.nonce(),
         }
 
         return cls(payload)
@@ -157,7 +191,7 @@ class Payload:
             "args": {
                 "guild_id": str(guild_id),
             },
-            "nonce": "{:.20f}".format(cls.time()),
+            "nonce": cls.nonce(),
         }
 
         return cls(payload)
@@ -169,7 +203,7 @@ class Payload:
             "args": {
                 "channel_id": str(channel_id),
             },
-            "nonce": "{:.20f}".format(cls.time()),
+            "nonce": cls.nonce(),
         }
 
         return cls(payload)
@@ -191,7 +225,7 @@ class Payload:
                 "volume": volume,
                 "mute": mute,
             },
-            "nonce": "{:.20f}".format(cls.time()),
+            "nonce": cls.nonce(),
         }
 
         return cls(payload, True)
@@ -203,7 +237,7 @@ class Payload:
             "args": {
                 "channel_id": str(channel_id),
             },
-            "nonce": "{:.20f}".format(cls.time()),
+            "nonce": cls.nonce(),
         }
 
         return cls(payload)
@@ -213,7 +247,7 @@ class Payload:
         payload = {
             "cmd": "GET_SELECTED_VOICE_CHANNEL",
             "args": {},
-            "nonce": "{:.20f}".format(cls.time()),
+            "nonce": cls.nonce(),
         }
 
         return cls(payload)
@@ -225,7 +259,7 @@ class Payload:
             "args": {
                 "channel_id": str(channel_id),
             },
-            "nonce": "{:.20f}".format(cls.time()),
+            "nonce": cls.nonce(),
         }
 
         return cls(payload)
@@ -238,7 +272,7 @@ class Payload:
             "cmd": "SUBSCRIBE",
             "args": args,
             "evt": event.upper(),
-            "nonce": "{:.20f}".format(cls.time()),
+            "nonce": cls.nonce(),
         }
 
         return cls(payload)
@@ -251,7 +285,7 @@ class Payload:
             "cmd": "UNSUBSCRIBE",
             "args": args,
             "evt": event.upper(),
-            "nonce": "{:.20f}".format(cls.time()),
+            "nonce": cls.nonce(),
         }
 
         return cls(payload)
@@ -261,7 +295,7 @@ class Payload:
         payload = {
             "cmd": "GET_VOICE_SETTINGS",
             "args": {},
-            "nonce": "{:.20f}".format(cls.time()),
+            "nonce": cls.nonce(),
         }
 
         return cls(payload)
@@ -294,7 +328,7 @@ class Payload:
                 "deaf": deaf,
                 "mute": mute,
             },
-            "nonce": "{:.20f}".format(cls.time()),
+            "nonce": cls.nonce(),
         }
 
         return cls(payload, True)
@@ -304,7 +338,7 @@ class Payload:
         payload = {
             "cmd": "CAPTURE_SHORTCUT",
             "args": {"action": action.upper()},
-            "nonce": "{:.20f}".format(cls.time()),
+            "nonce": cls.nonce(),
         }
 
         return cls(payload)
@@ -314,7 +348,7 @@ class Payload:
         payload = {
             "cmd": "SEND_ACTIVITY_JOIN_INVITE",
             "args": {"user_id": str(user_id)},
-            "nonce": "{:.20f}".format(cls.time()),
+            "nonce": cls.nonce(),
         }
 
         return cls(payload)
@@ -324,7 +358,7 @@ class Payload:
         payload = {
             "cmd": "CLOSE_ACTIVITY_REQUEST",
             "args": {"user_id": str(user_id)},
-            "nonce": "{:.20f}".format(cls.time()),
+            "nonce": cls.nonce(),
         }
 
         return cls(payload)
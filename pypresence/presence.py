@@ -3,15 +3,30 @@ from __future__ import annotations
 import os
 import sys
 
+from .activity import Activity
 from .baseclient import BaseClient
+from .exceptions import ServerError
 from .payloads import Payload
+from .scheduler import ActivityScheduler, is_rate_limited
 from .types import ActivityType, StatusDisplayType
 from .utils import get_event_loop
 
 
+def _is_applied(presence: Presence | AioPresence, payload: Payload) -> bool:
+    # Nothing waits in the scheduler and Discord already shows this activity
+    return (
+        presence._applied is not None
+        and (presence.scheduler is None or presence.scheduler.pending is None)
+        and presence._applied[0] == payload.fingerprint
+    )
+
+
 class Presence(BaseClient):
 
     def __init__(self, *args, **kwargs):
+        self.scheduler: ActivityScheduler | None = kwargs.pop("scheduler", None)
+        # (fingerprint, response) of the last activity Discord accepted
+        self._applied: tuple[str, dict] | None = None
         super().__init__(*args, **kwargs)
 
     def update(
@@ -39,15 +54,16 @@ class Presence(BaseClient):
         match: str | None = None,
         buttons: list | None = None,
         instance: bool = True,
+        activity: Activity | None = None,
         payload_override: dict | None = None,
+        force: bool = False,
     ):
         if payload_override is None:
-            payload = Payload.set_activity(
+            payload = self._activity(
+                activity,
                 pid=pid,
-                activity_type=activity_type.value if activity_type else None,
-                status_display_type=(
-                    status_display_type.value if status_display_type else None
-                ),
+                activity_type=activity_type,
+                status_display_type=status_display_type,
                 state=state,
                 state_url=state_url,
                 details=details,
@@ -68,25 +84,70 @@ class Presence(BaseClient):
                 match=match,
                 buttons=buttons,
                 instance=instance,
-                activity=True,
             )
         else:
-            payload = payload_override
-        self.send_data(1, payload)
-        return self.loop.run_until_complete(self.read_output())
+            payload = Payload(payload_override, clear_none=False)
+            activity = None
+        return self._run(self._clean_after(activity, self._update(payload, force)))
 
     def clear(self, pid: int = os.getpid()):
         payload = Payload.set_activity(pid, activity=None)
-        self.send_data(1, payload)
-        return self.loop.run_until_complete(self.read_output())
+        return self._run(self._update(payload, force=True))
+
+    def flush(self):
+        """Send the update held back by the scheduler, waiting for a token."""
+        return self._run(self._flush())
+
+    async def _update(self, payload: Payload, force: bool = False):
+        if not force and _is_applied(self, payload):
+            return self._applied[1]
+        if self.scheduler is not None:
+            payload = self.scheduler.offer(payload)
+            if payload is None:
+                return None
+        return await self._send_activity(payload)
+
+    async def _flush(self):
+        if self.scheduler is None or self.scheduler.pending is None:
+            return None
+        await self._sleep(self.scheduler.delay())
+        payload = self.scheduler.take()
+        if payload is None:
+            return None
+        return await self._send_activity(payload)
+
+    async def _send_activity(self, payload):
+        try:
+            response = await self._request(payload)
+        except ServerError as e:
+            if self.scheduler is None or not is_rate_limited(e):
+                raise
+            self.scheduler.rate_limited()
+            if not self.scheduler.adaptive:
+                raise
+            # Retry on the next update or flush unless a newer one replaces it
+            if self.scheduler.pending is None:
+                self.scheduler.pending = payload
+            return None
+        if self.scheduler is not None:
+            self.scheduler.succeeded()
+        self._applied = (payload.fingerprint, response)
+        return response
 
     def connect(self):
-        self.update_event_loop(get_event_loop())
-        self.loop.run_until_complete(self.handshake())
+        self._applied = None
+        if self.transport == "asyncio" and self._loop_thread is None:
+            self.update_event_loop(get_event_loop())
+        return self._run(self.handshake())
 
     def close(self):
-        self.send_data(2, {"v": 1, "client_id": self.client_id})
-        self.loop.close()
+        self._call(self._stop_reconnect)
+        if self.scheduler is not None:
+            self._call(self.scheduler.cancel)
+        self._call(self.send_data, 2, {"v": 1, "client_id": self.client_id})
+        if self._loop_thread is not None or self.transport == "socket":
+            self._call(self.sock_writer.close)
+        self._close_loop()
         if sys.platform == "win32":
             self.sock_writer._call_connection_lost(None)
 
@@ -94,6 +155,9 @@ class Presence(BaseClient):
 class AioPresence(BaseClient):
 
     def __init__(self, *args, **kwargs):
+        self.scheduler: ActivityScheduler | None = kwargs.pop("scheduler", None)
+        # (fingerprint, response) of the last activity Discord accepted
+        self._applied: tuple[str, dict] | None = None
         super().__init__(*args, **kwargs, isasync=True)
 
     async def update(
@@ -121,47 +185,79 @@ class AioPresence(BaseClient):
         match: str | None = None,
         buttons: list | None = None,
         instance: bool = True,
+        activity: Activity | None = None,
+        payload_override: dict | None = None,
+        force: bool = False,
     ):
-        payload = Payload.set_activity(
-            pid=pid,
-            activity_type=activity_type,
-            status_display_type=status_display_type,
-            state=state,
-            state_url=state_url,
-            details=details,
-            details_url=details_url,
-            name=name,
-            start=start,
-            end=end,
-            large_image=large_image,
-            large_text=large_text,
-            large_url=large_url,
-            small_image=small_image,
-            small_text=small_text,
-            small_url=small_url,
-            party_id=party_id,
-            party_size=party_size,
-            join=join,
-            spectate=spectate,
-            match=match,
-            buttons=buttons,
-            instance=instance,
-            activity=True,
-        )
-        self.send_data(1, payload)
-        return await self.read_output()
+        if payload_override is None:
+            payload = self._activity(
+                activity,
+                pid=pid,
+                activity_type=activity_type,
+                status_display_type=status_display_type,
+                state=state,
+                state_url=state_url,
+                details=details,
+                details_url=details_url,
+                name=name,
+                start=start,
+                end=end,
+                large_image=large_image,
+                large_text=large_text,
+                large_url=large_url,
+                small_image=small_image,
+                small_text=small_text,
+                small_url=small_url,
+                party_id=party_id,
+                party_size=party_size,
+                join=join,
+                spectate=spectate,
+                match=match,
+                buttons=buttons,
+                instance=instance,
+            )
+        else:
+            payload = Payload(payload_override, clear_none=False)
+            activity = None
+        return await self._clean_after(activity, self._update(payload, force))
 
     async def clear(self, pid: int = os.getpid()):
         payload = Payload.set_activity(pid, activity=None)
-        self.send_data(1, payload)
-        return await self.read_output()
+        return await self._schedule_activity(payload)
+
+    async def _update(self, payload: Payload, force: bool = False):
+        if not force and _is_applied(self, payload):
+            return self._applied[1]
+        return await self._schedule_activity(payload)
+
+    async def _schedule_activity(self, payload):
+        if self.scheduler is not None:
+            return await self.scheduler.submit(payload, self._send_activity)
+        return await self._send_activity(payload)
+
+    async def _send_activity(self, payload):
+        response = await self._request(payload)
+        self._applied = (payload.fingerprint, response)
+        return response
 
     async def connect(self):
+        self._applied = None
         self.update_event_loop(get_event_loop())
         await self.handshake()
 
-    def close(self):
+    def _shutdown(self):
+        self._stop_reconnect()
+        if self.scheduler is not None:
+            self.scheduler.cancel()
         self.send_data(2, {"v": 1, "client_id": self.client_id})
-        self.loop.close()
+
+    def disconnect(self):
+        """Close the connection, leaving the event loop running."""
+        self._shutdown()
+        self.sock_writer.close()
+
+    def close(self):
+        self._shutdown()
+        self._close_loop()
         if sys.platform == "win32":
             self.sock_writer._call_connection_lost(None)
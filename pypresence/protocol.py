@@ -0,0 +1,233 @@
+"""The Discord IPC protocol, independent of any I/O."""
+
+from __future__ import annotations
+
+import struct
+from typing import NamedTuple
+
+from .codec import Codec, get_codec
+from .exceptions import DiscordError, InvalidID, PyPresenceException, ServerError
+
+# Every frame is a little-endian (opcode, length) header followed by a JSON body
+FRAME_HEADER = struct.Struct("<II")
+
+OP_HANDSHAKE = 0
+OP_FRAME = 1
+OP_CLOSE = 2
+OP_PING = 3
+OP_PONG = 4
+
+# Smallest free space handed to the socket when it does not ask for a size
+MIN_READ_SIZE = 4096
+
+
+class FrameDecoder:
+    """Incrementally splits a byte stream into IPC frames.
+
+    Data can be fed in chunks of any size: partial frames are buffered until
+    the rest arrives, and a chunk holding several frames yields all of them.
+    Besides ``feed``, the decoder exposes ``get_buffer``/``buffer_updated`` so
+    a socket can receive straight into its buffer without an extra copy.
+    """
+
+    def __init__(self, buffer_size: int = 64 * 1024, codec: Codec | None = None):
+        self.codec = codec or get_codec()
+        self._buffer = bytearray(buffer_size)
+        self._start = 0  # first byte that has not been parsed yet
+        self._end = 0  # one past the last byte received
+
+    def __len__(self):
+        return self._end - self._start
+
+    def get_buffer(self, sizehint: int = -1) -> memoryview:
+        pending = self._end - self._start
+        needed = sizehint if sizehint > 0 else MIN_READ_SIZE
+        if pending >= FRAME_HEADER.size:
+            # Make room for the whole of the frame we are in the middle of
+            _, length = FRAME_HEADER.unpack_from(self._buffer, self._start)
+            needed = max(needed, FRAME_HEADER.size + length - pending)
+
+        if len(self._buffer) - self._end < needed:
+            if pending + needed > len(self._buffer):
+                buffer = bytearray(max(len(self._buffer) * 2, pending + needed))
+            else:
+                buffer = self._buffer
+            buffer[:pending] = self._buffer[self._start : self._end]
+            self._buffer = buffer
+            self._start, self._end = 0, pending
+
+        return memoryview(self._buffer)[self._end :]
+
+    def buffer_updated(self, nbytes: int) -> list[tuple[int, dict]]:
+        self._end += nbytes
+
+        buffer = self._buffer
+        view = memoryview(buffer)
+        loads = self.codec.loads
+        frames = []
+        offset = self._start
+        header_size = FRAME_HEADER.size
+        while self._end - offset >= header_size:
+            op, length = FRAME_HEADER.unpack_from(buffer, offset)
+            start = offset + header_size
+            end = start + length
+            if self._end < end:
+                break
+            frames.append((op, loads(view[start:end])))
+            offset = end
+
+        if offset == self._end:
+            self._start = self._end = 0
+        else:
+            self._start = offset
+        return frames
+
+    def feed(self, data: bytes) -> list[tuple[int, dict]]:
+        with self.get_buffer(len(data)) as buffer:
+            buffer[: len(data)] = data
+        return self.buffer_updated(len(data))
+
+
+def encode_frame(op: int, payload: dict, codec: Codec | None = None) -> bytes:
+    data = (codec or get_codec()).dumps(payload)
+    return FRAME_HEADER.pack(op, len(data)) + data
+
+
+def handshake_error(payload: dict) -> PyPresenceException | None:
+    if "code" not in payload:
+        return None
+    if payload.get("message") == "Invalid Client ID":
+        return InvalidID()
+    return DiscordError(payload["code"], payload.get("message"))
+
+
+def response_error(payload: dict) -> PyPresenceException | None:
+    if payload.get("evt") != "ERROR":
+        return None
+    return ServerError(payload["data"]["message"])
+
+
+def event_error(payload: dict) -> PyPresenceException | None:
+    if payload.get("evt") != "ERROR":
+        return None
+    data = payload.get("data") or {}
+    return DiscordError(data.get("code"), data.get("message"))
+
+
+# Kinds of Message
+HANDSHAKE = "handshake"
+EVENT = "event"
+RESPONSE = "response"
+CLOSED = "closed"
+
+
+class Message(NamedTuple):
+    """A frame received from Discord, classified by the connection."""
+
+    kind: str
+    payload: dict
+
+    @property
+    def nonce(self) -> str | None:
+        return self.payload.get("nonce")
+
+    @property
+    def error(self) -> PyPresenceException | None:
+        """The exception this message reports, if any."""
+        if self.kind == HANDSHAKE:
+            return handshake_error(self.payload)
+        if self.kind == RESPONSE:
+            return response_error(self.payload)
+        if self.kind == EVENT:
+            return event_error(self.payload)
+        return DiscordError(self.payload.get("code"), self.payload.get("message"))
+
+
+class IPCConnection:
+    """State machine for one connection to the Discord client.
+
+    It performs no I/O: front ends pass it the bytes they receive (``receive``
+    or ``get_buffer``/``buffer_updated``) and get back the resulting
+    ``Message`` objects, and write out the bytes it produces. Pings are
+    answered automatically; the pongs are collected by ``data_to_send``.
+
+    The connection starts ``IDLE``, is ``CONNECTING`` once the handshake has
+    been sent and ``CONNECTED`` when Discord accepted it. It is ``CLOSING``
+    after we sent a close frame, and ``CLOSED`` when Discord rejected the
+    handshake or closed the connection itself.
+    """
+
+    IDLE = "idle"
+    CONNECTING = "connecting"
+    CONNECTED = "connected"
+    CLOSING = "closing"
+    CLOSED = "closed"
+
+    def __init__(
+        self,
+        client_id: str,
+        buffer_size: int = 64 * 1024,
+        codec: Codec | None = None,
+    ):
+        self.client_id = client_id
+        self.state = self.IDLE
+        self.codec = codec or get_codec()
+        self._decoder = FrameDecoder(buffer_size, self.codec)
+        self._outgoing: list[bytes] = []
+
+    def send(self, op: int, payload: dict) -> bytes:
+        return self.send_encoded(op, self.codec.dumps(payload))
+
+    def send_encoded(self, op: int, data: bytes) -> bytes:
+        """Frame a payload that is already encoded to JSON."""
+        if op == OP_HANDSHAKE:
+            self.state = self.CONNECTING
+        elif op == OP_CLOSE:
+            self.state = self.CLOSING
+        return FRAME_HEADER.pack(op, len(data)) + data
+
+    def handshake(self) -> bytes:
+        return self.send(OP_HANDSHAKE, {"v": 1, "client_id": self.client_id})
+
+    def close(self) -> bytes:
+        return self.send(OP_CLOSE, {"v": 1, "client_id": self.client_id})
+
+    def data_to_send(self) -> bytes:
+        data = b"".join(self._outgoing)
+        self._outgoing.clear()
+        return data
+
+    def get_buffer(self, sizehint: int = -1) -> memoryview:
+        return self._decoder.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes: int) -> list[Message]:
+        return self._process(self._decoder.buffer_updated(nbytes))
+
+    def receive(self, data: bytes) -> list[Message]:
+        return self._process(self._decoder.feed(data))
+
+    def _process(self, frames: list[tuple[int, dict]]) -> list[Message]:
+        messages = []
+        for op, payload in frames:
+            if op == OP_PING:
+                self._outgoing.append(encode_frame(OP_PONG, payload, self.codec))
+                continue
+            if op == OP_PONG:
+                continue
+
+            if self.state == self.CONNECTING:
+                kind = HANDSHAKE
+                if op == OP_CLOSE or "code" in payload:
+                    self.state = self.CLOSED
+                else:
+                    self.state = self.CONNECTED
+            elif op == OP_CLOSE:
+                kind = CLOSED
+                self.state = self.CLOSED
+            elif payload.get("cmd") == "DISPATCH":
+                # Events are recognised by their command alone
+                kind = EVENT
+            else:
+                kind = RESPONSE
+            messages.append(Message(kind, payload))
+        return messages
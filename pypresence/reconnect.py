@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import random
+from typing import Iterator
+
+
+class Backoff:
+    """Delays between attempts to reconnect to Discord.
+
+    The delay starts at ``initial`` seconds and is multiplied by ``factor``
+    after every failed attempt, up to ``maximum``. Each delay is shortened
+    by a random fraction of up to ``jitter`` so that many clients losing
+    Discord at once do not all come back in lockstep. After ``attempts``
+    failures the last error is raised; ``None`` keeps trying forever.
+    """
+
+    def __init__(
+        self,
+        initial: float = 0.5,
+        maximum: float = 30.0,
+        factor: float = 2.0,
+        attempts: int | None = 10,
+        jitter: float = 0.5,
+    ):
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.attempts = attempts
+        self.jitter = jitter
+
+    def delays(self) -> Iterator[float]:
+        delay = min(self.initial, self.maximum)
+        attempt = 0
+        while self.attempts is None or attempt < self.attempts:
+            yield delay * (1 - self.jitter * random.random())
+            delay = min(self.maximum, delay * self.factor)
+            attempt += 1
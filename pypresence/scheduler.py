@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+from .exceptions import ServerError
+
+
+def is_rate_limited(error: Exception) -> bool:
+    return isinstance(error, ServerError) and "rate limit" in str(error).lower()
+
+
+class ActivityScheduler:
+    """Coalesces activity updates under Discord's SET_ACTIVITY rate limit.
+
+    Updates are paced by a token bucket holding ``rate`` tokens that refills
+    over ``period`` seconds (Discord allows roughly 5 updates per 20 seconds).
+    When no token is available the update is queued, and a newer update
+    replaces the queued one, so only the latest activity is ever sent.
+
+    With ``adaptive=True`` a rate-limit error from Discord halves the refill
+    rate and retries the update later; each successful update then earns
+    back a little of the original rate.
+    """
+
+    def __init__(
+        self,
+        rate: int = 5,
+        period: float = 20.0,
+        adaptive: bool = False,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.capacity = rate
+        self.nominal_rate = rate / period
+        self.refill_rate = self.nominal_rate
+        self.adaptive = adaptive
+        self._clock = clock
+        self._tokens = float(rate)
+        self._updated = clock()
+
+        self.pending = None  # latest payload still waiting for a token
+        self._waiters: list[asyncio.Future] = []
+        self._timer: asyncio.TimerHandle | None = None
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.refill_rate
+        )
+        self._updated = now
+
+    def delay(self) -> float:
+        """Seconds until a token is available."""
+        self._refill()
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.refill_rate
+
+    def acquire(self) -> bool:
+        """Take a token if one is available."""
+        if self.delay() > 0:
+            return False
+        self._tokens -= 1
+        return True
+
+    def rate_limited(self):
+        """Record a rate-limit error from Discord."""
+        self._refill()
+        self._tokens = 0.0
+        if self.adaptive:
+            self.refill_rate = max(self.refill_rate / 2, self.nominal_rate / 16)
+
+    def succeeded(self):
+        """Record a successful update."""
+        if self.adaptive and self.refill_rate < self.nominal_rate:
+            self._refill()
+            self.refill_rate = min(
+                self.nominal_rate, self.refill_rate + self.nominal_rate / 8
+            )
+
+    # Synchronous front end: nothing runs between calls, so a queued update is
+    # sent by the next offer() that finds a token, or by a blocking take()
+
+    def offer(self, payload):
+        """Queue ``payload`` and return the payload to send now, if any."""
+        self.pending = payload
+        if not self.acquire():
+            return None
+        payload, self.pending = self.pending, None
+        return payload
+
+    def take(self):
+        """Wait for a token and return the queued payload, if any."""
+        if self.pending is None:
+            return None
+        time.sleep(self.delay())
+        self.acquire()
+        payload, self.pending = self.pending, None
+        return payload
+
+    # Asynchronous front end: a timer flushes the queued update as soon as a
+    # token frees up, and every caller whose update was coalesced into it
+    # receives its response
+
+    async def submit(self, payload, send: Callable[[object], Awaitable[dict]]):
+        future = asyncio.get_running_loop().create_future()
+        self.pending = payload
+        self._waiters.append(future)
+        if self._timer is None:
+            self._flush(send)
+        return await future
+
+    def _flush(self, send):
+        self._timer = None
+        if self.pending is None:
+            return
+        loop = asyncio.get_running_loop()
+        if not self.acquire():
+            self._timer = loop.call_later(self.delay(), self._flush, send)
+            return
+        payload, waiters = self.pending, self._waiters
+        self.pending, self._waiters = None, []
+        loop.create_task(self._send(payload, waiters, send))
+
+    async def _send(self, payload, waiters: list[asyncio.Future], send):
+        try:
+            result = await send(payload)
+        except Exception as e:
+            if is_rate_limited(e):
+                self.rate_limited()
+                if self.adaptive:
+                    self._retry(payload, waiters, send)
+                    return
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+        else:
+            self.succeeded()
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(result)
+
+    def _retry(self, payload, waiters: list[asyncio.Future], send):
+        # A newer update that was queued meanwhile wins, but the callers of
+        # the rejected one still wait for its response
+        if self.pending is None:
+            self.pending = payload
+        self._waiters[:0] = waiters
+        if self._timer is None:
+            self._flush(send)
+
+    def cancel(self):
+        """Drop the queued update and stop the flush timer."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self.pending = None
+        for waiter in self._waiters:
+            waiter.cancel()
+        self._waiters = []
@@ -0,0 +1,234 @@
+"""A stand-in for Discord's IPC server, for tests and benchmarks.
+
+``FakeDiscord`` listens on a UNIX socket, answers the handshake with READY
+and replies to every command like Discord would. With pytest, use the
+``fake_discord`` fixture by adding this to a ``conftest.py``::
+
+    pytest_plugins = ["pypresence.testing"]
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable
+
+from .protocol import (
+    FRAME_HEADER,
+    OP_CLOSE,
+    OP_FRAME,
+    OP_HANDSHAKE,
+    OP_PING,
+    OP_PONG,
+    encode_frame,
+)
+from .utils import clear_ipc_cache
+
+try:
+    import pytest
+except ImportError:
+    pytest = None
+
+READY_DATA = {
+    "v": 1,
+    "config": {
+        "cdn_host": "cdn.discordapp.com",
+        "api_endpoint": "//discord.com/api",
+        "environment": "production",
+    },
+    "user": {"id": "1", "username": "pypresence", "discriminator": "0"},
+}
+
+
+def _recv_exactly(conn: socket.socket, size: int) -> bytes | None:
+    data = conn.recv(size, socket.MSG_WAITALL) if size else b""
+    return data if len(data) == size else None
+
+
+class FakeDiscord:
+    """Serves the Discord IPC protocol on ``path``.
+
+    By default every command is answered with its own ``args`` as ``data``.
+    ``respond`` replaces that for a command, with either a dict or a
+    function taking the command and returning its ``data``; ``fail`` makes a
+    command answer with an error. ``latency`` seconds pass before each reply.
+    ``dispatch`` sends an event to every connected client and ``drop`` cuts
+    them off, as Discord restarting would.
+
+    Commands are recorded in ``received`` and handshakes in ``handshakes``.
+    """
+
+    def __init__(self, path: str | None = None, latency: float = 0.0):
+        self._tempdir = None
+        if path is None:
+            self._tempdir = tempfile.mkdtemp(prefix="pypresence-")
+            path = os.path.join(self._tempdir, "discord-ipc-0")
+        self.path = str(path)
+        self.latency = latency
+        self.received: list[dict] = []
+        self.handshakes: list[dict] = []
+        self._responses: dict[str, dict | Callable[[dict], dict]] = {}
+        self._errors: dict[str, tuple[int, str]] = {}
+        self._connections: list[socket.socket] = []
+        self._listener: socket.socket | None = None
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    @property
+    def directory(self) -> str:
+        return os.path.dirname(self.path)
+
+    def start(self) -> FakeDiscord:
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(self.path)
+        self._listener.listen(16)
+        threading.Thread(target=self._accept, name="fake-discord", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._listener is None:
+            return
+        self._listener.close()
+        self._listener = None
+        self.drop()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        if self._tempdir is not None:
+            shutil.rmtree(self._tempdir, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def respond(self, cmd: str, data: dict | Callable[[dict], dict]):
+        """Answer ``cmd`` with ``data``, or with what ``data(command)`` returns."""
+        self._errors.pop(cmd, None)
+        self._responses[cmd] = data
+
+    def fail(self, cmd: str, code: int = 4000, message: str = "Invalid payload"):
+        """Answer ``cmd`` with an ERROR response."""
+        self._errors[cmd] = (code, message)
+
+    def dispatch(self, evt: str, data: dict | None = None):
+        """Send the ``evt`` event to every connected client."""
+        frame = encode_frame(OP_FRAME, {"cmd": "DISPATCH", "evt": evt, "data": data})
+        with self._lock:
+            connections = list(self._connections)
+        for conn in connections:
+            try:
+                conn.sendall(frame)
+            except OSError:
+                pass
+
+    def drop(self):
+        """Close every client connection."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            conn.close()
+
+    def wait_for(self, count: int, timeout: float = 5.0) -> list[dict]:
+        """Block until ``count`` commands have been received."""
+        with self._changed:
+            if not self._changed.wait_for(lambda: len(self.received) >= count, timeout):
+                raise TimeoutError(f"received {len(self.received)} of {count} commands")
+            return list(self.received)
+
+    def _accept(self):
+        listener = self._listener
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                return
+            with self._lock:
+                self._connections.append(conn)
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _read(self, conn):
+        header = _recv_exactly(conn, FRAME_HEADER.size)
+        if header is None:
+            return None, None
+        op, length = FRAME_HEADER.unpack(header)
+        body = _recv_exactly(conn, length)
+        if body is None:
+            return None, None
+        return op, json.loads(body)
+
+    def _reply(self, payload: dict) -> dict:
+        cmd = payload.get("cmd")
+        reply = {"cmd": cmd, "nonce": payload.get("nonce")}
+        if cmd in self._errors:
+            code, message = self._errors[cmd]
+            reply.update(evt="ERROR", data={"code": code, "message": message})
+            return reply
+        response = self._responses.get(cmd)
+        if response is None:
+            data = payload.get("args", {})
+        elif callable(response):
+            data = response(payload)
+        else:
+            data = response
+        reply.update(evt=None, data=data)
+        return reply
+
+    def _serve(self, conn):
+        try:
+            op, payload = self._read(conn)
+            if op != OP_HANDSHAKE:
+                return
+            with self._changed:
+                self.handshakes.append(payload)
+            conn.sendall(
+                encode_frame(
+                    OP_FRAME, {"cmd": "DISPATCH", "evt": "READY", "data": READY_DATA}
+                )
+            )
+            while True:
+                op, payload = self._read(conn)
+                if op is None or op == OP_CLOSE:
+                    return
+                if op == OP_PING:
+                    conn.sendall(encode_frame(OP_PONG, payload))
+                    continue
+                with self._changed:
+                    self.received.append(payload)
+                    self._changed.notify_all()
+                if self.latency:
+                    time.sleep(self.latency)
+                conn.sendall(encode_frame(OP_FRAME, self._reply(payload)))
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                if conn in self._connections:
+                    self._connections.remove(conn)
+            conn.close()
+
+
+if pytest is not None:
+
+    @pytest.fixture
+    def fake_discord(monkeypatch):
+        """A running ``FakeDiscord`` that clients find instead of Discord"""
+        if sys.platform == "win32":
+            pytest.skip("FakeDiscord needs UNIX sockets")
+        with FakeDiscord() as server:
+            monkeypatch.setenv("XDG_RUNTIME_DIR", server.directory)
+            clear_ipc_cache()
+            yield server
+        clear_ipc_cache()
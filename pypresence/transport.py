@@ -0,0 +1,120 @@
+"""Transports carrying IPC frames to and from the Discord client."""
+
+from __future__ import annotations
+
+import asyncio
+import socket
+from collections import deque
+from typing import Callable
+
+from .exceptions import ConnectionTimeout, InvalidPipe, PipeClosed, ResponseTimeout
+from .protocol import IPCConnection, Message
+
+
+class IPCProtocol(asyncio.BufferedProtocol):
+    """Feeds an ``IPCConnection`` from the socket, without extra copies.
+
+    Data is received straight into the connection's buffer and every
+    resulting message is handed to ``on_message``; ``on_close`` is called
+    once with the exception that ended the connection, or ``None`` on a
+    clean EOF.
+    """
+
+    def __init__(
+        self,
+        connection: IPCConnection,
+        on_message: Callable[[Message], None],
+        on_close: Callable[[Exception | None], None],
+    ):
+        self.connection = connection
+        self._on_message = on_message
+        self._on_close = on_close
+        self.transport: asyncio.Transport | None = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        return self.connection.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes: int):
+        for message in self.connection.buffer_updated(nbytes):
+            self._on_message(message)
+        data = self.connection.data_to_send()
+        if data and self.transport is not None:
+            self.transport.write(data)
+
+    def eof_received(self):
+        return False
+
+    def connection_lost(self, exc):
+        self.transport = None
+        self._on_close(exc)
+
+
+class SocketTransport:
+    """Blocking connection to the IPC socket, for clients without an event loop.
+
+    Exposes the ``write``/``close``/``is_closing`` subset of an asyncio
+    transport so it can stand in for one when sending, and reads messages
+    from its ``IPCConnection`` one at a time with ``read_message``.
+    """
+
+    def __init__(self, connection: IPCConnection):
+        self.connection = connection
+        self._sock: socket.socket | None = None
+        self._messages: deque = deque()
+
+    def connect(self, path: str, timeout: float | None = None):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(path)
+        except socket.timeout:
+            sock.close()
+            raise ConnectionTimeout
+        except OSError:
+            # Missing, refused, or a backlog so full that connecting with a
+            # timeout fails straight away with EAGAIN
+            sock.close()
+            raise InvalidPipe
+        self._sock = sock
+
+    def write(self, data: bytes):
+        if self._sock is None:
+            raise PipeClosed
+        try:
+            self._sock.sendall(data)
+        except OSError:
+            self.close()
+            raise PipeClosed
+
+    def read_message(self, timeout: float | None = None) -> Message:
+        """Return the next message, waiting up to ``timeout``."""
+        while not self._messages:
+            if self._sock is None:
+                raise PipeClosed
+            self._sock.settimeout(timeout)
+            try:
+                with self.connection.get_buffer() as buffer:
+                    nbytes = self._sock.recv_into(buffer)
+            except socket.timeout:
+                raise ResponseTimeout
+            except OSError:
+                nbytes = 0
+            if not nbytes:
+                self.close()
+                raise PipeClosed
+            self._messages.extend(self.connection.buffer_updated(nbytes))
+            data = self.connection.data_to_send()
+            if data:
+                self.write(data)
+        return self._messages.popleft()
+
+    def is_closing(self) -> bool:
+        return self._sock is None
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
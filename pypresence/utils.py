@@ -3,8 +3,13 @@
 import asyncio
 import os
 import socket
+import stat
 import sys
 import tempfile
+import time
+from typing import NamedTuple, Optional
+
+from .protocol import OP_HANDSHAKE, encode_frame
 
 
 def remove_none(d: dict):
@@ -19,23 +24,20 @@ def remove_none(d: dict):
     return d
 
 
-def test_ipc_path(path) -> bool:
+def test_ipc_path(path, timeout: Optional[float] = None) -> bool:
     """Tests an IPC pipe to ensure that it actually works"""
     if sys.platform == "win32":
         with open(path):
             return True
     else:
         with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout)
             client.connect(path)
             return True
 
 
-# Returns on first IPC pipe matching Discord's
-def get_ipc_path(pipe=None):
-    ipc = "discord-ipc-"
-    if pipe is not None:
-        ipc = f"{ipc}{pipe}"
-
+def get_ipc_dirs() -> list:
+    """Directories that may hold Discord's IPC sockets, most likely first."""
     if sys.platform in ("linux", "darwin"):
         tempdir = os.environ.get("XDG_RUNTIME_DIR") or (
             f"/run/user/{os.getuid()}"
@@ -53,18 +55,155 @@ def get_ipc_path(pipe=None):
         tempdir = r"\\?\pipe"
         paths = ["."]
     else:
-        return
-
-    for path in paths:
-        full_path = os.path.abspath(os.path.join(tempdir, path))
-        if sys.platform == "win32" or os.path.isdir(full_path):
-            for entry in os.scandir(full_path):
-                if (
-                    entry.name.startswith(ipc)
-                    and os.path.exists(entry)
-                    and test_ipc_path(entry.path)
-                ):
-                    return entry.path
+        return []
+
+    return [os.path.abspath(os.path.join(tempdir, path)) for path in paths]
+
+
+# pipe -> (directory mtimes, probe, path) from the last scan, see get_ipc_path
+_ipc_path_cache: dict = {}
+
+# Seconds a pipe gets to show it is alive before it counts as dead
+PROBE_TIMEOUT = 0.25
+
+# Discord answers any handshake, if only by closing on the unknown client ID
+_PROBE_HANDSHAKE = encode_frame(OP_HANDSHAKE, {"v": 1, "client_id": "0"})
+
+
+def _ipc_dirs_stamp(dirs) -> tuple:
+    stamp = []
+    for directory in dirs:
+        try:
+            stamp.append((directory, os.stat(directory).st_mtime_ns))
+        except OSError:
+            stamp.append((directory, None))
+    return tuple(stamp)
+
+
+def _is_socket(path) -> bool:
+    try:
+        return stat.S_ISSOCK(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+def _accepts_connection(path) -> bool:
+    try:
+        # Connecting to a hung Discord's socket would otherwise never return
+        return test_ipc_path(path, PROBE_TIMEOUT)
+    except OSError:
+        return False
+
+
+def clear_ipc_cache():
+    """Forget every path remembered by ``get_ipc_path``."""
+    _ipc_path_cache.clear()
+
+
+def _ipc_candidates(pipe=None):
+    """Paths that look like Discord's IPC pipes, most likely first."""
+    ipc = "discord-ipc-"
+    if pipe is not None:
+        ipc = f"{ipc}{pipe}"
+
+    for full_path in get_ipc_dirs():
+        if sys.platform != "win32" and not os.path.isdir(full_path):
+            continue
+        for entry in sorted(os.scandir(full_path), key=lambda entry: entry.name):
+            if not entry.name.startswith(ipc):
+                continue
+            if sys.platform == "win32":
+                if os.path.exists(entry):
+                    yield entry.path
+            # stat is far cheaper than connecting, so weed out stray files
+            # before trying
+            elif _is_socket(entry.path):
+                yield entry.path
+
+
+# Returns on first IPC pipe matching Discord's
+def get_ipc_path(pipe=None, probe="connect"):
+    """Find Discord's IPC pipe, or return None when there is none.
+
+    With ``probe="connect"`` a candidate must accept a connection; with
+    ``probe="stat"`` being a socket is enough, for callers about to connect
+    anyway. Results are remembered until one of the directories searched
+    changes; call ``clear_ipc_cache`` when a remembered path stops working.
+    """
+    # Directory mtimes mean nothing for Windows' pipe namespace
+    stamp = None if sys.platform == "win32" else _ipc_dirs_stamp(get_ipc_dirs())
+    cached = _ipc_path_cache.get(pipe)
+    if stamp is not None and cached is not None and cached[0] == stamp:
+        # A path only found by stat has not been shown to accept connections
+        _, cached_probe, cached_path = cached
+        if cached_path is None or probe == "stat" or cached_probe == "connect":
+            return cached_path
+
+    path = None
+    for candidate in _ipc_candidates(pipe):
+        if (probe == "stat" and stamp is not None) or _accepts_connection(candidate):
+            path = candidate
+            break
+
+    if stamp is not None:
+        _ipc_path_cache[pipe] = (stamp, probe, path)
+    return path
+
+
+class IPCCandidate(NamedTuple):
+    path: str
+    alive: bool
+    latency: Optional[float]  # seconds taken to answer, None when not alive
+
+
+async def _answers_handshake(path) -> bool:
+    # A hung Discord's socket can still accept the connection; only an
+    # answer, or the connection being closed, shows something is there
+    reader, writer = await asyncio.open_unix_connection(path)
+    try:
+        writer.write(_PROBE_HANDSHAKE)
+        await reader.read(1)
+        return True
+    finally:
+        writer.close()
+
+
+async def _probe_ipc_path(path, timeout) -> IPCCandidate:
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    try:
+        if sys.platform == "win32":
+            alive = await asyncio.wait_for(
+                loop.run_in_executor(None, _accepts_connection, path), timeout
+            )
+        else:
+            alive = await asyncio.wait_for(_answers_handshake(path), timeout)
+    except (OSError, asyncio.TimeoutError):
+        alive = False
+    latency = time.perf_counter() - start
+    return IPCCandidate(path, alive, latency if alive else None)
+
+
+async def discover_ipc_paths(pipe=None, timeout: float = PROBE_TIMEOUT) -> list:
+    """Probe every candidate pipe at once and rank what answered.
+
+    Returns an ``IPCCandidate`` for each pipe found, live ones first and the
+    quickest to answer first among those. A pipe that has not answered a
+    handshake within ``timeout`` seconds counts as dead, so leftovers from
+    a crashed or hung Discord cost no more than that however many there are.
+    """
+    stamp = None if sys.platform == "win32" else _ipc_dirs_stamp(get_ipc_dirs())
+    paths = list(_ipc_candidates(pipe))
+    results = await asyncio.gather(*(_probe_ipc_path(p, timeout) for p in paths))
+    ranked = sorted(
+        results,
+        key=lambda candidate: (not candidate.alive, candidate.latency or 0),
+    )
+
+    if stamp is not None:
+        best = ranked[0].path if ranked and ranked[0].alive else None
+        _ipc_path_cache[pipe] = (stamp, "connect", best)
+    return ranked
 
 
 def get_event_loop(force_fresh: bool = False):
@@ -0,0 +1,161 @@
+"""Checks activities against Discord's limits before they are sent.
+
+Discord rejects an activity with text that is too short or too long, more
+than two buttons, a malformed party size or a URL that is not http(s), but
+only says so after a round trip. ``validate_activity`` catches the same
+mistakes locally. In ``"strict"`` mode every problem raises
+``InvalidArgument``; ``"lenient"`` mode shortens text that is too long and
+drops buttons past the second, and raises for everything else.
+"""
+
+from __future__ import annotations
+
+import re
+
+from .exceptions import InvalidArgument
+
+STRICT = "strict"
+LENIENT = "lenient"
+MODES = (STRICT, LENIENT, None)
+
+# (shortest, longest) in characters
+_TEXT_LIMITS = {
+    "state": (2, 128),
+    "details": (2, 128),
+    "name": (1, 128),
+    "large_image": (1, 256),
+    "large_text": (2, 128),
+    "small_image": (1, 256),
+    "small_text": (2, 128),
+    "party_id": (2, 128),
+    "join": (2, 128),
+    "spectate": (2, 128),
+    "match": (2, 128),
+}
+_URL_FIELDS = ("state_url", "details_url", "large_url", "small_url")
+_URL_LENGTH = 256
+_MAX_BUTTONS = 2
+_LABEL_LIMITS = (1, 32)
+_BUTTON_URL_LENGTH = 512
+_URL = re.compile(r"https?://[^\s/?#]+\S*\Z")
+
+
+def _text(name: str, shortest: int, longest: int):
+    def check(value, lenient: bool):
+        if not isinstance(value, str):
+            raise InvalidArgument(f"a string for {name}", type(value).__name__)
+        if len(value) > longest:
+            if lenient:
+                return value[:longest]
+            raise InvalidArgument(f"{name} of at most {longest} characters", len(value))
+        if len(value) < shortest:
+            raise InvalidArgument(
+                f"{name} of at least {shortest} characters", len(value)
+            )
+        return value
+
+    return check
+
+
+def _url(name: str, longest: int):
+    def check(value, lenient: bool):
+        if not isinstance(value, str) or not _URL.match(value):
+            raise InvalidArgument(f"an http(s) URL for {name}", repr(value))
+        if len(value) > longest:
+            raise InvalidArgument(f"{name} of at most {longest} characters", len(value))
+        return value
+
+    return check
+
+
+def _timestamp(name: str):
+    def check(value, lenient: bool):
+        if not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0:
+            raise InvalidArgument(f"an epoch time for {name}", repr(value))
+        return value
+
+    return check
+
+
+def _party_size(value, lenient: bool):
+    if (
+        value.__class__ not in (list, tuple)
+        or len(value) != 2
+        or value[0].__class__ is not int
+        or value[1].__class__ is not int
+        or not 1 <= value[0] <= value[1]
+    ):
+        raise InvalidArgument("party_size as [current, maximum]", repr(value))
+    return value
+
+
+_check_label = _text("button label", *_LABEL_LIMITS)
+_check_button_url = _url("button url", _BUTTON_URL_LENGTH)
+
+
+def _buttons(value, lenient: bool):
+    if not isinstance(value, (list, tuple)):
+        raise InvalidArgument("a list of buttons", type(value).__name__)
+    changed = False
+    if len(value) > _MAX_BUTTONS:
+        if not lenient:
+            raise InvalidArgument(f"at most {_MAX_BUTTONS} buttons", len(value))
+        value, changed = value[:_MAX_BUTTONS], True
+    checked = []
+    for button in value:
+        if (
+            not isinstance(button, dict)
+            or len(button) != 2
+            or "label" not in button
+            or "url" not in button
+        ):
+            raise InvalidArgument(
+                'buttons like {"label": ..., "url": ...}', repr(button)
+            )
+        _check_button_url(button["url"], lenient)
+        label = _check_label(button["label"], lenient)
+        if label is not button["label"]:
+            button, changed = dict(button, label=label), True
+        checked.append(button)
+    return checked if changed else value
+
+
+_CHECKS = {
+    **{name: _text(name, *limits) for name, limits in _TEXT_LIMITS.items()},
+    **{name: _url(name, _URL_LENGTH) for name in _URL_FIELDS},
+    "start": _timestamp("start"),
+    "end": _timestamp("end"),
+    "party_size": _party_size,
+    "buttons": _buttons,
+}
+
+
+def validate_activity(fields: dict, mode: str | None = STRICT) -> dict:
+    """Check ``update`` options against Discord's limits.
+
+    Returns ``fields`` itself when nothing had to change, or a copy with
+    the corrections lenient mode made.
+    """
+    if mode not in MODES:
+        raise InvalidArgument("'strict', 'lenient' or None", repr(mode))
+    if mode is None:
+        return fields
+    lenient = mode == LENIENT
+    checked = fields
+    for name, value in fields.items():
+        if value is None:
+            continue
+        limits = _TEXT_LIMITS.get(name)
+        if limits is not None and value.__class__ is str:
+            # Plain text that fits is by far the most common case
+            if limits[0] <= len(value) <= limits[1]:
+                continue
+        check = _CHECKS.get(name)
+        if check is None:
+            continue
+        fixed = check(value, lenient)
+        if fixed is not value:
+            if checked is fields:
+                checked = dict(fields)
+            checked[name] = fixed
+    return checked
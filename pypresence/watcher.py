@@ -0,0 +1,240 @@
+"""Notices Discord's IPC sockets appearing and disappearing."""
+
+from __future__ import annotations
+
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from typing import Iterator, NamedTuple
+
+from .utils import get_ipc_dirs
+
+APPEARED = "appeared"
+DISAPPEARED = "disappeared"
+
+# From <sys/inotify.h>
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF
+
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class IPCEvent(NamedTuple):
+    kind: str  # APPEARED or DISAPPEARED
+    path: str
+
+
+def _load_inotify():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [
+            ctypes.c_int,
+            ctypes.c_char_p,
+            ctypes.c_uint32,
+        ]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+def _records(data: bytes) -> Iterator[tuple[int, int, str]]:
+    """Split what inotify returned into (wd, mask, name) records."""
+    offset = 0
+    while offset < len(data):
+        wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+        offset += INOTIFY_EVENT.size
+        name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+        offset += length
+        yield wd, mask, name
+
+
+class IPCWatcher:
+    """Watches the directories ``get_ipc_path`` searches for ``discord-ipc-*``.
+
+    On Linux inotify reports changes as they happen, so waiting costs no CPU.
+    Elsewhere, or when inotify is unavailable, the directories are scanned
+    every ``interval`` seconds instead. ``sockets`` always holds the paths
+    currently present; ``read``, ``wait`` and ``wait_async`` return the
+    ``IPCEvent`` objects for what changed.
+
+    Candidate directories that do not exist yet (Discord creates some of
+    them on startup) are picked up as soon as they are created.
+    """
+
+    def __init__(self, pipe: int | None = None, interval: float = 1.0):
+        self.prefix = "discord-ipc-" if pipe is None else f"discord-ipc-{pipe}"
+        self.interval = interval
+        self._dirs = get_ipc_dirs()
+        self._watches: dict[int, str] = {}
+        self._fd: int | None = None
+
+        libc = _load_inotify()
+        if libc is not None:
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd >= 0:
+                self._libc, self._fd = libc, fd
+
+        # Watch before scanning, so a socket created in between is not missed
+        self._update_watches()
+        self.sockets: set[str] = self._scan()
+
+    @property
+    def backend(self) -> str:
+        return "poll" if self._fd is None else "inotify"
+
+    def fileno(self) -> int | None:
+        return self._fd
+
+    def _scan(self) -> set[str]:
+        sockets = set()
+        for directory in self._dirs:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            sockets.update(
+                entry.path for entry in entries if entry.name.startswith(self.prefix)
+            )
+        return sockets
+
+    def _update_watches(self):
+        """Watch every candidate directory, or its closest existing parent."""
+        if self._fd is None:
+            return
+        targets = set()
+        for directory in self._dirs:
+            while not os.path.isdir(directory):
+                parent = os.path.dirname(directory)
+                if parent == directory:
+                    break
+                directory = parent
+            targets.add(directory)
+        for directory in targets - set(self._watches.values()):
+            wd = self._libc.inotify_add_watch(
+                self._fd, os.fsencode(directory), WATCH_MASK
+            )
+            if wd >= 0:
+                self._watches[wd] = directory
+
+    def _rescan(self) -> list[IPCEvent]:
+        sockets = self._scan()
+        events = [IPCEvent(APPEARED, path) for path in sorted(sockets - self.sockets)]
+        events += [
+            IPCEvent(DISAPPEARED, path) for path in sorted(self.sockets - sockets)
+        ]
+        self.sockets = sockets
+        return events
+
+    def _socket_event(
+        self, directory: str | None, mask: int, name: str
+    ) -> IPCEvent | None:
+        if directory not in self._dirs or not name.startswith(self.prefix):
+            return None
+        path = os.path.join(directory, name)
+        if mask & (IN_CREATE | IN_MOVED_TO) and path not in self.sockets:
+            self.sockets.add(path)
+            return IPCEvent(APPEARED, path)
+        if mask & (IN_DELETE | IN_MOVED_FROM) and path in self.sockets:
+            self.sockets.discard(path)
+            return IPCEvent(DISAPPEARED, path)
+        return None
+
+    def read(self) -> list[IPCEvent]:
+        """Return what changed since the last call, without waiting."""
+        if self._fd is None:
+            return self._rescan()
+
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        rescan = False
+        for wd, mask, name in _records(data):
+            if mask & (IN_IGNORED | IN_DELETE_SELF | IN_ISDIR | IN_Q_OVERFLOW):
+                if mask & IN_IGNORED:
+                    self._watches.pop(wd, None)
+                rescan = True
+                continue
+            event = self._socket_event(self._watches.get(wd), mask, name)
+            if event is not None:
+                events.append(event)
+
+        if rescan:
+            # A candidate directory came or went, or the queue overflowed and
+            # events were lost: watch what exists now and catch up on it
+            self._update_watches()
+            events += self._rescan()
+        return events
+
+    def _poll_delay(self, remaining: float | None) -> float:
+        return self.interval if remaining is None else min(self.interval, remaining)
+
+    def wait(self, timeout: float | None = None) -> list[IPCEvent]:
+        """Block until something changes or ``timeout`` seconds have passed."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            events = self.read()
+            if events:
+                return events
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return []
+            if self._fd is None:
+                time.sleep(self._poll_delay(remaining))
+            else:
+                select.select([self._fd], [], [], remaining)
+
+    async def wait_async(self, timeout: float | None = None) -> list[IPCEvent]:
+        """Like ``wait``, without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            events = self.read()
+            if events:
+                return events
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                return []
+            if self._fd is None:
+                await asyncio.sleep(self._poll_delay(remaining))
+                continue
+
+            readable = loop.create_future()
+            loop.add_reader(
+                self._fd, lambda: readable.done() or readable.set_result(None)
+            )
+            try:
+                await asyncio.wait_for(readable, remaining)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                loop.remove_reader(self._fd)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            self._watches.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -2,11 +2,15 @@
 
 import asyncio
 import json
+import socket
 import struct
+import sys
 from unittest.mock import AsyncMock, MagicMock, Mock
 
 import pytest
 
+from pypresence.testing import fake_discord  # noqa: F401
+
 
 @pytest.fixture
 def mock_event_loop():
@@ -95,14 +99,12 @@ def client_id():
 @pytest.fixture
 def mock_ipc_path(monkeypatch, tmp_path):
     """Mock IPC path discovery"""
-    import sys
-
     if sys.platform == "win32":
         ipc_path = r"\\?\pipe\discord-ipc-0"
     else:
         ipc_path = str(tmp_path / "discord-ipc-0")
 
-    def mock_get_ipc_path(pipe=None):
+    def mock_get_ipc_path(pipe=None, probe="connect"):
         return ipc_path
 
     # Patch in baseclient module where it's actually used
@@ -111,3 +113,72 @@ def mock_ipc_path(monkeypatch, tmp_path):
     monkeypatch.setattr(baseclient, "get_ipc_path", mock_get_ipc_path)
 
     return ipc_path
+
+
+@pytest.fixture
+def make_frame():
+    """Factory fixture for encoding a payload as an IPC frame"""
+
+    def _make_frame(payload, op=1):
+        data = json.dumps(payload).encode("utf-8")
+        return struct.pack("<II", op, len(data)) + data
+
+    return _make_frame
+
+
+@pytest.fixture
+def ipc_socketpair():
+    """Connect a client to one end of a socket pair and return the other end
+
+    The returned socket stands in for Discord: frames sent on it reach the
+    client's protocol, and whatever the client writes can be received from it.
+    """
+    sockets = []
+
+    async def _connect(client):
+        server_sock, client_sock = socket.socketpair()
+        sockets.append(server_sock)
+        client.update_event_loop(asyncio.get_running_loop())
+        client.sock_writer, client.sock_protocol = await client.loop.create_connection(
+            client._create_protocol, sock=client_sock
+        )
+        return server_sock
+
+    yield _connect
+
+    for sock in sockets:
+        sock.close()
+
+
+@pytest.fixture
+def hung_pipe():
+    """Factory for IPC sockets like those a hung Discord leaves behind
+
+    Each call listens on the given path without ever accepting, and fills
+    the backlog: connecting with a timeout fails straight away, and the
+    event loop's connect seems to succeed but nothing ever answers. With
+    ``full=False`` one more connection fits, and is never answered either.
+    """
+    if sys.platform == "win32":
+        pytest.skip("Needs UNIX sockets")
+    sockets = []
+
+    def _hang(path, full=True):
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(str(path))
+        server.listen(0)
+        sockets.append(server)
+        while full:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.setblocking(False)
+            sockets.append(sock)
+            try:
+                sock.connect(str(path))
+            except BlockingIOError:
+                break
+        return str(path)
+
+    yield _hang
+
+    for sock in sockets:
+        sock.close()
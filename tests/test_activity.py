@@ -0,0 +1,180 @@
+"""Test the reusable Activity"""
+
+import pytest
+
+from pypresence.activity import FIELDS, Activity
+from pypresence.client import AioClient, Client
+from pypresence.codec import Codec
+from pypresence.exceptions import InvalidArgument, ServerError
+from pypresence.presence import AioPresence, Presence
+from pypresence.scheduler import ActivityScheduler
+from pypresence.types import ActivityType, StatusDisplayType
+
+
+class TestActivity:
+    """Test building and changing an Activity"""
+
+    def test_defaults(self):
+        """Test that a new activity only has instance set"""
+        activity = Activity()
+
+        assert activity.to_dict() == {
+            name: True if name == "instance" else None for name in FIELDS
+        }
+        assert activity.dirty == frozenset()
+        assert repr(activity) == "Activity(instance=True)"
+
+    def test_slots(self):
+        """Test that activities are slotted and reject unknown fields"""
+        activity = Activity()
+
+        assert not hasattr(activity, "__dict__")
+        with pytest.raises(AttributeError):
+            activity.status = "Idle"
+        with pytest.raises(AttributeError):
+            Activity(status="Idle")
+
+    def test_values_converted_once(self):
+        """Test that enums and timestamps are converted when set"""
+        activity = Activity(activity_type=2, status_display_type=1, start=12.9)
+
+        assert activity.activity_type is ActivityType.LISTENING
+        assert activity.status_display_type is StatusDisplayType.STATE
+        assert activity.start == 12
+
+    def test_invalid_enum(self):
+        """Test that an unknown activity type is rejected when set"""
+        activity = Activity()
+
+        with pytest.raises(InvalidArgument):
+            activity.activity_type = 1
+
+    def test_dirty_tracking(self):
+        """Test that only real changes mark fields dirty"""
+        activity = Activity(state="Lobby", details="Waiting")
+        assert activity.dirty == {"state", "details"}
+
+        activity.mark_clean()
+        activity.state = "Lobby"
+        assert activity.dirty == frozenset()
+
+        activity.update(state="In a match", party_size=[1, 4])
+        assert activity.dirty == {"state", "party_size"}
+
+    def test_mark_clean_after_sending(self):
+        """Test that fields changed after sending stay dirty"""
+        activity = Activity(state="Lobby", details="Waiting")
+        sent = activity.to_dict()
+        activity.state = "In a match"
+
+        activity.mark_clean(sent)
+        assert activity.dirty == {"state"}
+
+    def test_copy_and_equality(self):
+        """Test that copies are equal but independent"""
+        activity = Activity(state="Lobby")
+        copy = activity.copy()
+
+        assert copy == activity
+        copy.state = "Match"
+        assert copy != activity
+        assert activity.state == "Lobby"
+
+
+class TestEntryPoints:
+    """Test passing an Activity to presences and clients"""
+
+    def test_presence_update(self, client_id, fake_discord):
+        """Test that Presence.update sends the activity and marks it clean"""
+        activity = Activity(state="Lobby", large_url="https://example.com")
+        presence = Presence(client_id)
+        presence.connect()
+        presence.update(activity=activity)
+        activity.details = "Waiting"
+        presence.update(activity=activity)
+        presence.close()
+
+        first, second = (c["args"]["activity"] for c in fake_discord.received)
+        assert first["state"] == "Lobby"
+        assert first["assets"] == {"large_url": "https://example.com"}
+        assert second["details"] == "Waiting"
+        assert activity.dirty == frozenset()
+
+    def test_fields_with_activity_rejected(self, client_id, mock_stream_writer):
+        """Test that fields can't be given alongside an activity"""
+        presence = Presence(client_id)
+        presence.sock_writer = mock_stream_writer
+
+        with pytest.raises(InvalidArgument):
+            presence.update(activity=Activity(state="Lobby"), state="In a match")
+        with pytest.raises(InvalidArgument):
+            presence.update(activity=Activity(), instance=False)
+        mock_stream_writer.write.assert_not_called()
+
+    def test_dirty_until_applied(self, client_id, fake_discord):
+        """Test that a rejected or held back update leaves the activity dirty"""
+        activity = Activity(state="Lobby")
+        presence = Presence(client_id, scheduler=ActivityScheduler(rate=1))
+        presence.connect()
+        fake_discord.fail("SET_ACTIVITY")
+        with pytest.raises(ServerError):
+            presence.update(activity=activity)
+        assert activity.dirty == {"state"}
+
+        # The failed update used the only token, so this one is held back
+        assert presence.update(activity=activity) is None
+        presence.close()
+        assert activity.dirty == {"state"}
+
+    def test_custom_codec(self, client_id, fake_discord):
+        """Test that an activity goes through Payload.set_activity too"""
+
+        class MyCodec(Codec):
+            pass
+
+        presence = Presence(client_id, codec=MyCodec())
+        presence.connect()
+        presence.update(activity=Activity(state="Lobby", instance=False))
+        presence.close()
+
+        activity = fake_discord.received[0]["args"]["activity"]
+        assert (activity["state"], activity["instance"]) == ("Lobby", False)
+
+    async def test_aio_presence_update(self, client_id, fake_discord):
+        """Test that AioPresence.update accepts an activity"""
+        presence = AioPresence(client_id)
+        await presence.connect()
+        await presence.update(activity=Activity(name="Game"))
+        presence.close()
+
+        assert fake_discord.received[0]["args"]["activity"]["name"] == "Game"
+
+    def test_client_sends_name(self, client_id, fake_discord):
+        """Test that Client.set_activity no longer drops the name"""
+        client = Client(client_id)
+        client.start()
+        client.set_activity(name="Game")
+        client.set_activity(activity=Activity(state="Lobby"))
+        client.close()
+
+        first, second = (c["args"]["activity"] for c in fake_discord.received)
+        assert first["name"] == "Game"
+        assert second["state"] == "Lobby"
+
+    async def test_aio_client_urls(self, client_id, fake_discord):
+        """Test that AioClient.set_activity takes the same options as Client"""
+        client = AioClient(client_id)
+        await client.start()
+        await client.set_activity(
+            state="Lobby",
+            state_url="https://example.com/state",
+            small_url="https://example.com/small",
+        )
+        await client.set_activity(payload_override={"cmd": "SET_ACTIVITY"})
+        client.close()
+
+        activity = fake_discord.received[0]["args"]["activity"]
+        assert activity["state_url"] == "https://example.com/state"
+        assert activity["assets"] == {"small_url": "https://example.com/small"}
+        # An override without a nonce is given one, so its reply can be matched
+        assert fake_discord.received[1] == {"cmd": "SET_ACTIVITY", "nonce": "2"}
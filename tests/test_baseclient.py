@@ -11,6 +11,7 @@ import pytest
 from pypresence.baseclient import BaseClient
 from pypresence.exceptions import (
     ConnectionTimeout,
+    DiscordError,
     InvalidArgument,
     InvalidID,
     InvalidPipe,
@@ -99,7 +100,7 @@ class TestBaseClientSendData:
 
     def test_send_data_with_dict(self, client_id):
         """Test sending data with dict payload"""
-        client = BaseClient(client_id)
+        client = BaseClient(client_id, codec="json")
         client.sock_writer = Mock()
 
         payload = {"cmd": "TEST", "args": {"value": 123}}
@@ -113,7 +114,9 @@ class TestBaseClientSendData:
         op, length = struct.unpack("<II", call_args[:8])
 
         assert op == 1
-        assert length == len(json.dumps(payload))
+        assert length == len(call_args) - 8
+        # Commands sent without a nonce are numbered so the reply can be matched
+        assert json.loads(call_args[8:]) == dict(payload, nonce="1")
 
     def test_send_data_with_payload_object(self, client_id):
         """Test sending data with Payload object"""
@@ -127,6 +130,16 @@ class TestBaseClientSendData:
 
         assert client.sock_writer.write.called
 
+    def test_send_data_registers_request(self, client_id):
+        """Test that commands are registered by nonce before being written"""
+        client = BaseClient(client_id)
+        client.sock_writer = Mock()
+
+        nonce = client.send_data(1, {"cmd": "GET_GUILDS", "nonce": "abc"})
+
+        assert nonce == "abc"
+        assert client.in_flight.get("abc").cmd == "GET_GUILDS"
+
     def test_send_data_without_connection_raises(self, client_id):
         """Test that send_data raises if not connected"""
         client = BaseClient(client_id)
@@ -140,91 +153,140 @@ class TestBaseClientReadOutput:
     """Test BaseClient.read_output() method"""
 
     @pytest.mark.asyncio
-    async def test_read_output_success(self, client_id):
+    async def test_read_output_success(self, client_id, ipc_socketpair, make_frame):
         """Test successful read_output"""
         client = BaseClient(client_id)
+        server = await ipc_socketpair(client)
 
         response = {"cmd": "SET_ACTIVITY", "evt": "ACTIVITY_UPDATE", "data": {}}
-        response_json = json.dumps(response).encode("utf-8")
-        preamble = struct.pack("<II", 1, len(response_json))
-
-        client.sock_reader = AsyncMock()
-        client.sock_reader.read = AsyncMock(side_effect=[preamble, response_json])
+        server.sendall(make_frame(response))
 
         result = await client.read_output()
 
         assert result == response
 
     @pytest.mark.asyncio
-    async def test_read_output_error_event(self, client_id):
+    async def test_read_output_error_event(self, client_id, ipc_socketpair, make_frame):
         """Test read_output with ERROR event"""
         client = BaseClient(client_id)
+        server = await ipc_socketpair(client)
 
-        response = {"evt": "ERROR", "data": {"message": "Test error"}}
-        response_json = json.dumps(response).encode("utf-8")
-        preamble = struct.pack("<II", 1, len(response_json))
-
-        client.sock_reader = AsyncMock()
-        client.sock_reader.read = AsyncMock(side_effect=[preamble, response_json])
+        server.sendall(make_frame({"evt": "ERROR", "data": {"message": "Test error"}}))
 
         with pytest.raises(ServerError, match="Test error"):
             await client.read_output()
 
     @pytest.mark.asyncio
-    async def test_read_output_broken_pipe(self, client_id):
+    async def test_read_output_broken_pipe(self, client_id, ipc_socketpair):
         """Test read_output with broken pipe"""
         client = BaseClient(client_id)
-        client.sock_reader = AsyncMock()
-        client.sock_reader.read = AsyncMock(side_effect=BrokenPipeError())
+        server = await ipc_socketpair(client)
+        server.close()
 
         with pytest.raises(PipeClosed):
             await client.read_output()
 
     @pytest.mark.asyncio
-    async def test_read_output_timeout(self, client_id):
+    async def test_read_output_timeout(self, client_id, ipc_socketpair):
         """Test read_output with timeout"""
-        client = BaseClient(client_id)
-        client.sock_reader = AsyncMock()
-        client.sock_reader.read = AsyncMock(side_effect=asyncio.TimeoutError())
+        client = BaseClient(client_id, response_timeout=0.05)
+        await ipc_socketpair(client)
 
         with pytest.raises(ResponseTimeout):
             await client.read_output()
 
     @pytest.mark.asyncio
-    async def test_read_output_struct_error(self, client_id):
-        """Test read_output with struct error"""
+    async def test_read_output_not_connected(self, client_id):
+        """Test read_output before a connection exists"""
         client = BaseClient(client_id)
-        client.sock_reader = AsyncMock()
-        client.sock_reader.read = AsyncMock(side_effect=struct.error())
 
         with pytest.raises(PipeClosed):
             await client.read_output()
 
+    @pytest.mark.asyncio
+    async def test_read_output_handles_short_reads(
+        self, client_id, ipc_socketpair, make_frame
+    ):
+        """Test that a frame delivered in small chunks is read in full"""
+        client = BaseClient(client_id)
+        server = await ipc_socketpair(client)
+
+        response = {"cmd": "GET_GUILDS", "evt": None, "data": {"guilds": ["x"] * 500}}
+        frame = make_frame(response)
+
+        async def feed():
+            for i in range(0, len(frame), 100):
+                server.sendall(frame[i : i + 100])
+                await asyncio.sleep(0.001)
+
+        feeder = asyncio.ensure_future(feed())
+        assert await client.read_output() == response
+        await feeder
+
+    @pytest.mark.asyncio
+    async def test_read_output_large_frame(self, client_id, ipc_socketpair, make_frame):
+        """Test a frame larger than the receive buffer"""
+        client = BaseClient(client_id)
+        server = await ipc_socketpair(client)
+
+        response = {"cmd": "GET_CHANNELS", "evt": None, "data": "x" * 300_000}
+
+        async def feed():
+            await client.loop.sock_sendall(server, make_frame(response))
+
+        server.setblocking(False)
+        feeder = asyncio.ensure_future(feed())
+        assert await client.read_output() == response
+        await feeder
+
+    @pytest.mark.asyncio
+    async def test_read_output_truncated_frame(self, client_id, ipc_socketpair):
+        """Test that a frame cut off by EOF raises PipeClosed"""
+        client = BaseClient(client_id)
+        server = await ipc_socketpair(client)
+        server.sendall(struct.pack("<II", 1, 100) + b"{}")
+        server.close()
+
+        with pytest.raises(PipeClosed):
+            await client.read_output()
+
+    @pytest.mark.asyncio
+    async def test_read_output_single_deadline(self, client_id, ipc_socketpair):
+        """Test that a partially received frame still times out"""
+        client = BaseClient(client_id, response_timeout=0.05)
+        server = await ipc_socketpair(client)
+        server.sendall(struct.pack("<II", 1, 100))
+
+        with pytest.raises(ResponseTimeout):
+            await client.read_output()
+
 
 class TestBaseClientHandshake:
     """Test BaseClient.handshake() method"""
 
+    @staticmethod
+    def _connect_with(client, ipc_socketpair, data=b"", close=False):
+        async def mock_create_reader_writer(ipc_path):
+            server = await ipc_socketpair(client)
+            if data:
+                server.sendall(data)
+            if close:
+                server.close()
+
+        return AsyncMock(side_effect=mock_create_reader_writer)
+
     @pytest.mark.asyncio
-    async def test_handshake_success(self, client_id, mock_ipc_path):
+    async def test_handshake_success(
+        self, client_id, mock_ipc_path, ipc_socketpair, make_frame
+    ):
         """Test successful handshake"""
         client = BaseClient(client_id)
 
         # Mock successful handshake response
         response = {"cmd": "DISPATCH", "data": {"v": 1}, "evt": "READY"}
-        response_json = json.dumps(response).encode("utf-8")
-        preamble = struct.pack("<II", 1, len(response_json))
-
-        # Create mock reader and writer
-        mock_reader = AsyncMock()
-        mock_writer = Mock()
-        mock_reader.read = AsyncMock(side_effect=[preamble, response_json])
-
-        # Mock create_reader_writer to set up the mocks
-        async def mock_create_reader_writer(ipc_path):
-            client.sock_reader = mock_reader
-            client.sock_writer = mock_writer
-
-        client.create_reader_writer = AsyncMock(side_effect=mock_create_reader_writer)
+        client.create_reader_writer = self._connect_with(
+            client, ipc_socketpair, make_frame(response)
+        )
 
         await client.handshake()
 
@@ -232,69 +294,68 @@ class TestBaseClientHandshake:
         assert client.create_reader_writer.called
 
     @pytest.mark.asyncio
-    async def test_handshake_discord_not_found(self, client_id, mock_ipc_path):
-        """Test handshake when Discord IPC returns empty preamble"""
+    async def test_handshake_discord_not_found(
+        self, client_id, mock_ipc_path, ipc_socketpair
+    ):
+        """Test handshake when Discord closes the pipe without answering"""
         client = BaseClient(client_id)
-
-        # Create mock reader and writer
-        mock_reader = AsyncMock()
-        mock_writer = Mock()
-        mock_reader.read = AsyncMock(return_value=b"")
-
-        # Mock create_reader_writer to set up the mocks
-        async def mock_create_reader_writer(ipc_path):
-            client.sock_reader = mock_reader
-            client.sock_writer = mock_writer
-
-        client.create_reader_writer = AsyncMock(side_effect=mock_create_reader_writer)
+        client.create_reader_writer = self._connect_with(
+            client, ipc_socketpair, close=True
+        )
 
         with pytest.raises(InvalidPipe):
             await client.handshake()
 
     @pytest.mark.asyncio
-    async def test_handshake_invalid_client_id(self, client_id, mock_ipc_path):
+    async def test_handshake_invalid_client_id(
+        self, client_id, mock_ipc_path, ipc_socketpair, make_frame
+    ):
         """Test handshake with invalid client ID"""
         client = BaseClient(client_id)
 
         # Mock invalid client ID response
         response = {"code": 4000, "message": "Invalid Client ID"}
-        response_json = json.dumps(response).encode("utf-8")
-        preamble = struct.pack("<II", 1, len(response_json))
-
-        # Create mock reader and writer
-        mock_reader = AsyncMock()
-        mock_writer = Mock()
-        mock_reader.read = AsyncMock(side_effect=[preamble, response_json])
-
-        # Mock create_reader_writer to set up the mocks
-        async def mock_create_reader_writer(ipc_path):
-            client.sock_reader = mock_reader
-            client.sock_writer = mock_writer
-
-        client.create_reader_writer = AsyncMock(side_effect=mock_create_reader_writer)
+        client.create_reader_writer = self._connect_with(
+            client, ipc_socketpair, make_frame(response, op=2)
+        )
 
         with pytest.raises(InvalidID):
             await client.handshake()
 
     @pytest.mark.asyncio
-    async def test_handshake_short_preamble(self, client_id, mock_ipc_path):
+    async def test_handshake_short_preamble(
+        self, client_id, mock_ipc_path, ipc_socketpair
+    ):
         """Test handshake with short preamble"""
         client = BaseClient(client_id)
+        client.create_reader_writer = self._connect_with(
+            client, ipc_socketpair, b"\x00\x00", close=True
+        )
 
-        # Create mock reader and writer
-        mock_reader = AsyncMock()
-        mock_writer = Mock()
-        mock_reader.read = AsyncMock(return_value=b"\x00\x00")
+        with pytest.raises(InvalidPipe):
+            await client.handshake()
+
+    @pytest.mark.asyncio
+    async def test_handshake_sends_client_id(
+        self, client_id, mock_ipc_path, ipc_socketpair, make_frame
+    ):
+        """Test that the handshake frame carries the client ID"""
+        client = BaseClient(client_id)
+        sent = []
 
-        # Mock create_reader_writer to set up the mocks
         async def mock_create_reader_writer(ipc_path):
-            client.sock_reader = mock_reader
-            client.sock_writer = mock_writer
+            server = await ipc_socketpair(client)
+            server.sendall(make_frame({"cmd": "DISPATCH", "evt": "READY"}))
+            sent.append(server)
 
         client.create_reader_writer = AsyncMock(side_effect=mock_create_reader_writer)
+        await client.handshake()
+        await asyncio.sleep(0.01)
 
-        with pytest.raises(InvalidPipe):
-            await client.handshake()
+        data = sent[0].recv(4096)
+        op, length = struct.unpack("<II", data[:8])
+        assert op == 0
+        assert json.loads(data[8:]) == {"v": 1, "client_id": client_id}
 
 
 class TestBaseClientCreateReaderWriter:
@@ -341,7 +402,9 @@ class TestBaseClientCreateReaderWriter:
                 with pytest.raises(ConnectionTimeout):
                     await client.create_reader_writer(r"\\?\pipe\discord-ipc-0")
         else:
-            with patch("asyncio.open_unix_connection", side_effect=slow_connect):
+            with patch.object(
+                client.loop, "create_unix_connection", side_effect=slow_connect
+            ):
                 with pytest.raises(ConnectionTimeout):
                     await client.create_reader_writer("/tmp/discord-ipc-0")
 
@@ -360,3 +423,139 @@ class TestBaseClientEventLoop:
         assert asyncio.get_event_loop() is new_loop
 
         new_loop.close()
+
+
+class TestBaseClientMultiplexer:
+    """Test nonce-keyed response routing"""
+
+    @pytest.mark.asyncio
+    async def test_responses_matched_by_nonce(
+        self, client_id, ipc_socketpair, make_frame
+    ):
+        """Test that out-of-order responses resolve the right request"""
+        client = BaseClient(client_id)
+        server = await ipc_socketpair(client)
+
+        first = asyncio.ensure_future(client.read_output("1"))
+        second = asyncio.ensure_future(client.read_output("2"))
+        await asyncio.sleep(0)
+
+        server.sendall(
+            make_frame({"cmd": "GET_GUILD", "evt": None, "nonce": "2", "data": 2})
+            + make_frame({"cmd": "GET_GUILD", "evt": None, "nonce": "1", "data": 1})
+        )
+
+        assert (await first)["data"] == 1
+        assert (await second)["data"] == 2
+        assert client.in_flight.outstanding == 0
+
+    @pytest.mark.asyncio
+    async def test_error_response_raises_for_its_request(
+        self, client_id, ipc_socketpair, make_frame
+    ):
+        """Test that an ERROR response only fails the matching request"""
+        client = BaseClient(client_id)
+        server = await ipc_socketpair(client)
+
+        request = asyncio.ensure_future(client.read_output("1"))
+        await asyncio.sleep(0)
+        server.sendall(
+            make_frame({"evt": "ERROR", "nonce": "1", "data": {"message": "Nope"}})
+        )
+
+        with pytest.raises(ServerError, match="Nope"):
+            await request
+
+    @pytest.mark.asyncio
+    async def test_stale_responses_are_dropped(
+        self, client_id, ipc_socketpair, make_frame
+    ):
+        """Test that a response nobody is waiting for is not handed out"""
+        client = BaseClient(client_id, response_timeout=0.05)
+        server = await ipc_socketpair(client)
+
+        server.sendall(make_frame({"cmd": "GET_GUILDS", "evt": None, "nonce": "9"}))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(ResponseTimeout):
+            await client.read_output()
+
+    @pytest.mark.asyncio
+    async def test_read_output_without_nonce_reads_oldest_request(
+        self, client_id, ipc_socketpair, make_frame
+    ):
+        """Test that read_output() returns the reply to the oldest request"""
+        client = BaseClient(client_id)
+        server = await ipc_socketpair(client)
+
+        client.send_data(1, {"cmd": "GET_GUILD", "nonce": "1"})
+        client.send_data(1, {"cmd": "GET_CHANNEL", "nonce": "2"})
+        server.sendall(
+            make_frame({"cmd": "GET_CHANNEL", "evt": None, "nonce": "2"})
+            + make_frame({"cmd": "GET_GUILD", "evt": None, "nonce": "1"})
+        )
+
+        assert (await client.read_output())["cmd"] == "GET_GUILD"
+        assert (await client.read_output())["cmd"] == "GET_CHANNEL"
+
+    @pytest.mark.asyncio
+    async def test_event_between_send_and_read(
+        self, client_id, ipc_socketpair, make_frame
+    ):
+        """Test that an event arriving before the response is not returned"""
+        client = BaseClient(client_id)
+        server = await ipc_socketpair(client)
+
+        nonce = client.send_data(1, {"cmd": "SET_ACTIVITY", "nonce": "1"})
+        server.sendall(
+            make_frame({"cmd": "DISPATCH", "evt": "ACTIVITY_JOIN", "nonce": None})
+            + make_frame({"cmd": "SET_ACTIVITY", "evt": None, "nonce": "1"})
+        )
+        await asyncio.sleep(0.01)
+
+        assert (await client.read_output(nonce))["cmd"] == "SET_ACTIVITY"
+
+    @pytest.mark.asyncio
+    async def test_unrelated_error_event_goes_to_error_handler(
+        self, client_id, ipc_socketpair, make_frame
+    ):
+        """Test that an ERROR dispatch does not fail the pending request"""
+        errors = []
+
+        def handler(exception, future):
+            errors.append(exception)
+
+        client = BaseClient(client_id, handler=handler)
+        server = await ipc_socketpair(client)
+        client.loop.set_exception_handler(client._err_handle)
+
+        nonce = client.send_data(1, {"cmd": "SET_ACTIVITY", "nonce": "1"})
+        server.sendall(
+            make_frame(
+                {
+                    "cmd": "DISPATCH",
+                    "evt": "ERROR",
+                    "nonce": None,
+                    "data": {"code": 1000, "message": "Unrelated"},
+                }
+            )
+            + make_frame({"cmd": "SET_ACTIVITY", "evt": None, "nonce": "1"})
+        )
+
+        assert (await client.read_output(nonce))["cmd"] == "SET_ACTIVITY"
+        assert isinstance(errors[0], DiscordError)
+
+    @pytest.mark.asyncio
+    async def test_pipe_closed_fails_pending_requests(self, client_id, ipc_socketpair):
+        """Test that pending requests fail when the pipe closes"""
+        client = BaseClient(client_id)
+        server = await ipc_socketpair(client)
+
+        request = asyncio.ensure_future(client.read_output("1"))
+        await asyncio.sleep(0)
+        server.close()
+
+        with pytest.raises(PipeClosed):
+            await request
+        with pytest.raises(PipeClosed):
+            await client.read_output("2")
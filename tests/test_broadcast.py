@@ -0,0 +1,128 @@
+"""Test broadcasting presence to every running Discord"""
+
+import asyncio
+import socket
+import sys
+import threading
+
+import pytest
+
+from pypresence.broadcast import AioBroadcastPresence, BroadcastPresence
+from pypresence.exceptions import DiscordNotFound, PipeClosed, ResponseTimeout
+from pypresence.testing import FakeDiscord
+from pypresence.utils import clear_ipc_cache
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="The test servers use UNIX sockets"
+)
+
+
+@pytest.fixture
+def instances(monkeypatch, tmp_path):
+    """Run two fake Discords and leave a stale socket beside them"""
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    clear_ipc_cache()
+    socket.socket(socket.AF_UNIX).bind(str(tmp_path / "discord-ipc-2"))
+    servers = [
+        FakeDiscord(str(tmp_path / f"discord-ipc-{n}")).start() for n in range(2)
+    ]
+    yield {server.path: server.received for server in servers}
+    for server in servers:
+        server.stop()
+    clear_ipc_cache()
+
+
+class TestBroadcastPresence:
+    """Test AioBroadcastPresence and BroadcastPresence"""
+
+    @pytest.mark.asyncio
+    async def test_update_reaches_every_instance(self, client_id, instances):
+        """Test that one update is sent to each live pipe"""
+        broadcast = AioBroadcastPresence(client_id)
+
+        connected = await broadcast.connect()
+        results = await broadcast.update(state="Idle")
+        broadcast.close()
+
+        assert connected == dict.fromkeys(instances)
+        assert set(results) == set(instances)
+        assert all(r["data"]["activity"]["state"] == "Idle" for r in results.values())
+        for received in instances.values():
+            assert [p["cmd"] for p in received] == ["SET_ACTIVITY"]
+
+    @pytest.mark.asyncio
+    async def test_closed_pipe_is_dropped(self, client_id, instances):
+        """Test that a failed pipe is reported and forgotten"""
+        broadcast = AioBroadcastPresence(client_id)
+        await broadcast.connect()
+        closed, open_ = sorted(instances)
+        broadcast.presences[closed].sock_writer.close()
+        await asyncio.sleep(0)
+
+        results = await broadcast.clear()
+        broadcast.close()
+
+        assert isinstance(results[closed], PipeClosed)
+        assert results[open_]["cmd"] == "SET_ACTIVITY"
+        assert list(broadcast.presences) == []
+
+    @pytest.mark.asyncio
+    async def test_failed_handshake_is_closed(
+        self, client_id, instances, tmp_path, make_frame
+    ):
+        """Test that a pipe whose handshake times out is not left open"""
+        unready = socket.socket(socket.AF_UNIX)
+        unready.bind(str(tmp_path / "discord-ipc-3"))
+        unready.listen(4)
+        unready.settimeout(5)
+        conns = []
+
+        def answer_without_ready():
+            # Answers the discovery probe, then the handshake, never with READY
+            for _ in range(2):
+                conn, _ = unready.accept()
+                conns.append(conn)
+                conn.recv(4096)
+                conn.sendall(make_frame({}, op=4))
+
+        thread = threading.Thread(target=answer_without_ready, daemon=True)
+        thread.start()
+        broadcast = AioBroadcastPresence(client_id, response_timeout=0.1)
+
+        results = await broadcast.connect()
+        connected = set(broadcast.presences)
+        broadcast.close()
+        await asyncio.sleep(0)
+        thread.join(5)
+
+        assert isinstance(results[str(tmp_path / "discord-ipc-3")], ResponseTimeout)
+        assert connected == set(instances)
+        for conn in conns:
+            conn.settimeout(1)
+            with conn:
+                # Reaches the end instead of timing out
+                b"".join(iter(lambda: conn.recv(4096), b""))
+        assert len(conns) == 2
+        unready.close()
+
+    @pytest.mark.asyncio
+    async def test_nothing_running(self, client_id, monkeypatch, tmp_path):
+        """Test that connect raises DiscordNotFound without any Discord"""
+        monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+        clear_ipc_cache()
+
+        with pytest.raises(DiscordNotFound):
+            await AioBroadcastPresence(client_id).connect()
+
+    def test_sync_shares_one_loop(self, client_id, instances):
+        """Test the synchronous wrapper running every connection on one loop"""
+        broadcast = BroadcastPresence(client_id)
+        broadcast.connect()
+        results = broadcast.update(state="Idle")
+
+        loops = {presence.loop for presence in broadcast.presences.values()}
+        broadcast.close()
+
+        assert loops == {broadcast.loop}
+        assert set(results) == set(instances)
+        assert broadcast.loop.is_closed()
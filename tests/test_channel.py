@@ -0,0 +1,104 @@
+"""Test the bounded event channel"""
+
+import asyncio
+
+import pytest
+
+from pypresence.channel import EventChannel
+from pypresence.exceptions import InvalidArgument
+
+
+class TestEventChannelInit:
+    """Test EventChannel configuration"""
+
+    def test_default_low_water(self):
+        """Test that low water defaults to a quarter of high water"""
+        channel = EventChannel(high_water=100)
+
+        assert channel.low_water == 25
+
+    def test_invalid_watermarks(self):
+        """Test that low water above high water is rejected"""
+        with pytest.raises(InvalidArgument):
+            EventChannel(high_water=10, low_water=20)
+
+    def test_invalid_overflow(self):
+        """Test that unknown overflow policies are rejected"""
+        with pytest.raises(InvalidArgument):
+            EventChannel(overflow="explode")
+
+
+class TestEventChannelOverflow:
+    """Test EventChannel overflow policies"""
+
+    @pytest.mark.asyncio
+    async def test_drop_oldest(self):
+        """Test that the oldest events are discarded when full"""
+        channel = EventChannel(high_water=3, overflow="drop_oldest")
+        for n in range(5):
+            channel.put(n)
+
+        assert len(channel) == 3
+        assert channel.dropped == 2
+        assert [await channel.get() for _ in range(3)] == [2, 3, 4]
+
+    @pytest.mark.asyncio
+    async def test_drop_newest(self):
+        """Test that incoming events are discarded when full"""
+        channel = EventChannel(high_water=3, overflow="drop_newest")
+        for n in range(5):
+            channel.put(n)
+
+        assert channel.dropped == 2
+        assert [await channel.get() for _ in range(3)] == [0, 1, 2]
+
+    @pytest.mark.asyncio
+    async def test_pause_and_resume(self):
+        """Test that the pause policy signals at high and low water"""
+        calls = []
+        channel = EventChannel(
+            high_water=4,
+            low_water=1,
+            overflow="pause",
+            on_pause=lambda: calls.append("pause"),
+            on_resume=lambda: calls.append("resume"),
+        )
+        for n in range(5):
+            channel.put(n)
+
+        assert calls == ["pause"]
+        assert channel.dropped == 0
+        assert len(channel) == 5
+
+        for _ in range(3):
+            await channel.get()
+        assert calls == ["pause"]
+        await channel.get()
+        assert calls == ["pause", "resume"]
+
+
+class TestEventChannelGet:
+    """Test EventChannel.get()"""
+
+    @pytest.mark.asyncio
+    async def test_get_waits_for_put(self):
+        """Test that get() waits until an event arrives"""
+        channel = EventChannel()
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        assert not getter.done()
+
+        channel.put("event")
+
+        assert await getter == "event"
+
+    @pytest.mark.asyncio
+    async def test_close_drains_then_returns_none(self):
+        """Test that a closed channel still yields its backlog"""
+        channel = EventChannel()
+        channel.put("event")
+        channel.close()
+        channel.put("ignored")
+
+        assert await channel.get() == "event"
+        assert await channel.get() is None
@@ -0,0 +1,158 @@
+"""Test Client event handling"""
+
+import asyncio
+
+import pytest
+
+from pypresence import AioClient, Client
+
+
+@pytest.fixture
+def make_event(make_frame):
+    """Factory fixture for encoding an event dispatch frame"""
+
+    def _make_event(evt, data=None):
+        return make_frame({"cmd": "DISPATCH", "evt": evt, "data": data, "nonce": None})
+
+    return _make_event
+
+
+class TestClientOnEvent:
+    """Test event dispatch for Client"""
+
+    @pytest.mark.asyncio
+    async def test_split_event_frame(self, client_id, ipc_socketpair, make_event):
+        """Test that an event split across chunks is dispatched once complete"""
+        client = Client(client_id)
+        server = await ipc_socketpair(client)
+        received = []
+        client._events["speaking_start"] = received.append
+
+        data = make_event("SPEAKING_START", {"user_id": "1"})
+        server.sendall(data[:10])
+        await asyncio.sleep(0.01)
+        assert received == []
+        server.sendall(data[10:])
+        await asyncio.sleep(0.01)
+
+        assert received == [{"user_id": "1"}]
+
+    @pytest.mark.asyncio
+    async def test_coalesced_event_frames(self, client_id, ipc_socketpair, make_event):
+        """Test that every event in a single chunk is dispatched"""
+        client = Client(client_id)
+        server = await ipc_socketpair(client)
+        received = []
+        client._events["speaking_start"] = received.append
+        client._events["speaking_stop"] = received.append
+
+        server.sendall(
+            make_event("SPEAKING_START", {"user_id": "1"})
+            + make_event("SPEAKING_STOP", {"user_id": "1"})
+            + make_event("SPEAKING_START", {"user_id": "2"})
+        )
+        await asyncio.sleep(0.01)
+
+        assert received == [{"user_id": "1"}, {"user_id": "1"}, {"user_id": "2"}]
+
+    @pytest.mark.asyncio
+    async def test_events_do_not_reach_read_output(
+        self, client_id, ipc_socketpair, make_event, make_frame
+    ):
+        """Test that events go to handlers and not to the response path"""
+        client = Client(client_id, response_timeout=0.5)
+        server = await ipc_socketpair(client)
+        received = []
+        client._events["speaking_start"] = received.append
+
+        client.send_data(1, {"cmd": "GET_GUILDS", "nonce": "1"})
+        server.sendall(
+            make_event("SPEAKING_START", {"user_id": "1"})
+            + make_frame({"cmd": "GET_GUILDS", "evt": None, "nonce": "1"})
+        )
+
+        assert (await client.read_output())["cmd"] == "GET_GUILDS"
+        assert received == [{"user_id": "1"}]
+
+
+class TestAioClientOnEvent:
+    """Test event dispatch for AioClient"""
+
+    @pytest.mark.asyncio
+    async def test_split_and_coalesced_event_frames(
+        self, client_id, ipc_socketpair, make_event
+    ):
+        """Test that split and coalesced events all reach the handler"""
+        client = AioClient(client_id)
+        server = await ipc_socketpair(client)
+        received = []
+
+        async def handler(data):
+            received.append(data)
+
+        client._events["message_create"] = handler
+
+        data = b"".join(make_event("MESSAGE_CREATE", {"n": n}) for n in range(3))
+        for chunk in (data[:7], data[7:-5], data[-5:]):
+            server.sendall(chunk)
+            await asyncio.sleep(0.01)
+
+        assert received == [{"n": 0}, {"n": 1}, {"n": 2}]
+
+
+class TestClientEventBackpressure:
+    """Test that slow event handlers cannot grow memory without bound"""
+
+    @pytest.mark.asyncio
+    async def test_slow_handler_drops_oldest(
+        self, client_id, ipc_socketpair, make_event
+    ):
+        """Test that a backlog beyond high water drops the oldest events"""
+        client = AioClient(client_id, event_high_water=2)
+        server = await ipc_socketpair(client)
+        received = []
+        release = asyncio.Event()
+
+        async def handler(data):
+            await release.wait()
+            received.append(data)
+
+        client._events["speaking_start"] = handler
+
+        server.sendall(
+            b"".join(make_event("SPEAKING_START", {"n": n}) for n in range(6))
+        )
+        await asyncio.sleep(0.01)
+        assert len(client._event_channel) <= 2
+        release.set()
+        await asyncio.sleep(0.01)
+
+        assert received[-2:] == [{"n": 4}, {"n": 5}]
+        assert len(received) + client._event_channel.dropped == 6
+
+    @pytest.mark.asyncio
+    async def test_pause_policy_pauses_reading(
+        self, client_id, ipc_socketpair, make_event
+    ):
+        """Test that the pause policy stops reading from the socket"""
+        client = AioClient(
+            client_id, event_high_water=2, event_low_water=0, event_overflow="pause"
+        )
+        server = await ipc_socketpair(client)
+        release = asyncio.Event()
+
+        async def handler(data):
+            await release.wait()
+
+        client._events["speaking_start"] = handler
+
+        server.sendall(
+            b"".join(make_event("SPEAKING_START", {"n": n}) for n in range(4))
+        )
+        await asyncio.sleep(0.01)
+        assert not client.sock_writer.is_reading()
+
+        release.set()
+        await asyncio.sleep(0.01)
+        assert client.sock_writer.is_reading()
+        assert client._event_channel.dropped == 0
@@ -0,0 +1,103 @@
+"""Test the pluggable JSON codecs"""
+
+import pytest
+
+from pypresence import codec as codec_module
+from pypresence.codec import Codec, available_codecs, get_codec
+from pypresence.exceptions import InvalidArgument
+from pypresence.presence import Presence
+from pypresence.protocol import FrameDecoder, encode_frame
+
+PAYLOAD = {"cmd": "SET_ACTIVITY", "args": {"pid": 1, "activity": {"state": "Ünï"}}}
+
+
+class CountingCodec(Codec):
+    """The stdlib codec, counting how often it is used"""
+
+    def __init__(self):
+        self.dumped = self.loaded = 0
+
+    def dumps(self, obj):
+        self.dumped += 1
+        return super().dumps(obj)
+
+    def loads(self, data):
+        self.loaded += 1
+        return super().loads(data)
+
+
+class TestGetCodec:
+    """Test resolving codecs"""
+
+    def test_auto_prefers_fastest(self):
+        """Test that auto picks the first available codec"""
+        assert get_codec().name == available_codecs()[0]
+        assert available_codecs()[-1] == "json"
+
+    def test_auto_falls_back_to_stdlib(self, monkeypatch):
+        """Test that auto uses the stdlib when nothing faster is installed"""
+        monkeypatch.setitem(codec_module._MODULES, "orjson", None)
+        monkeypatch.setitem(codec_module._MODULES, "msgspec", None)
+
+        assert get_codec().name == "json"
+
+    def test_unknown(self):
+        """Test that an unknown name is rejected"""
+        with pytest.raises(InvalidArgument):
+            get_codec("yaml")
+
+    def test_not_installed(self, monkeypatch):
+        """Test that asking for a missing backend is rejected"""
+        monkeypatch.setitem(codec_module._MODULES, "orjson", None)
+
+        with pytest.raises(InvalidArgument, match="not installed"):
+            get_codec("orjson")
+
+    def test_instance_passed_through(self):
+        """Test that a codec object is used as it is"""
+        codec = CountingCodec()
+
+        assert get_codec(codec) is codec
+
+
+@pytest.mark.parametrize("name", available_codecs())
+class TestCodecs:
+    """Test every installed codec"""
+
+    def test_round_trip(self, name):
+        """Test that payloads survive encoding and decoding"""
+        codec = get_codec(name)
+        data = codec.dumps(PAYLOAD)
+
+        assert isinstance(data, bytes)
+        assert codec.loads(memoryview(data)) == PAYLOAD
+
+    def test_frames_across_codecs(self, name):
+        """Test that frames from one codec decode with any other"""
+        frame = encode_frame(1, PAYLOAD, get_codec(name))
+
+        for other in available_codecs():
+            decoder = FrameDecoder(codec=get_codec(other))
+            assert decoder.feed(frame[:5]) == []
+            assert decoder.feed(frame[5:]) == [(1, PAYLOAD)]
+
+
+class TestClientCodec:
+    """Test choosing a codec per client"""
+
+    def test_client_option(self, client_id):
+        """Test that a client uses the codec it was given"""
+        presence = Presence(client_id, codec="json")
+
+        assert presence.codec.name == "json"
+        assert presence._connection.codec is presence.codec
+
+    def test_session(self, client_id, fake_discord):
+        """Test that every frame of a session goes through the codec"""
+        codec = CountingCodec()
+        presence = Presence(client_id, codec=codec)
+        presence.connect()
+        presence.update(state="Idle")
+        presence.close()
+
+        assert (codec.dumped, codec.loaded) == (3, 2)
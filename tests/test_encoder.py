@@ -0,0 +1,194 @@
+"""Test encoding activities straight to JSON"""
+
+import json
+
+import pytest
+
+from pypresence.codec import Codec
+from pypresence.encoder import EncodedPayload, FrameCache, encode_activity
+from pypresence.payloads import Payload
+from pypresence.presence import Presence
+from pypresence.protocol import FrameDecoder
+from pypresence.types import ActivityType, StatusDisplayType
+
+ACTIVITIES = [
+    {},
+    {"pid": 1, "state": "In a match", "details": "Ranked"},
+    {"state": "Ünïcödé ✨", "details": 'quotes " and \\ slashes'},
+    {"activity_type": ActivityType.WATCHING, "status_display_type": 1},
+    {"start": 1700000000.7, "end": 1700003600},
+    {"end": 1700003600},
+    {"large_image": "map", "small_text": "Gold", "small_url": "https://a.b"},
+    {"party_id": "p1", "party_size": [2, 5], "join": "secret"},
+    {"spectate": "sp", "match": "ma", "name": "Game", "state_url": "https://a.b"},
+    {"buttons": [{"label": "Watch", "url": "https://example.com"}]},
+    {"pid": None, "instance": False},
+]
+
+
+@pytest.fixture
+def fixed_time(monkeypatch):
+    """Make nonces predictable"""
+    monkeypatch.setattr(Payload, "nonce", staticmethod(lambda: "1"))
+
+
+class TestEncodeActivity:
+    """Test encode_activity against Payload.set_activity"""
+
+    @pytest.mark.parametrize("fields", ACTIVITIES)
+    def test_matches_payload(self, fixed_time, fields):
+        """Test that the encoded JSON is what Payload.set_activity builds"""
+        payload = encode_activity(**fields)
+
+        assert json.loads(payload.body) == Payload.set_activity(**fields).data
+
+    def test_data_decoded_lazily(self, fixed_time):
+        """Test that data is only decoded when asked for"""
+        payload = encode_activity(state="Idle")
+
+        assert payload._data is None
+        assert payload.data["args"]["activity"]["state"] == "Idle"
+        assert payload.data["nonce"] == payload.nonce
+
+    def test_fingerprint_ignores_nonce(self):
+        """Test that the same activity keeps its fingerprint between calls"""
+        first = encode_activity(state="Idle")
+        second = encode_activity(state="Idle")
+
+        assert first.nonce != second.nonce
+        assert first.fingerprint == second.fingerprint
+        assert first.fingerprint != encode_activity(state="Busy").fingerprint
+
+
+class TestFrameCache:
+    """Test reusing encoded activities"""
+
+    @pytest.mark.parametrize("fields", ACTIVITIES)
+    def test_hit_matches_payload(self, fixed_time, fields):
+        """Test that a cached activity encodes like an uncached one"""
+        cache = FrameCache()
+        encode_activity(**fields, cache=cache)
+        payload = encode_activity(**fields, cache=cache)
+
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert json.loads(payload.body) == Payload.set_activity(**fields).data
+
+    def test_timestamps_spliced(self, fixed_time):
+        """Test that only the timestamps change between cached activities"""
+        cache = FrameCache()
+        buttons = [{"label": "Watch", "url": "https://example.com"}]
+        first = encode_activity(state="Lobby", buttons=buttons, cache=cache)
+        second = encode_activity(
+            state="Lobby", buttons=list(buttons), start=100, cache=cache
+        )
+
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert "timestamps" not in first.data["args"]["activity"]
+        assert second.data["args"]["activity"]["timestamps"] == {"start": 100}
+        assert second.data["args"]["activity"]["buttons"] == buttons
+
+    def test_contents_are_the_key(self):
+        """Test that different activities are cached separately"""
+        cache = FrameCache()
+        encode_activity(state="Lobby", cache=cache)
+        encode_activity(state="Lobby", party_size=[1, 4], cache=cache)
+        encode_activity(state="Lobby", party_size=[2, 4], cache=cache)
+
+        assert (cache.hits, cache.misses, len(cache)) == (0, 3, 3)
+
+    def test_unhashable_skips_cache(self):
+        """Test that an unhashable value is encoded without the cache"""
+        cache = FrameCache()
+        payload = encode_activity(state=["Lobby"], cache=cache, validation=None)
+
+        assert payload.data["args"]["activity"]["state"] == ["Lobby"]
+        assert len(cache) == 0
+
+    def test_least_recently_used_evicted(self):
+        """Test that the cache drops the activity used longest ago"""
+        cache = FrameCache(maxsize=2)
+        for state in ("Menu", "Lobby", "Menu", "Match"):
+            encode_activity(state=state, cache=cache)
+        encode_activity(state="Menu", cache=cache)
+        encode_activity(state="Lobby", cache=cache)
+
+        assert len(cache) == 2
+        assert (cache.hits, cache.misses) == (2, 4)
+        assert cache.hit_rate == pytest.approx(1 / 3)
+
+    def test_clear(self):
+        """Test that clearing empties the cache and its counts"""
+        cache = FrameCache()
+        encode_activity(state="Menu", cache=cache)
+        cache.clear()
+
+        assert (len(cache), cache.hits, cache.misses, cache.hit_rate) == (0, 0, 0, 0)
+
+    def test_client_option(self, client_id):
+        """Test that clients cache activities unless told not to"""
+
+        class MyCodec(Codec):
+            pass
+
+        assert Presence(client_id).frame_cache.maxsize == 32
+        assert Presence(client_id, frame_cache=4).frame_cache.maxsize == 4
+        assert Presence(client_id, frame_cache=0).frame_cache is None
+        assert Presence(client_id, codec=MyCodec()).frame_cache is None
+
+    def test_repeat_updates(self, client_id, fake_discord):
+        """Test that a repeated update is encoded from the cache"""
+        presence = Presence(client_id)
+        presence.connect()
+        for _ in range(3):
+            presence.update(state="Lobby", force=True)
+        presence.close()
+
+        assert (presence.frame_cache.hits, presence.frame_cache.misses) == (2, 1)
+        states = [c["args"]["activity"]["state"] for c in fake_discord.received]
+        assert states == ["Lobby"] * 3
+
+
+class TestFastPath:
+    """Test clients sending encoded activities"""
+
+    def test_send_data_writes_body(self, client_id, mock_stream_writer):
+        """Test that send_data frames the encoded body as it is"""
+        presence = Presence(client_id)
+        presence.sock_writer = mock_stream_writer
+        payload = encode_activity(state="Idle")
+
+        assert presence.send_data(1, payload) == payload.nonce
+        frame = mock_stream_writer.write.call_args[0][0]
+        assert frame[8:] == payload.body
+        assert FrameDecoder().feed(frame) == [(1, payload.data)]
+
+    def test_update_uses_fast_path(self, client_id, fake_discord):
+        """Test that Presence.update sends an encoded activity"""
+        presence = Presence(client_id)
+        presence.connect()
+        presence.update(state="Idle", activity_type=ActivityType.LISTENING)
+        presence.close()
+
+        assert isinstance(presence._last_activity, EncodedPayload)
+        activity = fake_discord.received[0]["args"]["activity"]
+        assert activity["state"] == "Idle"
+        assert activity["type"] == ActivityType.LISTENING.value
+        assert activity["status_display_type"] == StatusDisplayType.NAME.value
+
+    def test_custom_codec_skips_fast_path(self, client_id):
+        """Test that a user's codec still encodes activities itself"""
+
+        class MyCodec(Codec):
+            pass
+
+        presence = Presence(client_id, codec=MyCodec())
+
+        assert not isinstance(presence._activity(state="Idle"), EncodedPayload)
+
+    def test_replay(self, client_id):
+        """Test that an encoded activity is replayed after a reconnect"""
+        presence = Presence(client_id)
+        presence._remember(encode_activity(state="Idle"))
+
+        (replayed,) = presence._replay_payloads()
+        assert replayed["args"]["activity"]["state"] == "Idle"
@@ -0,0 +1,141 @@
+"""Test tracking requests that are waiting for a response"""
+
+import asyncio
+from unittest.mock import Mock
+
+import pytest
+
+from pypresence.baseclient import BaseClient
+from pypresence.client import AioClient
+from pypresence.exceptions import PipeClosed, ResponseTimeout
+from pypresence.inflight import InFlight
+from pypresence.payloads import Payload
+from pypresence.presence import Presence
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestInFlight:
+    """Test the in-flight index on its own"""
+
+    def test_order_and_age(self):
+        """Test that requests are kept in the order sent and age with the clock"""
+        clock = FakeClock()
+        in_flight = InFlight(clock)
+        in_flight.add("1", "GET_GUILDS")
+        clock.now = 2.0
+        in_flight.add("2", "GET_CHANNELS")
+        clock.now = 5.0
+
+        assert [r.nonce for r in in_flight] == ["1", "2"]
+        assert in_flight.oldest().age == 5.0
+        assert in_flight.outstanding == len(in_flight) == 2
+        assert [r.nonce for r in in_flight.expired(4.0)] == ["1"]
+
+    def test_answered(self):
+        """Test that latency is recorded once, when the reply arrives"""
+        clock = FakeClock()
+        in_flight = InFlight(clock)
+        in_flight.add("1")
+        clock.now = 0.25
+        request = in_flight.answered("1")
+        clock.now = 1.0
+        in_flight.answered("1")
+
+        assert request.latency == in_flight.last_latency == 0.25
+        assert in_flight.completed == 1
+        assert "1" in in_flight
+        assert in_flight.answered("unknown") is None
+
+    def test_timed_out(self):
+        """Test that giving up on a request counts it and forgets it"""
+        in_flight = InFlight()
+        in_flight.add("1")
+
+        assert in_flight.timed_out("1").nonce == "1"
+        assert in_flight.timed_out("1") is None
+        assert in_flight.timeouts == 1
+        assert in_flight.outstanding == 0
+
+    async def test_fail(self):
+        """Test that every waiting future is failed and the index emptied"""
+        loop = asyncio.get_running_loop()
+        in_flight = InFlight()
+        waiting = in_flight.add("1", future=loop.create_future()).future
+        in_flight.add("2")
+
+        in_flight.fail(PipeClosed)
+
+        assert isinstance(waiting.exception(), PipeClosed)
+        assert in_flight.outstanding == 0
+
+
+class TestClientRequests:
+    """Test how clients number and track their requests"""
+
+    def test_nonces_count_up(self, client_id, fake_discord):
+        """Test that each command gets the next integer nonce"""
+        presence = Presence(client_id)
+        presence.connect()
+        presence.update(state="Lobby")
+        presence.update(state="In a match")
+        presence.close()
+
+        assert [c["nonce"] for c in fake_discord.received] == ["1", "2"]
+
+    def test_nonces_never_shared(self, client_id):
+        """Test that a nonce already waiting for a reply is never reused"""
+        client = BaseClient(client_id)
+        client.sock_writer = Mock()
+
+        assert client.send_data(1, {"cmd": "GET_GUILDS", "nonce": "1"}) == "1"
+        assert client.send_data(1, Payload.get_guilds()) == "2"
+        assert client.send_data(1, {"cmd": "GET_GUILDS", "nonce": "2"}) == "3"
+        assert [r.nonce for r in client.in_flight] == ["1", "2", "3"]
+
+    async def test_override_nonce_collision(self, client_id, fake_discord):
+        """Test that an override reusing a pending nonce gets its own reply"""
+        client = AioClient(client_id)
+        await client.start()
+        override = dict(Payload.set_activity(state="Override").data, nonce="1")
+
+        guild, activity = await asyncio.gather(
+            client.get_guild("g1"), client.set_activity(payload_override=override)
+        )
+        client.close()
+
+        assert guild["cmd"] == "GET_GUILD"
+        assert activity["cmd"] == "SET_ACTIVITY"
+        assert activity["data"]["activity"]["state"] == "Override"
+
+    async def test_latency_recorded(self, client_id, ipc_socketpair, make_frame):
+        """Test that reading the reply records the round trip"""
+        client = BaseClient(client_id)
+        server = await ipc_socketpair(client)
+
+        nonce = client.send_data(1, {"cmd": "GET_GUILDS"})
+        assert client.in_flight.get(nonce).cmd == "GET_GUILDS"
+        server.sendall(make_frame({"cmd": "GET_GUILDS", "evt": None, "nonce": nonce}))
+        await client.read_output(nonce)
+
+        assert client.in_flight.completed == 1
+        assert client.in_flight.last_latency >= 0
+        assert client.in_flight.outstanding == 0
+
+    async def test_timeout_counted(self, client_id, ipc_socketpair):
+        """Test that a request without a reply is counted and dropped"""
+        client = BaseClient(client_id, response_timeout=0.05)
+        await ipc_socketpair(client)
+
+        nonce = client.send_data(1, {"cmd": "GET_GUILDS"})
+        with pytest.raises(ResponseTimeout):
+            await client.read_output(nonce)
+
+        assert client.in_flight.timeouts == 1
+        assert nonce not in client.in_flight
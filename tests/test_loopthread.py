@@ -0,0 +1,119 @@
+"""Test the background loop thread and the threaded synchronous clients"""
+
+import asyncio
+import concurrent.futures
+import threading
+
+import pytest
+
+from pypresence.client import AioClient, Client
+from pypresence.exceptions import InvalidArgument, PyPresenceException
+from pypresence.loopthread import LoopThread
+from pypresence.presence import Presence
+
+
+class TestLoopThread:
+    """Test LoopThread"""
+
+    def test_run_returns_result(self):
+        """Test that a coroutine runs on the background thread"""
+        loop_thread = LoopThread()
+        loop_thread.start()
+
+        async def current_thread():
+            return threading.current_thread()
+
+        try:
+            assert loop_thread.run(current_thread()) is loop_thread._thread
+        finally:
+            loop_thread.stop()
+        assert loop_thread.loop.is_closed()
+
+    def test_submit_returns_future(self):
+        """Test that submit returns a concurrent future"""
+        loop_thread = LoopThread()
+        loop_thread.start()
+
+        async def answer():
+            await asyncio.sleep(0)
+            return 42
+
+        try:
+            future = loop_thread.submit(answer())
+            assert isinstance(future, concurrent.futures.Future)
+            assert future.result(1) == 42
+        finally:
+            loop_thread.stop()
+
+    def test_stop_cancels_pending_tasks(self):
+        """Test that tasks still running when the loop stops are cancelled"""
+        loop_thread = LoopThread()
+        loop_thread.start()
+        future = loop_thread.submit(asyncio.sleep(60))
+
+        loop_thread.stop()
+
+        assert future.cancelled()
+
+    def test_blocking_run_from_loop_thread(self):
+        """Test that waiting on the loop from its own thread is refused"""
+        loop_thread = LoopThread()
+        loop_thread.start()
+
+        async def nested():
+            return loop_thread.run(asyncio.sleep(0))
+
+        try:
+            with pytest.raises(PyPresenceException):
+                loop_thread.run(nested())
+        finally:
+            loop_thread.stop()
+
+
+class TestThreadedClient:
+    """Test synchronous clients running on a background loop"""
+
+    def test_async_client_rejects_threaded(self, client_id):
+        """Test that AioClient cannot be threaded"""
+        with pytest.raises(InvalidArgument):
+            AioClient(client_id, threaded=True)
+
+    def test_concurrent_commands(self, client_id, fake_discord):
+        """Test that several threads can share one connection"""
+        client = Client(client_id, threaded=True)
+        client.start()
+        try:
+            with concurrent.futures.ThreadPoolExecutor(8) as pool:
+                results = list(pool.map(client.get_guild, map(str, range(32))))
+        finally:
+            client.close()
+
+        assert [r["data"]["guild_id"] for r in results] == list(map(str, range(32)))
+        assert len(fake_discord.received) == 32
+        assert client.loop.is_closed()
+
+    def test_non_blocking_returns_futures(self, client_id, fake_discord):
+        """Test that blocking=False returns concurrent futures"""
+        client = Client(client_id, threaded=True, blocking=False)
+        client.start().result(5)
+        try:
+            futures = [client.get_channel(str(n)) for n in range(4)]
+            results = [f.result(5) for f in futures]
+        finally:
+            client.close()
+
+        assert [r["data"]["channel_id"] for r in results] == ["0", "1", "2", "3"]
+
+    def test_threaded_presence(self, client_id, fake_discord):
+        """Test Presence updates through the background loop"""
+        presence = Presence(client_id, threaded=True)
+        presence.connect()
+        try:
+            presence.update(state="Idle")
+            presence.update(state="Idle")
+            presence.clear()
+        finally:
+            presence.close()
+
+        assert [p["cmd"] for p in fake_discord.received] == ["SET_ACTIVITY"] * 2
+        assert fake_discord.received[0]["args"]["activity"]["state"] == "Idle"
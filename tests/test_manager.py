@@ -0,0 +1,75 @@
+"""Test running presences for several applications on one loop"""
+
+import sys
+import threading
+
+import pytest
+
+from pypresence.manager import PresenceManager
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="The test server uses UNIX sockets"
+)
+
+
+class TestPresenceManager:
+    """Test PresenceManager"""
+
+    def test_presences_share_one_loop(self, fake_discord):
+        """Test that each client ID gets its own connection on the same loop"""
+        with PresenceManager() as manager:
+            first = manager.get("1")
+            second = manager.get("2")
+            first.update(state="One")
+            second.update(state="Two")
+
+            assert manager.get("1") is first
+            assert first.loop is second.loop is manager.loop
+            assert first.sock_writer is not second.sock_writer
+
+        states = [p["args"]["activity"]["state"] for p in fake_discord.received]
+        assert states == ["One", "Two"]
+        assert manager.loop.is_closed()
+
+    def test_release_keeps_loop_running(self, fake_discord):
+        """Test that releasing one client ID leaves the others working"""
+        with PresenceManager() as manager:
+            first = manager.get("1")
+            second = manager.get("2")
+
+            manager.release("1")
+            second.update(state="Still here")
+
+            assert first.sock_writer.is_closing()
+            assert manager.loop.is_running()
+            assert manager.client_ids == ["2"]
+            assert manager.get("1") is not first
+
+    def test_options(self, fake_discord):
+        """Test that get overrides the manager's default options"""
+        with PresenceManager(response_timeout=5) as manager:
+            presence = manager.get("1", response_timeout=1)
+
+            assert presence.response_timeout == 1
+            assert manager.get("2").response_timeout == 5
+
+    def test_handlers_stay_per_presence(self, fake_discord):
+        """Test that each presence's errors reach its own handler"""
+        errors = {"1": [], "2": []}
+        reported = threading.Semaphore(0)
+
+        def first(exception, future):
+            errors["1"].append(exception)
+            reported.release()
+
+        def second(exception, future):
+            errors["2"].append(exception)
+            reported.release()
+
+        with PresenceManager() as manager:
+            manager.get("1", handler=first)
+            manager.get("2", handler=second)
+            fake_discord.dispatch("ERROR", {"code": 4000, "message": "Bad"})
+            assert reported.acquire(timeout=5) and reported.acquire(timeout=5)
+
+        assert [len(errors["1"]), len(errors["2"])] == [1, 1]
@@ -349,3 +349,22 @@ class TestSetActivityURLFeatures:
         assert activity["buttons"] == [
             {"label": "Website", "url": "https://example.com"}
         ]
+
+
+class TestPayloadFingerprint:
+    """Test Payload.fingerprint"""
+
+    def test_fingerprint_ignores_nonce(self):
+        """Test that payloads differing only in nonce match"""
+        first = Payload.set_activity(state="Idle", details="Menu")
+        second = Payload.set_activity(details="Menu", state="Idle")
+
+        assert first.data["nonce"] != second.data["nonce"]
+        assert first.fingerprint == second.fingerprint
+
+    def test_fingerprint_detects_changes(self):
+        """Test that any change in the activity changes the fingerprint"""
+        first = Payload.set_activity(state="Idle", party_size=[1, 4])
+        second = Payload.set_activity(state="Idle", party_size=[2, 4])
+
+        assert first.fingerprint != second.fingerprint
@@ -1,5 +1,6 @@
 """Test Presence class with mocked I/O"""
 
+import asyncio
 import json
 import struct
 from unittest.mock import AsyncMock, Mock, patch
@@ -256,6 +257,29 @@ class TestAioPresence:
         assert result == mock_response
         assert presence.sock_writer.write.called
 
+    @pytest.mark.asyncio
+    async def test_aio_close_leaves_running_loop(self, client_id):
+        """Test that closing inside the loop does not try to close the loop"""
+        presence = AioPresence(client_id)
+        presence.sock_writer = Mock()
+
+        presence.close()
+
+        assert not asyncio.get_running_loop().is_closed()
+        assert presence.sock_writer.write.called
+
+    def test_aio_disconnect_keeps_loop(self, client_id):
+        """Test that disconnect closes the pipe but never the loop"""
+        presence = AioPresence(client_id)
+        presence.sock_writer = Mock()
+
+        presence.disconnect()
+
+        assert not presence.loop.is_closed()
+        assert presence.sock_writer.write.called
+        presence.sock_writer.close.assert_called_once()
+        presence.loop.close()
+
 
 class TestPresenceURLFeatures:
     """Test Presence URL features (state_url, details_url, large_url, small_url)"""
@@ -460,3 +484,117 @@ class TestAioPresenceURLFeatures:
         assets = activity["assets"]
         assert assets["large_url"] == "https://cdn.example.com/large.png"
         assert assets["small_url"] == "https://cdn.example.com/small.png"
+
+
+class TestPresenceScheduler:
+    """Test Presence with an activity scheduler"""
+
+    @patch("pypresence.baseclient.BaseClient.read_output")
+    def test_throttled_update_is_queued(self, mock_read_output, client_id):
+        """Test that updates beyond the rate are held back until flushed"""
+        from pypresence import ActivityScheduler
+
+        scheduler = ActivityScheduler(rate=1, period=0.2)
+        presence = Presence(client_id, scheduler=scheduler)
+        presence.sock_writer = Mock()
+        mock_read_output.return_value = {"evt": None}
+
+        assert presence.update(state="first") == {"evt": None}
+        assert presence.update(state="second") is None
+        assert presence.update(state="third") is None
+        assert presence.sock_writer.write.call_count == 1
+
+        assert presence.flush() == {"evt": None}
+        call_args = presence.sock_writer.write.call_args[0][0]
+        payload = json.loads(call_args[8:])
+        assert payload["args"]["activity"]["state"] == "third"
+        assert presence.flush() is None
+
+    @pytest.mark.asyncio
+    async def test_aio_updates_are_coalesced(self, client_id):
+        """Test that AioPresence only sends the latest queued update"""
+        from pypresence import ActivityScheduler
+
+        presence = AioPresence(
+            client_id, scheduler=ActivityScheduler(rate=1, period=0.05)
+        )
+        presence.sock_writer = Mock()
+        presence.read_output = AsyncMock(return_value={"evt": None})
+
+        await asyncio.gather(*(presence.update(state=f"Track {n}") for n in range(3)))
+
+        states = [
+            json.loads(call[0][0][8:])["args"]["activity"]["state"]
+            for call in presence.sock_writer.write.call_args_list
+        ]
+        assert states == ["Track 0", "Track 2"]
+
+
+class TestPresenceDeduplication:
+    """Test that unchanged activities are not re-sent"""
+
+    @patch("pypresence.baseclient.BaseClient.read_output")
+    def test_identical_update_is_skipped(self, mock_read_output, client_id):
+        """Test that repeating the applied activity skips the round trip"""
+        presence = Presence(client_id)
+        presence.sock_writer = Mock()
+        mock_read_output.return_value = {"evt": None, "data": {"state": "Idle"}}
+
+        first = presence.update(state="Idle", details="Menu")
+        second = presence.update(state="Idle", details="Menu")
+
+        assert presence.sock_writer.write.call_count == 1
+        assert second == first
+
+    @patch("pypresence.baseclient.BaseClient.read_output")
+    def test_changed_update_is_sent(self, mock_read_output, client_id):
+        """Test that a different activity is sent"""
+        presence = Presence(client_id)
+        presence.sock_writer = Mock()
+        mock_read_output.return_value = {}
+
+        presence.update(state="Idle")
+        presence.update(state="In game")
+        presence.update(state="Idle")
+
+        assert presence.sock_writer.write.call_count == 3
+
+    @patch("pypresence.baseclient.BaseClient.read_output")
+    def test_force_resends(self, mock_read_output, client_id):
+        """Test that force=True always sends"""
+        presence = Presence(client_id)
+        presence.sock_writer = Mock()
+        mock_read_output.return_value = {}
+
+        presence.update(state="Idle")
+        presence.update(state="Idle", force=True)
+
+        assert presence.sock_writer.write.call_count == 2
+
+    @patch("pypresence.baseclient.BaseClient.read_output")
+    def test_failed_update_is_not_remembered(self, mock_read_output, client_id):
+        """Test that an activity Discord rejected is sent again"""
+        from pypresence.exceptions import ServerError
+
+        presence = Presence(client_id)
+        presence.sock_writer = Mock()
+        mock_read_output.side_effect = [ServerError("Bad"), {}]
+
+        with pytest.raises(ServerError):
+            presence.update(state="Idle")
+        presence.update(state="Idle")
+
+        assert presence.sock_writer.write.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_aio_identical_update_is_skipped(self, client_id):
+        """Test deduplication for AioPresence"""
+        presence = AioPresence(client_id)
+        presence.sock_writer = Mock()
+        presence.read_output = AsyncMock(return_value={"evt": None})
+
+        await presence.update(state="Idle")
+        await presence.update(state="Idle")
+        await presence.update(state="Idle", force=True)
+
+        assert presence.sock_writer.write.call_count == 2
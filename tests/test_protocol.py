@@ -0,0 +1,174 @@
+"""Test IPC framing and the protocol state machine"""
+
+import json
+import struct
+
+import pytest
+
+from pypresence.codec import get_codec
+from pypresence.exceptions import DiscordError, InvalidID, ServerError
+from pypresence.protocol import (
+    CLOSED,
+    EVENT,
+    HANDSHAKE,
+    RESPONSE,
+    FrameDecoder,
+    IPCConnection,
+    Message,
+)
+
+
+class TestFrameDecoder:
+    """Test FrameDecoder incremental parsing"""
+
+    def test_single_frame(self, make_frame):
+        """Test decoding one complete frame"""
+        decoder = FrameDecoder()
+        frames = decoder.feed(make_frame({"evt": "READY"}))
+
+        assert frames == [(1, {"evt": "READY"})]
+        assert len(decoder) == 0
+
+    def test_coalesced_frames(self, make_frame):
+        """Test that one chunk holding several frames yields all of them"""
+        decoder = FrameDecoder()
+        data = make_frame({"n": 1}) + make_frame({"n": 2}) + make_frame({"n": 3}, op=3)
+
+        assert decoder.feed(data) == [(1, {"n": 1}), (1, {"n": 2}), (3, {"n": 3})]
+
+    def test_frame_split_across_chunks(self, make_frame):
+        """Test that a frame straddling chunks is buffered until complete"""
+        decoder = FrameDecoder()
+        data = make_frame({"evt": "SPEAKING_START", "data": {"user_id": "1"}})
+
+        assert decoder.feed(data[:5]) == []
+        assert decoder.feed(data[5:20]) == []
+        assert decoder.feed(data[20:]) == [
+            (1, {"evt": "SPEAKING_START", "data": {"user_id": "1"}})
+        ]
+        assert len(decoder) == 0
+
+    def test_split_and_coalesced(self, make_frame):
+        """Test a chunk that completes one frame and starts the next"""
+        decoder = FrameDecoder()
+        first = make_frame({"n": 1})
+        second = make_frame({"n": 2})
+
+        assert decoder.feed(first[:-3]) == []
+        assert decoder.feed(first[-3:] + second[:4]) == [(1, {"n": 1})]
+        assert len(decoder) == 4
+        assert decoder.feed(second[4:]) == [(1, {"n": 2})]
+
+    def test_byte_at_a_time(self, make_frame):
+        """Test feeding one byte per call"""
+        decoder = FrameDecoder()
+        frames = []
+        for byte in make_frame({"n": 1}) + make_frame({"n": 2}):
+            frames.extend(decoder.feed(bytes([byte])))
+
+        assert frames == [(1, {"n": 1}), (1, {"n": 2})]
+
+    def test_in_place_receive(self, make_frame):
+        """Test receiving straight into the decoder's buffer"""
+        decoder = FrameDecoder(buffer_size=16)
+        data = make_frame({"evt": "READY", "data": "x" * 40}) + make_frame({"n": 2})
+
+        frames = []
+        offset = 0
+        while offset < len(data):
+            buffer = decoder.get_buffer(-1)
+            nbytes = min(len(buffer), 7, len(data) - offset)
+            buffer[:nbytes] = data[offset : offset + nbytes]
+            del buffer
+            frames.extend(decoder.buffer_updated(nbytes))
+            offset += nbytes
+
+        assert frames == [(1, {"evt": "READY", "data": "x" * 40}), (1, {"n": 2})]
+        assert len(decoder) == 0
+
+    def test_buffer_grows_for_large_frame(self, make_frame):
+        """Test that a frame bigger than the buffer is still assembled"""
+        decoder = FrameDecoder(buffer_size=16)
+        payload = {"data": "x" * 1000}
+
+        assert decoder.feed(make_frame(payload)) == [(1, payload)]
+
+
+class TestIPCConnection:
+    """Test the sans-IO IPCConnection"""
+
+    def test_handshake(self, make_frame):
+        """Test the handshake frame and the READY reply"""
+        connection = IPCConnection("1234")
+        data = connection.handshake()
+
+        assert struct.unpack("<II", data[:8])[0] == 0
+        assert json.loads(data[8:]) == {"v": 1, "client_id": "1234"}
+        assert connection.state == IPCConnection.CONNECTING
+
+        ready = {"cmd": "DISPATCH", "evt": "READY", "data": {"v": 1}}
+        assert connection.receive(make_frame(ready)) == [Message(HANDSHAKE, ready)]
+        assert connection.state == IPCConnection.CONNECTED
+
+    @pytest.mark.parametrize(
+        "reply,error",
+        [
+            ({"code": 4000, "message": "Invalid Client ID"}, InvalidID),
+            ({"code": 4004, "message": "Invalid version"}, DiscordError),
+        ],
+    )
+    def test_handshake_rejected(self, make_frame, reply, error):
+        """Test that a rejected handshake closes the connection"""
+        connection = IPCConnection("1234")
+        connection.handshake()
+
+        (message,) = connection.receive(make_frame(reply, op=2))
+
+        assert message.kind == HANDSHAKE
+        assert isinstance(message.error, error)
+        assert connection.state == IPCConnection.CLOSED
+
+    def test_events_and_responses(self, make_frame):
+        """Test that frames are classified by their command"""
+        connection = IPCConnection("1234")
+        event = {"cmd": "DISPATCH", "evt": "SPEAKING_START", "data": {}}
+        response = {"cmd": "GET_GUILDS", "evt": None, "nonce": "1"}
+
+        messages = connection.receive(make_frame(event) + make_frame(response))
+
+        assert [m.kind for m in messages] == [EVENT, RESPONSE]
+        assert messages[1].nonce == "1"
+        assert all(m.error is None for m in messages)
+
+    def test_errors(self, make_frame):
+        """Test the exceptions reported by error frames"""
+        connection = IPCConnection("1234")
+        error_response = {"evt": "ERROR", "data": {"message": "Bad"}, "nonce": "1"}
+        error_event = {"cmd": "DISPATCH", "evt": "ERROR", "data": {"code": 1}}
+
+        response, event = connection.receive(
+            make_frame(error_response) + make_frame(error_event)
+        )
+
+        assert isinstance(response.error, ServerError)
+        assert isinstance(event.error, DiscordError)
+
+    def test_ping_is_answered(self, make_frame):
+        """Test that a ping queues a pong with the same payload"""
+        connection = IPCConnection("1234", codec=get_codec("json"))
+
+        assert connection.receive(make_frame({"n": 1}, op=3)) == []
+        assert connection.data_to_send() == make_frame({"n": 1}, op=4)
+        assert connection.data_to_send() == b""
+
+    def test_close(self, make_frame):
+        """Test closing from either side"""
+        connection = IPCConnection("1234")
+        data = connection.close()
+        assert struct.unpack("<II", data[:8])[0] == 2
+        assert connection.state == IPCConnection.CLOSING
+
+        connection = IPCConnection("1234")
+        (message,) = connection.receive(make_frame({"code": 1000}, op=2))
+        assert message.kind == CLOSED
+        assert connection.state == IPCConnection.CLOSED
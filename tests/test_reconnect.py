@@ -0,0 +1,129 @@
+"""Test automatic reconnection"""
+
+import asyncio
+import sys
+
+import pytest
+
+from pypresence.client import Client
+from pypresence.exceptions import DiscordNotFound, PipeClosed
+from pypresence.presence import AioPresence, Presence
+from pypresence.reconnect import Backoff
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="The test server uses UNIX sockets"
+)
+
+
+def _commands(received):
+    return [
+        (payload["cmd"], (payload["args"].get("activity") or {}).get("state"))
+        for payload in received
+    ]
+
+
+class TestBackoff:
+    """Test Backoff"""
+
+    def test_delays_grow_to_maximum(self):
+        """Test exponential growth capped at the maximum"""
+        backoff = Backoff(initial=1, maximum=5, factor=2, attempts=5, jitter=0)
+
+        assert list(backoff.delays()) == [1, 2, 4, 5, 5]
+
+    def test_jitter(self):
+        """Test that jitter only ever shortens the delay"""
+        backoff = Backoff(initial=1, maximum=1, attempts=50, jitter=0.5)
+
+        assert all(0.5 <= delay <= 1 for delay in backoff.delays())
+
+    def test_unlimited_attempts(self):
+        """Test that attempts=None never runs out"""
+        delays = Backoff(initial=1, maximum=2, attempts=None).delays()
+
+        assert len([next(delays) for _ in range(2000)]) == 2000
+
+
+class TestReconnect:
+    """Test clients created with reconnect enabled"""
+
+    @pytest.mark.parametrize("transport", ["asyncio", "socket"])
+    def test_presence_replays_activity(self, client_id, fake_discord, transport):
+        """Test that a dropped Presence reconnects and restores its activity"""
+        presence = Presence(
+            client_id, transport=transport, reconnect=Backoff(initial=0.01)
+        )
+        presence.connect()
+        presence.update(state="Idle")
+
+        fake_discord.drop()
+        presence.update(state="In game")
+        presence.close()
+
+        assert len(fake_discord.handshakes) == 2
+        assert _commands(fake_discord.received[1:]) == [
+            ("SET_ACTIVITY", "Idle"),
+            ("SET_ACTIVITY", "In game"),
+        ]
+
+    def test_client_replays_subscriptions(self, client_id, fake_discord):
+        """Test that subscriptions are re-issued after reconnecting"""
+        client = Client(client_id, reconnect=Backoff(initial=0.01))
+        client.start()
+        client.register_event("ACTIVITY_JOIN", lambda data: None)
+        client.subscribe("SPEAKING_START", {"channel_id": "1"})
+        client.unsubscribe("SPEAKING_START", {"channel_id": "1"})
+
+        sent = len(fake_discord.received)
+        fake_discord.drop()
+        client.get_guilds()
+        client.close()
+
+        replayed = fake_discord.received[sent:]
+        assert [(p["cmd"], p.get("evt")) for p in replayed] == [
+            ("SUBSCRIBE", "ACTIVITY_JOIN"),
+            ("GET_GUILDS", None),
+        ]
+        assert replayed[0]["nonce"] != fake_discord.received[0]["nonce"]
+
+    def test_without_reconnect(self, client_id, fake_discord):
+        """Test that a dropped connection raises when reconnect is off"""
+        presence = Presence(client_id)
+        presence.connect()
+        fake_discord.drop()
+
+        with pytest.raises(PipeClosed):
+            presence.update(state="Idle")
+
+    def test_gives_up_after_attempts(self, client_id, fake_discord, monkeypatch):
+        """Test that the last error is raised once the attempts run out"""
+        from pypresence import baseclient
+
+        presence = Presence(
+            client_id, reconnect=Backoff(initial=0.01, maximum=0.05, attempts=2)
+        )
+        presence.connect()
+        monkeypatch.setattr(
+            baseclient, "get_ipc_path", lambda pipe=None, probe="connect": None
+        )
+        fake_discord.drop()
+
+        with pytest.raises(DiscordNotFound):
+            presence.update(state="Idle")
+
+    @pytest.mark.asyncio
+    async def test_aio_presence_reconnects_in_background(self, client_id, fake_discord):
+        """Test that AioPresence restores its activity without being called"""
+        presence = AioPresence(client_id, reconnect=Backoff(initial=0.01))
+        await presence.connect()
+        await presence.update(state="Idle")
+
+        fake_discord.drop()
+        for _ in range(100):
+            if len(fake_discord.received) == 2:
+                break
+            await asyncio.sleep(0.01)
+
+        assert len(fake_discord.handshakes) == 2
+        assert _commands(fake_discord.received[1:]) == [("SET_ACTIVITY", "Idle")]
+        presence._stop_reconnect()
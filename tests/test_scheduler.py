@@ -0,0 +1,131 @@
+"""Test the activity update scheduler"""
+
+import asyncio
+
+import pytest
+
+from pypresence.exceptions import ServerError
+from pypresence.scheduler import ActivityScheduler, is_rate_limited
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket:
+    """Test ActivityScheduler rate accounting"""
+
+    def test_burst_then_throttle(self):
+        """Test that the bucket allows a burst of `rate` updates"""
+        clock = FakeClock()
+        scheduler = ActivityScheduler(rate=5, period=20, clock=clock)
+
+        assert all(scheduler.acquire() for _ in range(5))
+        assert not scheduler.acquire()
+        assert scheduler.delay() == pytest.approx(4.0)
+
+        clock.now = 4.0
+        assert scheduler.acquire()
+
+    def test_adaptive_backoff_and_recovery(self):
+        """Test that rate limits slow the bucket down and successes recover"""
+        clock = FakeClock()
+        scheduler = ActivityScheduler(rate=5, period=20, adaptive=True, clock=clock)
+
+        scheduler.rate_limited()
+        assert scheduler.refill_rate == pytest.approx(0.125)
+        assert scheduler.delay() == pytest.approx(8.0)
+
+        for _ in range(10):
+            scheduler.succeeded()
+        assert scheduler.refill_rate == pytest.approx(0.25)
+
+    def test_fixed_mode_keeps_rate(self):
+        """Test that rate limits only empty the bucket in fixed mode"""
+        scheduler = ActivityScheduler(rate=5, period=20, clock=FakeClock())
+        scheduler.rate_limited()
+
+        assert scheduler.refill_rate == pytest.approx(0.25)
+        assert not scheduler.acquire()
+
+    def test_is_rate_limited(self):
+        """Test recognising rate-limit errors"""
+        assert is_rate_limited(ServerError("You are being rate limited"))
+        assert not is_rate_limited(ServerError("Invalid payload"))
+        assert not is_rate_limited(ValueError("rate limited"))
+
+
+class TestSyncScheduling:
+    """Test the blocking offer()/take() front end"""
+
+    def test_latest_wins(self):
+        """Test that a queued update is replaced by a newer one"""
+        clock = FakeClock()
+        scheduler = ActivityScheduler(rate=1, period=10, clock=clock)
+
+        assert scheduler.offer("first") == "first"
+        assert scheduler.offer("second") is None
+        assert scheduler.offer("third") is None
+        assert scheduler.pending == "third"
+
+        clock.now = 10.0
+        assert scheduler.offer("fourth") == "fourth"
+        assert scheduler.pending is None
+
+    def test_take(self):
+        """Test taking the queued update once a token frees up"""
+        scheduler = ActivityScheduler(rate=1, period=0.2)
+        scheduler.offer("first")
+        scheduler.offer("second")
+
+        assert scheduler.take() == "second"
+        assert scheduler.take() is None
+
+
+class TestAsyncScheduling:
+    """Test the asyncio submit() front end"""
+
+    @pytest.mark.asyncio
+    async def test_coalesces_updates(self):
+        """Test that only the latest queued update is sent"""
+        scheduler = ActivityScheduler(rate=1, period=0.05)
+        sent = []
+
+        async def send(payload):
+            sent.append(payload)
+            return {"sent": payload}
+
+        results = await asyncio.gather(*(scheduler.submit(n, send) for n in range(4)))
+
+        assert sent == [0, 3]
+        assert results == [{"sent": 0}, {"sent": 3}, {"sent": 3}, {"sent": 3}]
+
+    @pytest.mark.asyncio
+    async def test_adaptive_retries_after_rate_limit(self):
+        """Test that adaptive mode retries a rate-limited update"""
+        scheduler = ActivityScheduler(rate=1, period=0.01, adaptive=True)
+        attempts = []
+
+        async def send(payload):
+            attempts.append(payload)
+            if len(attempts) == 1:
+                raise ServerError("You are being rate limited")
+            return {"sent": payload}
+
+        assert await scheduler.submit("update", send) == {"sent": "update"}
+        assert attempts == ["update", "update"]
+
+    @pytest.mark.asyncio
+    async def test_fixed_mode_raises_rate_limit(self):
+        """Test that fixed mode surfaces rate-limit errors"""
+        scheduler = ActivityScheduler(rate=1, period=0.01)
+
+        async def send(payload):
+            raise ServerError("You are being rate limited")
+
+        with pytest.raises(ServerError):
+            await scheduler.submit("update", send)
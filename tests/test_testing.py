@@ -0,0 +1,86 @@
+"""Test the FakeDiscord server against the real clients"""
+
+import asyncio
+import time
+
+import pytest
+
+from pypresence.client import AioClient, Client
+from pypresence.exceptions import PipeClosed, ServerError
+from pypresence.presence import Presence
+
+
+class TestFakeDiscord:
+    """Test FakeDiscord through the fake_discord fixture"""
+
+    def test_found_by_discovery(self, client_id, fake_discord):
+        """Test a session against the server found through get_ipc_path"""
+        presence = Presence(client_id)
+        presence.connect()
+        response = presence.update(state="Idle")
+        presence.close()
+
+        assert fake_discord.handshakes == [{"v": 1, "client_id": client_id}]
+        assert response["data"]["activity"]["state"] == "Idle"
+        assert [p["cmd"] for p in fake_discord.received] == ["SET_ACTIVITY"]
+
+    def test_respond(self, client_id, fake_discord):
+        """Test canned and computed responses"""
+        fake_discord.respond("GET_GUILDS", {"guilds": []})
+        fake_discord.respond(
+            "GET_GUILD", lambda payload: {"id": payload["args"]["guild_id"]}
+        )
+        client = Client(client_id, transport="socket")
+        client.start()
+
+        assert client.get_guilds()["data"] == {"guilds": []}
+        assert client.get_guild("7")["data"] == {"id": "7"}
+        client.close()
+
+    def test_fail(self, client_id, fake_discord):
+        """Test that a failing command raises ServerError"""
+        fake_discord.fail("SET_ACTIVITY", message="Rate limited")
+        presence = Presence(client_id)
+        presence.connect()
+
+        with pytest.raises(ServerError, match="Rate limited"):
+            presence.update(state="Idle")
+        presence.close()
+
+    def test_latency(self, client_id, fake_discord):
+        """Test that replies are held back by the configured latency"""
+        fake_discord.latency = 0.05
+        presence = Presence(client_id, transport="socket")
+        presence.connect()
+        start = time.monotonic()
+
+        presence.update(state="Idle")
+
+        assert time.monotonic() - start >= 0.05
+        presence.close()
+
+    def test_drop(self, client_id, fake_discord):
+        """Test that dropping the connections looks like Discord quitting"""
+        presence = Presence(client_id, transport="socket")
+        presence.connect()
+        fake_discord.drop()
+
+        with pytest.raises(PipeClosed):
+            presence.update(state="Idle")
+
+    @pytest.mark.asyncio
+    async def test_dispatch(self, client_id, fake_discord):
+        """Test that injected events reach the registered handler"""
+        received = asyncio.get_running_loop().create_future()
+
+        async def on_join(data):
+            received.set_result(data)
+
+        client = AioClient(client_id)
+        await client.start()
+        await client.register_event("ACTIVITY_JOIN", on_join)
+        fake_discord.dispatch("ACTIVITY_JOIN", {"secret": "s"})
+
+        assert await asyncio.wait_for(received, 1) == {"secret": "s"}
+        assert fake_discord.wait_for(1)[0]["cmd"] == "SUBSCRIBE"
+        client.close()
@@ -0,0 +1,199 @@
+"""Test the blocking socket transport and the clients that use it"""
+
+import socket
+import sys
+from unittest.mock import Mock
+
+import pytest
+
+from pypresence.client import AioClient, Client
+from pypresence.codec import get_codec
+from pypresence.exceptions import (
+    DiscordError,
+    InvalidArgument,
+    InvalidPipe,
+    PipeClosed,
+    ResponseTimeout,
+    ServerError,
+)
+from pypresence.presence import Presence
+from pypresence.protocol import RESPONSE, IPCConnection, Message
+from pypresence.transport import SocketTransport
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="The socket transport needs UNIX sockets"
+)
+
+
+@pytest.fixture
+def socket_transport():
+    """Provide a SocketTransport connected to one end of a socket pair"""
+    server, client = socket.socketpair()
+    transport = SocketTransport(IPCConnection("1234", codec=get_codec("json")))
+    transport._sock = client
+    yield transport, server
+    transport.close()
+    server.close()
+
+
+@pytest.fixture
+def socket_client(client_id, socket_transport):
+    """Factory for a socket transport client that is already connected"""
+    transport, server = socket_transport
+
+    def _create(cls=Client, **kwargs):
+        client = cls(client_id, transport="socket", **kwargs)
+        client.sock_writer = client.sock_protocol = transport
+        client._connection = transport.connection
+        return client, server
+
+    return _create
+
+
+class TestSocketTransport:
+    """Test SocketTransport"""
+
+    def test_read_split_and_coalesced_frames(self, socket_transport, make_frame):
+        """Test that frames are read whole however the bytes arrive"""
+        transport, server = socket_transport
+        first = make_frame({"n": 1})
+        server.sendall(first[:5])
+        server.sendall(first[5:] + make_frame({"n": 2}))
+
+        assert transport.read_message(1) == Message(RESPONSE, {"n": 1})
+        assert transport.read_message(1) == Message(RESPONSE, {"n": 2})
+
+    def test_read_timeout(self, socket_transport):
+        """Test that a silent pipe raises ResponseTimeout"""
+        transport, _ = socket_transport
+
+        with pytest.raises(ResponseTimeout):
+            transport.read_message(0.01)
+
+    def test_read_after_eof(self, socket_transport):
+        """Test that a closed pipe raises PipeClosed"""
+        transport, server = socket_transport
+        server.close()
+
+        with pytest.raises(PipeClosed):
+            transport.read_message(1)
+        assert transport.is_closing()
+
+    def test_write(self, socket_transport):
+        """Test that written data reaches the other end"""
+        transport, server = socket_transport
+
+        transport.write(b"data")
+
+        assert server.recv(4) == b"data"
+
+    def test_ping_is_answered(self, socket_transport, make_frame):
+        """Test that a ping is answered with a pong while reading"""
+        transport, server = socket_transport
+        server.sendall(make_frame({"n": 1}, op=3) + make_frame({"n": 2}))
+
+        assert transport.read_message(1).payload == {"n": 2}
+        assert server.recv(4096) == make_frame({"n": 1}, op=4)
+
+    def test_connect_missing_socket(self, tmp_path):
+        """Test that connecting to a missing socket raises InvalidPipe"""
+        with pytest.raises(InvalidPipe):
+            SocketTransport(IPCConnection("1234")).connect(str(tmp_path / "missing"))
+
+    def test_connect_full_backlog(self, tmp_path, hung_pipe):
+        """Test that a socket nobody accepts on raises InvalidPipe"""
+        path = hung_pipe(tmp_path / "discord-ipc-0")
+
+        with pytest.raises(InvalidPipe):
+            SocketTransport(IPCConnection("1234")).connect(path, timeout=1)
+
+
+class TestSocketClient:
+    """Test clients created with transport='socket'"""
+
+    def test_no_event_loop(self, client_id):
+        """Test that no event loop is created"""
+        assert Presence(client_id, transport="socket").loop is None
+
+    @pytest.mark.parametrize(
+        "cls,kwargs",
+        [
+            (AioClient, {}),
+            (Client, {"threaded": True}),
+            (Client, {"transport": "udp"}),
+        ],
+    )
+    def test_invalid_combinations(self, client_id, cls, kwargs):
+        """Test that unsupported transport settings are rejected"""
+        kwargs.setdefault("transport", "socket")
+        with pytest.raises(InvalidArgument):
+            cls(client_id, **kwargs)
+
+    def test_response_matches_nonce(self, socket_client, make_frame):
+        """Test that stale responses and events are skipped"""
+        client, server = socket_client()
+        received = []
+        client._events["speaking_start"] = received.append
+
+        client.send_data(1, {"cmd": "GET_GUILDS", "nonce": "2"})
+        server.sendall(
+            make_frame({"cmd": "GET_GUILDS", "evt": None, "nonce": "1"})
+            + make_frame(
+                {"cmd": "DISPATCH", "evt": "SPEAKING_START", "data": {"user_id": "1"}}
+            )
+            + make_frame({"cmd": "GET_GUILDS", "evt": None, "nonce": "2"})
+        )
+
+        assert client._run(client.read_output("2"))["nonce"] == "2"
+        assert received == [{"user_id": "1"}]
+
+    def test_error_response(self, socket_client, make_frame):
+        """Test that an error response raises ServerError"""
+        client, server = socket_client()
+        server.sendall(
+            make_frame({"evt": "ERROR", "data": {"message": "Bad"}, "nonce": "1"})
+        )
+
+        with pytest.raises(ServerError, match="Bad"):
+            client._run(client.read_output("1"))
+
+    def test_error_event_goes_to_handler(self, client_id, socket_transport, make_frame):
+        """Test that an error event is passed to the error handler"""
+        transport, server = socket_transport
+        handler = Mock()
+
+        def handle(exception, future):
+            handler(exception, future)
+
+        presence = Presence(client_id, transport="socket", handler=handle)
+        presence.sock_writer = presence.sock_protocol = transport
+        server.sendall(
+            make_frame(
+                {"cmd": "DISPATCH", "evt": "ERROR", "data": {"code": 1, "message": "x"}}
+            )
+            + make_frame({"cmd": "SET_ACTIVITY", "evt": None, "nonce": "1"})
+        )
+
+        assert presence._run(presence.read_output("1"))["nonce"] == "1"
+        assert isinstance(handler.call_args[0][0], DiscordError)
+
+    def test_presence_session(self, client_id, fake_discord):
+        """Test a full Presence session over the socket transport"""
+        presence = Presence(client_id, transport="socket")
+        presence.connect()
+        response = presence.update(state="Idle")
+        presence.clear()
+        presence.close()
+
+        assert response["data"]["activity"]["state"] == "Idle"
+        assert presence.sock_writer.is_closing()
+        assert [p["cmd"] for p in fake_discord.received] == ["SET_ACTIVITY"] * 2
+
+    def test_client_session(self, client_id, fake_discord):
+        """Test Client commands over the socket transport"""
+        client = Client(client_id, transport="socket")
+        client.start()
+        guild = client.get_guild("1")
+        client.close()
+
+        assert guild["data"]["guild_id"] == "1"
@@ -1,11 +1,23 @@
 """Test utility functions"""
 
 import asyncio
+import socket
 import sys
+import time
+from unittest.mock import Mock
 
 import pytest
 
-from pypresence.utils import get_event_loop, remove_none
+from pypresence.exceptions import ResponseTimeout
+from pypresence.presence import AioPresence, Presence
+from pypresence.testing import FakeDiscord
+from pypresence.utils import (
+    clear_ipc_cache,
+    discover_ipc_paths,
+    get_event_loop,
+    get_ipc_path,
+    remove_none,
+)
 
 
 class TestRemoveNone:
@@ -160,3 +172,176 @@ class TestIPCPath:
             path = get_ipc_path(pipe)
             # Will be None if Discord is not running on that pipe
             assert path is None or "discord-ipc-" in str(path)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="The tests create UNIX sockets")
+class TestIPCDiscovery:
+    """Test how get_ipc_path probes candidates and caches what it finds"""
+
+    @pytest.fixture(autouse=True)
+    def runtime_dir(self, monkeypatch, tmp_path):
+        """Search an empty directory with nothing remembered"""
+        monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+        clear_ipc_cache()
+        yield tmp_path
+        clear_ipc_cache()
+
+    @staticmethod
+    def _listen(path):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(str(path))
+        sock.listen(1)
+        return sock
+
+    def test_skips_files_and_stale_sockets(self, runtime_dir):
+        """Test that only a socket accepting connections is returned"""
+        (runtime_dir / "discord-ipc-0").touch()
+        socket.socket(socket.AF_UNIX).bind(str(runtime_dir / "discord-ipc-1"))
+
+        with self._listen(runtime_dir / "discord-ipc-2"):
+            assert get_ipc_path() == str(runtime_dir / "discord-ipc-2")
+
+    def test_skips_hung_socket(self, runtime_dir, hung_pipe):
+        """Test that a socket nobody accepts on is passed over quickly"""
+        hung_pipe(runtime_dir / "discord-ipc-0")
+        start = time.monotonic()
+
+        with self._listen(runtime_dir / "discord-ipc-1"):
+            assert get_ipc_path() == str(runtime_dir / "discord-ipc-1")
+        assert time.monotonic() - start < 1
+
+    def test_stat_probe_does_not_connect(self, runtime_dir, monkeypatch):
+        """Test that probe='stat' accepts any socket without connecting"""
+        from pypresence import utils
+
+        monkeypatch.setattr(utils, "test_ipc_path", Mock(side_effect=AssertionError))
+        socket.socket(socket.AF_UNIX).bind(str(runtime_dir / "discord-ipc-0"))
+
+        assert get_ipc_path(probe="stat") == str(runtime_dir / "discord-ipc-0")
+
+    def test_cached_until_directory_changes(self, runtime_dir, monkeypatch):
+        """Test that a repeated lookup neither scans nor connects"""
+        from pypresence import utils
+
+        with self._listen(runtime_dir / "discord-ipc-0"):
+            path = get_ipc_path(0)
+            monkeypatch.setattr(utils.os, "scandir", Mock(side_effect=AssertionError))
+            assert get_ipc_path(0) == path
+            assert get_ipc_path(0, probe="stat") == path
+
+        monkeypatch.undo()
+        assert get_ipc_path(0) is None
+
+    def test_stat_result_is_verified_for_connect(self, runtime_dir):
+        """Test that a path only found by stat is checked before reuse"""
+        socket.socket(socket.AF_UNIX).bind(str(runtime_dir / "discord-ipc-0"))
+
+        assert get_ipc_path(probe="stat") is not None
+        assert get_ipc_path() is None
+
+    def test_handshake_skips_stale_socket(self, client_id, runtime_dir):
+        """Test that a stale socket found by stat is passed over on connect"""
+        socket.socket(socket.AF_UNIX).bind(str(runtime_dir / "discord-ipc-0"))
+        (runtime_dir / "snap.discord").mkdir()
+        live = str(runtime_dir / "snap.discord" / "discord-ipc-0")
+        presence = Presence(client_id, transport="socket", response_timeout=0.01)
+
+        with self._listen(live):
+            # Nothing answers the handshake, but the connection is made
+            with pytest.raises(ResponseTimeout):
+                presence.connect()
+
+        assert presence.sock_writer._sock.getpeername() == live
+        presence.sock_writer.close()
+
+    def test_handshake_skips_hung_socket(self, client_id, runtime_dir, hung_pipe):
+        """Test that the socket transport passes over a socket nobody accepts on"""
+        hung_pipe(runtime_dir / "discord-ipc-0")
+        (runtime_dir / "snap.discord").mkdir()
+        live = str(runtime_dir / "snap.discord" / "discord-ipc-0")
+        presence = Presence(client_id, transport="socket")
+
+        with FakeDiscord(live):
+            presence.connect()
+            assert presence.sock_writer._sock.getpeername() == live
+            presence.close()
+
+    @pytest.mark.asyncio
+    async def test_discover_ranks_live_first(self, runtime_dir):
+        """Test that live pipes come before stale ones and files are left out"""
+        (runtime_dir / "discord-ipc-2").touch()
+        socket.socket(socket.AF_UNIX).bind(str(runtime_dir / "discord-ipc-0"))
+
+        with FakeDiscord(str(runtime_dir / "discord-ipc-1")):
+            ranked = await discover_ipc_paths()
+
+        assert [(c.path, c.alive) for c in ranked] == [
+            (str(runtime_dir / "discord-ipc-1"), True),
+            (str(runtime_dir / "discord-ipc-0"), False),
+        ]
+        assert ranked[0].latency >= 0 and ranked[1].latency is None
+
+    @pytest.mark.asyncio
+    async def test_discover_needs_an_answer(self, runtime_dir, hung_pipe):
+        """Test that pipes which connect but never answer count as dead"""
+        hung_pipe(runtime_dir / "discord-ipc-0")
+        live = str(runtime_dir / "discord-ipc-2")
+
+        with self._listen(runtime_dir / "discord-ipc-1"), FakeDiscord(live):
+            ranked = await discover_ipc_paths(timeout=0.1)
+
+        assert [(c.path, c.alive) for c in ranked] == [
+            (live, True),
+            (str(runtime_dir / "discord-ipc-0"), False),
+            (str(runtime_dir / "discord-ipc-1"), False),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_discover_probes_concurrently(self, runtime_dir, monkeypatch):
+        """Test that pipes which hang cost one timeout between them"""
+        for n in range(5):
+            socket.socket(socket.AF_UNIX).bind(str(runtime_dir / f"discord-ipc-{n}"))
+
+        async def hang(*args, **kwargs):
+            await asyncio.sleep(60)
+
+        loop = asyncio.get_running_loop()
+        monkeypatch.setattr(loop, "create_unix_connection", hang)
+        start = time.monotonic()
+
+        ranked = await discover_ipc_paths(timeout=0.05)
+
+        assert time.monotonic() - start < 0.2
+        assert len(ranked) == 5 and not any(c.alive for c in ranked)
+
+    @pytest.mark.asyncio
+    async def test_aio_handshake_falls_back_to_discovery(self, client_id, runtime_dir):
+        """Test that an async client finds the live pipe past a stale one"""
+        socket.socket(socket.AF_UNIX).bind(str(runtime_dir / "discord-ipc-0"))
+        (runtime_dir / "snap.discord").mkdir()
+        live = str(runtime_dir / "snap.discord" / "discord-ipc-0")
+        presence = AioPresence(client_id)
+
+        with FakeDiscord(live):
+            await presence.connect()
+            assert presence.sock_writer.get_extra_info("peername") == live
+            presence.disconnect()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("full", [True, False])
+    async def test_aio_handshake_skips_hung_socket(
+        self, client_id, runtime_dir, hung_pipe, full
+    ):
+        """Test that a pipe which never answers is given up on quickly"""
+        hung_pipe(runtime_dir / "discord-ipc-0", full=full)
+        (runtime_dir / "snap.discord").mkdir()
+        live = str(runtime_dir / "snap.discord" / "discord-ipc-0")
+        presence = AioPresence(client_id)
+        start = time.monotonic()
+
+        with FakeDiscord(live):
+            await presence.connect()
+            assert presence.sock_writer.get_extra_info("peername") == live
+            presence.disconnect()
+
+        assert time.monotonic() - start < 2
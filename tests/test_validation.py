@@ -0,0 +1,189 @@
+"""Test checking activities before they are sent"""
+
+import pytest
+
+from pypresence import encoder
+from pypresence.activity import Activity
+from pypresence.encoder import FrameCache, encode_activity
+from pypresence.exceptions import InvalidArgument
+from pypresence.payloads import Payload
+from pypresence.presence import Presence
+from pypresence.validation import validate_activity
+
+BUTTON = {"label": "Watch", "url": "https://example.com/watch"}
+
+
+class TestStrict:
+    """Test that strict mode rejects what Discord would"""
+
+    @pytest.mark.parametrize(
+        "fields",
+        [
+            {"state": "x" * 129},
+            {"details": "x"},
+            {"state": 5},
+            {"large_text": ""},
+            {"state_url": "ftp://example.com"},
+            {"large_url": "not a url"},
+            {"small_url": "https://" + "x" * 256},
+            {"start": -1},
+            {"end": "tomorrow"},
+            {"party_size": [5]},
+            {"party_size": [3, 2]},
+            {"party_size": [0, 4]},
+            {"party_size": ["1", "4"]},
+            {"buttons": [BUTTON] * 3},
+            {"buttons": [{"label": "Watch"}]},
+            {"buttons": [{"label": "x" * 33, "url": "https://example.com"}]},
+            {"buttons": [{"label": "Watch", "url": "example.com"}]},
+            {"buttons": BUTTON},
+        ],
+    )
+    def test_rejected(self, fields):
+        """Test that out-of-bounds values raise InvalidArgument"""
+        with pytest.raises(InvalidArgument):
+            validate_activity(fields)
+
+    def test_valid_unchanged(self):
+        """Test that a valid activity is returned as it is"""
+        fields = {
+            "state": "In a match",
+            "details": "Ranked",
+            "start": 1700000000.5,
+            "party_size": (2, 5),
+            "buttons": [BUTTON, BUTTON],
+            "state_url": "https://example.com/state",
+            "instance": True,
+            "activity_type": 2,
+            "large_image": None,
+        }
+
+        assert validate_activity(fields) is fields
+
+
+class TestLenient:
+    """Test that lenient mode fixes what it can"""
+
+    def test_truncates_text(self):
+        """Test that long text is cut to Discord's limit"""
+        fields = {"state": "x" * 200, "details": "Ranked"}
+        checked = validate_activity(fields, "lenient")
+
+        assert checked == {"state": "x" * 128, "details": "Ranked"}
+        assert len(fields["state"]) == 200
+
+    def test_trims_buttons(self):
+        """Test that extra buttons are dropped and labels shortened"""
+        long = {"label": "x" * 40, "url": "https://example.com"}
+        checked = validate_activity({"buttons": [long, BUTTON, BUTTON]}, "lenient")
+
+        assert checked["buttons"] == [
+            {"label": "x" * 32, "url": "https://example.com"},
+            BUTTON,
+        ]
+        assert long["label"] == "x" * 40
+
+    def test_still_rejects(self):
+        """Test that what can't be truncated is still an error"""
+        with pytest.raises(InvalidArgument):
+            validate_activity({"state": "x"}, "lenient")
+        with pytest.raises(InvalidArgument):
+            validate_activity({"state_url": "example.com"}, "lenient")
+
+    def test_modes(self):
+        """Test that None skips validation and unknown modes are rejected"""
+        fields = {"state": "x"}
+
+        assert validate_activity(fields, None) is fields
+        with pytest.raises(InvalidArgument):
+            validate_activity(fields, "loose")
+
+
+class TestWhereValidated:
+    """Test that every way of building an activity is validated"""
+
+    def test_payload(self):
+        """Test that Payload.set_activity validates unless told not to"""
+        with pytest.raises(InvalidArgument):
+            Payload.set_activity(state="x")
+
+        lenient = Payload.set_activity(state="x" * 200, validation="lenient")
+        unchecked = Payload.set_activity(state="x", validation=None)
+        cleared = Payload.set_activity(activity=None)
+
+        assert lenient.data["args"]["activity"]["state"] == "x" * 128
+        assert unchecked.data["args"]["activity"]["state"] == "x"
+        assert "activity" not in cleared.data["args"]
+
+    def test_encoder(self):
+        """Test that encode_activity validates like Payload.set_activity"""
+        with pytest.raises(InvalidArgument):
+            encode_activity(party_size=[3, 2])
+
+        payload = encode_activity(details="x" * 200, validation="lenient")
+        assert payload.data["args"]["activity"]["details"] == "x" * 128
+
+    def test_cached_activity_not_revalidated(self, monkeypatch):
+        """Test that a cache hit only validates the timestamps"""
+        calls = []
+
+        def counting(fields, mode="strict"):
+            calls.append(set(fields))
+            return validate_activity(fields, mode)
+
+        monkeypatch.setattr(encoder, "validate_activity", counting)
+        cache = FrameCache()
+        encode_activity(state="Lobby", cache=cache)
+        encode_activity(state="Lobby", start=100, cache=cache)
+
+        assert len(calls) == 2
+        assert calls[1] == {"start", "end"}
+        with pytest.raises(InvalidArgument):
+            encode_activity(state="Lobby", start=-5, cache=cache)
+
+    def test_activity(self):
+        """Test that an Activity rejects a bad value when it is set"""
+        activity = Activity(state="Lobby")
+
+        with pytest.raises(InvalidArgument):
+            activity.party_size = [5, 4]
+        assert activity.party_size is None
+
+    def test_activity_follows_client(self, client_id, fake_discord):
+        """Test that an Activity's long text is left to the client's mode"""
+        activity = Activity(state="x" * 200)
+        strict = Presence(client_id)
+        with pytest.raises(InvalidArgument):
+            strict.update(activity=activity)
+
+        for validation in ("lenient", None):
+            presence = Presence(client_id, validation=validation)
+            presence.connect()
+            presence.update(activity=activity)
+            presence.close()
+
+        sent = [c["args"]["activity"]["state"] for c in fake_discord.received]
+        assert sent == ["x" * 128, "x" * 200]
+
+    def test_presence(self, client_id, mock_stream_writer):
+        """Test that a presence raises before anything is sent"""
+        presence = Presence(client_id)
+        presence.sock_writer = mock_stream_writer
+
+        with pytest.raises(InvalidArgument):
+            presence.update(buttons=[BUTTON] * 3)
+        mock_stream_writer.write.assert_not_called()
+
+    def test_presence_lenient(self, client_id, fake_discord):
+        """Test that a lenient presence sends the corrected activity"""
+        presence = Presence(client_id, validation="lenient")
+        presence.connect()
+        presence.update(state="x" * 200)
+        presence.close()
+
+        assert fake_discord.received[0]["args"]["activity"]["state"] == "x" * 128
+
+    def test_presence_option(self, client_id):
+        """Test that an unknown validation mode is rejected"""
+        with pytest.raises(InvalidArgument):
+            Presence(client_id, validation="loose")
@@ -0,0 +1,146 @@
+"""Test watching for Discord's IPC sockets"""
+
+import os
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+from pypresence import watcher as watcher_module
+from pypresence.presence import Presence
+from pypresence.watcher import APPEARED, DISAPPEARED, IPCEvent, IPCWatcher
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="The tests create UNIX sockets"
+)
+
+
+@pytest.fixture
+def runtime_dir(monkeypatch, tmp_path):
+    """Point IPC discovery at an empty temporary directory"""
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture(params=["inotify", "poll"])
+def make_watcher(request, monkeypatch):
+    """Create watchers using each backend"""
+    if request.param == "inotify" and not sys.platform.startswith("linux"):
+        pytest.skip("inotify is only available on Linux")
+    if request.param == "poll":
+        monkeypatch.setattr(watcher_module, "_load_inotify", lambda: None)
+    watchers = []
+
+    def _create(**kwargs):
+        watcher = IPCWatcher(interval=0.01, **kwargs)
+        watchers.append(watcher)
+        assert watcher.backend == request.param
+        return watcher
+
+    yield _create
+    for watcher in watchers:
+        watcher.close()
+
+
+def _bind(path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(str(path))
+    return sock
+
+
+class TestIPCWatcher:
+    """Test IPCWatcher"""
+
+    def test_existing_sockets(self, runtime_dir, make_watcher):
+        """Test that sockets present at creation are listed"""
+        with _bind(runtime_dir / "discord-ipc-0"):
+            watcher = make_watcher()
+
+            assert watcher.sockets == {str(runtime_dir / "discord-ipc-0")}
+            assert watcher.read() == []
+
+    def test_appear_and_disappear(self, runtime_dir, make_watcher):
+        """Test that sockets coming and going are reported"""
+        watcher = make_watcher()
+        path = str(runtime_dir / "discord-ipc-0")
+
+        with _bind(path):
+            assert watcher.wait(1) == [IPCEvent(APPEARED, path)]
+            os.unlink(path)
+            assert watcher.wait(1) == [IPCEvent(DISAPPEARED, path)]
+        assert watcher.sockets == set()
+
+    def test_other_files_ignored(self, runtime_dir, make_watcher):
+        """Test that unrelated files and other pipes are ignored"""
+        watcher = make_watcher(pipe=1)
+        (runtime_dir / "something-else").touch()
+
+        with _bind(runtime_dir / "discord-ipc-0"):
+            assert watcher.wait(0.05) == []
+
+    def test_candidate_directory_created_later(self, runtime_dir, make_watcher):
+        """Test sockets in a Flatpak directory that did not exist at first"""
+        watcher = make_watcher()
+        directory = runtime_dir / "app" / "com.discordapp.Discord"
+        directory.mkdir(parents=True)
+        watcher.wait(0.05)
+
+        with _bind(directory / "discord-ipc-0"):
+            assert watcher.wait(1) == [
+                IPCEvent(APPEARED, str(directory / "discord-ipc-0"))
+            ]
+
+    def test_queue_overflow(self, runtime_dir, make_watcher, monkeypatch):
+        """Test that events lost to a full inotify queue are caught up on"""
+        watcher = make_watcher()
+        if watcher.backend != "inotify":
+            pytest.skip("Only the inotify queue can overflow")
+        path = str(runtime_dir / "discord-ipc-0")
+        overflow = watcher_module.INOTIFY_EVENT.pack(
+            -1, watcher_module.IN_Q_OVERFLOW, 0, 0
+        )
+
+        with _bind(path):
+            monkeypatch.setattr(os, "read", lambda fd, size: overflow)
+            assert watcher.read() == [IPCEvent(APPEARED, path)]
+
+    def test_wait_timeout(self, runtime_dir, make_watcher):
+        """Test that wait gives up after the timeout"""
+        watcher = make_watcher()
+        start = time.monotonic()
+
+        assert watcher.wait(0.05) == []
+        assert time.monotonic() - start >= 0.05
+
+    @pytest.mark.asyncio
+    async def test_wait_async(self, runtime_dir, make_watcher):
+        """Test waiting without blocking the event loop"""
+        watcher = make_watcher()
+        path = str(runtime_dir / "discord-ipc-0")
+        timer = threading.Timer(0.05, lambda: _bind(path).close())
+        timer.start()
+
+        assert await watcher.wait_async(1) == [IPCEvent(APPEARED, path)]
+        assert await watcher.wait_async(0.01) == []
+        timer.join()
+
+
+class TestReconnectWaitsForSocket:
+    """Test that reconnecting sleeps until Discord creates its socket"""
+
+    def test_wakes_up_when_socket_appears(self, client_id, runtime_dir):
+        """Test that the wait ends as soon as a socket appears"""
+        presence = Presence(client_id, transport="socket")
+        path = str(runtime_dir / "discord-ipc-0")
+        timer = threading.Timer(0.05, lambda: _bind(path).close())
+        timer.start()
+
+        with IPCWatcher() as watcher:
+            start = time.monotonic()
+            presence._run(presence._wait_for_socket(watcher, 5))
+            elapsed = time.monotonic() - start
+        timer.join()
+
+        assert elapsed < 2